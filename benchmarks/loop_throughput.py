@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Compare the dev server's request throughput and latency with each event loop implementation.
+
+Each loop runs the app in a dev server process the same way the watcher does, while a client in this process keeps
+a fixed number of keep-alive connections busy. Usage:
+
+    python benchmarks/loop_throughput.py example/app.py --requests 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from aiohttp import ClientSession, TCPConnector
+
+from sanic_devtools.config import Config
+from sanic_devtools.loops import LOOP_CHOICES
+from sanic_devtools.metrics import percentile
+from sanic_devtools.serve import serve_main_app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+        except OSError:
+            time.sleep(0.005)
+        else:
+            return
+    raise RuntimeError('app did not start within {}s'.format(timeout))
+
+
+async def load(url, requests, concurrency, loop):
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def client(session):
+        for _ in remaining:
+            start = time.monotonic()
+            async with session.get(url) as r:
+                await r.read()
+            latencies.append(time.monotonic() - start)
+
+    connector = TCPConnector(limit=concurrency, loop=loop)
+    async with ClientSession(connector=connector, loop=loop) as session:
+        # warm up the app and the connections before measuring
+        await asyncio.gather(*[session.get(url) for _ in range(concurrency)], loop=loop)
+        start = time.monotonic()
+        await asyncio.gather(*[client(session) for _ in range(concurrency)], loop=loop)
+        elapsed = time.monotonic() - start
+    return requests / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('app_path')
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--loops', nargs='+', default=['asyncio', 'uvloop'], choices=LOOP_CHOICES)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    # the client always uses the same loop so only the server's loop differs between runs
+    loop = asyncio.new_event_loop()
+    print('{:<8} {:>12} {:>10} {:>10} {:>10}'.format('loop', 'requests/s', 'p50', 'p99', 'max'))
+    for name in args.loops:
+        config = Config(app_path=args.app_path, main_port=free_port(), event_loop=name)
+        process = ctx.Process(target=serve_main_app, args=(config, None))
+        process.start()
+        try:
+            wait_for_port(config.main_port)
+            url = 'http://127.0.0.1:{}{}'.format(config.main_port, args.path)
+            throughput, latencies = loop.run_until_complete(load(url, args.requests, args.concurrency, loop))
+        finally:
+            os.kill(process.pid, signal.SIGINT)
+            process.join(5)
+        print('{:<8} {:>12.0f} {:>8.2f}ms {:>8.2f}ms {:>8.2f}ms'.format(
+            name, throughput, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+            max(latencies) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+"""
+Measure cold start, reload latency, idle cpu and memory of runserver over synthetic projects of increasing size.
+
+Each scenario generates a project in a temporary directory, runs "sanic-devtools runserver" on it in a subprocess
+and measures:
+
+* cold start: from running the command until the app answers a request
+* reload: from changing a module until the app serves the new code
+* idle cpu: cpu used by the watcher process while nothing changes
+* memory: rss of the watcher process and of the dev server process
+
+Everything runs locally, the "heavy" scenario imports third party packages which are already installed. Results
+are appended to a json lines file and compared with the previous run so regressions show up. Usage:
+
+    python benchmarks/reload_suite.py --sizes 10 100 1000 --reloads 5
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from importlib.util import find_spec
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from sanic_devtools.bench import process_usage
+
+MODULES_PER_PACKAGE = 50
+DEFAULT_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'reload_suite.jsonl')
+# installed with sanic-devtools and its dependencies, so importing them needs no network
+HEAVY_MODULES = [
+    'aiohttp', 'click', 'cookiecutter.main', 'decimal', 'email.mime.multipart', 'http.server', 'jinja2',
+    'pygments.lexers', 'sqlite3', 'uvloop', 'xml.etree.ElementTree',
+]
+MODULE_TEMPLATE = '''\
+"""synthetic module {index}"""
+import json
+{imports}
+VERSION = 0
+
+
+class Model{index}:
+    def __init__(self, value):
+        self.value = value
+
+    def as_dict(self):
+        return {{'id': {index}, 'value': self.value}}
+
+
+def handler_{index}(value):
+    return json.dumps(Model{index}(value).as_dict())
+'''
+APP_TEMPLATE = '''\
+from sanic import Sanic
+from sanic.response import text
+
+{imports}
+
+
+def create_app():
+    app = Sanic()
+
+    @app.route('/')
+    async def index(request):
+        return text(str({version}))
+
+    return app
+'''
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def write_module(root, package, index, imports=''):
+    """
+    Write module "mod<index>" in package, a dotted name under root, creating the packages it's in.
+    """
+    dir_path = root
+    for part in package.split('.'):
+        dir_path = os.path.join(dir_path, part)
+        os.makedirs(dir_path, exist_ok=True)
+        init = os.path.join(dir_path, '__init__.py')
+        if not os.path.exists(init):
+            open(init, 'w').close()
+    with open(os.path.join(dir_path, 'mod{}.py'.format(index)), 'w') as f:
+        f.write(MODULE_TEMPLATE.format(index=index, imports=imports))
+
+
+def make_flat(root, size):
+    """
+    size modules in packages of MODULES_PER_PACKAGE, all imported by the app.
+    """
+    names = []
+    for i in range(size):
+        package = 'project.pkg{}'.format(i // MODULES_PER_PACKAGE)
+        write_module(root, package, i)
+        names.append('{}.mod{}'.format(package, i))
+    return names
+
+
+def make_chain(root, depth):
+    """
+    A chain of depth modules, each importing the next.
+    """
+    for i in range(depth):
+        imports = 'from . import mod{}\n'.format(i + 1) if i + 1 < depth else ''
+        write_module(root, 'project.chain', i, imports)
+    # the app imports the head of the chain and serves the version of its tail
+    return ['project.chain.mod0', 'project.chain.mod{}'.format(depth - 1)]
+
+
+def make_heavy(root, size):
+    """
+    size modules which between them import the installed third party and standard library modules.
+    """
+    available = [m for m in HEAVY_MODULES if find_spec(m.split('.')[0]) is not None]
+    names = []
+    for i in range(size):
+        imports = ''.join('import {}\n'.format(m) for m in available[i::size])
+        write_module(root, 'project.heavy', i, imports)
+        names.append('project.heavy.mod{}'.format(i))
+    return names
+
+
+SCENARIOS = {
+    'flat': make_flat,
+    'chain': make_chain,
+    'heavy': make_heavy,
+}
+
+
+def make_project(root, kind, size):
+    """
+    Generate a project, returns the path of the module whose VERSION the app serves.
+    """
+    names = SCENARIOS[kind](root, size)
+    target = names[-1]
+    with open(os.path.join(root, 'main.py'), 'w') as f:
+        f.write(APP_TEMPLATE.format(imports='\n'.join('import {}'.format(n) for n in names),
+                                    version=target + '.VERSION'))
+    return os.path.join(root, *target.split('.')) + '.py'
+
+
+def get(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urlopen(url, timeout=timeout) as r:
+                return r.read().decode()
+        except (URLError, ConnectionError, socket.timeout):
+            time.sleep(0.005)
+    raise RuntimeError('no response from {} within {}s'.format(url, timeout))
+
+
+def wait_for_version(url, version, timeout=30):
+    deadline = time.monotonic() + timeout
+    while get(url, timeout) != str(version):
+        if time.monotonic() > deadline:
+            raise RuntimeError('version {} not served within {}s'.format(version, timeout))
+        time.sleep(0.005)
+
+
+def run_scenario(kind, size, reloads, idle_time):
+    root = tempfile.mkdtemp(prefix='sdev-reload-suite-')
+    port, aux_port = free_port(), free_port()
+    target = make_project(root, kind, size)
+    command = [
+        sys.executable, '-c', 'from sanic_devtools.cli import cli; cli()', 'runserver', 'main.py',
+        '--port', str(port), '--aux-port', str(aux_port), '--no-livereload',
+    ]
+    log_path = os.path.join(root, 'runserver.log')
+    url = 'http://127.0.0.1:{}/'.format(port)
+    start = time.monotonic()
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(command, cwd=root, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_for_version(url, 0)
+        cold_start = time.monotonic() - start
+
+        reload_times = []
+        for version in range(1, reloads + 1):
+            # let the dev server settle so each reload starts from the same state
+            time.sleep(0.5)
+            with open(target) as f:
+                code = f.read()
+            start = time.monotonic()
+            with open(target, 'w') as f:
+                f.write(code.replace('VERSION = {}'.format(version - 1), 'VERSION = {}'.format(version)))
+            wait_for_version(url, version)
+            reload_times.append(time.monotonic() - start)
+
+        status = json.loads(get('http://127.0.0.1:{}/status?wait=10'.format(aux_port)))
+        usage = process_usage(process.pid)
+        time.sleep(idle_time)
+        idle_usage = process_usage(process.pid)
+        child_usage = process_usage(status['pid'])
+    except RuntimeError:
+        with open(log_path) as f:
+            print(f.read(), file=sys.stderr)
+        raise
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(root)
+
+    return {
+        'scenario': '{}-{}'.format(kind, size),
+        'cold_start': cold_start,
+        'reload_p50': statistics.median(reload_times),
+        'reload_max': max(reload_times),
+        'idle_cpu': (idle_usage['cpu'] - usage['cpu']) / idle_time * 100 if usage and idle_usage else None,
+        'parent_rss': idle_usage and idle_usage['rss'],
+        'child_rss': child_usage and child_usage['rss'],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results(path):
+    """
+    Results of the latest earlier run of each scenario.
+    """
+    previous = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                run = json.loads(line)
+                previous.update((r['scenario'], r) for r in run['results'])
+    except FileNotFoundError:
+        pass
+    return previous
+
+
+def change(value, before):
+    if value is None or not before:
+        return ''
+    return '{:+.0f}%'.format((value - before) / before * 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10, 100, 1000])
+    parser.add_argument('--chain-depths', type=int, nargs='*', default=[10, 50])
+    parser.add_argument('--heavy-sizes', type=int, nargs='*', default=[10])
+    parser.add_argument('--reloads', type=int, default=3)
+    parser.add_argument('--idle-time', type=float, default=3)
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help='json lines file results are appended to')
+    args = parser.parse_args()
+
+    scenarios = ([('flat', s) for s in args.sizes] + [('chain', d) for d in args.chain_depths] +
+                 [('heavy', s) for s in args.heavy_sizes])
+    previous = previous_results(args.results)
+    print('{:<12} {:>10} {:>6} {:>10} {:>6} {:>10} {:>9} {:>10} {:>10}'.format(
+        'scenario', 'cold start', '', 'reload p50', '', 'reload max', 'idle cpu', 'parent rss', 'child rss'))
+    results = []
+    for kind, size in scenarios:
+        r = run_scenario(kind, size, args.reloads, args.idle_time)
+        results.append(r)
+        before = previous.get(r['scenario'], {})
+        print('{:<12} {:>8.0f}ms {:>6} {:>8.0f}ms {:>6} {:>8.0f}ms {:>8.1f}% {:>8.1f}MB {:>8.1f}MB'.format(
+            r['scenario'], r['cold_start'] * 1000, change(r['cold_start'], before.get('cold_start')),
+            r['reload_p50'] * 1000, change(r['reload_p50'], before.get('reload_p50')), r['reload_max'] * 1000,
+            r['idle_cpu'] or 0, (r['parent_rss'] or 0) / 2 ** 20, (r['child_rss'] or 0) / 2 ** 20))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, 'a') as f:
+        f.write(json.dumps({
+            'time': datetime.datetime.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'results': results,
+        }) + '\n')
+    print('results appended to {}'.format(args.results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Compare dev server restart time between the "spawn" and "preload" (forkserver) start methods.
+
+Each run starts a dev server process the same way the watcher does and measures the time until the app accepts
+connections. Usage:
+
+    python benchmarks/restart_time.py example/app.py --runs 10
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import time
+
+from sanic_devtools.config import Config
+from sanic_devtools.serve import serve_main_app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+        except OSError:
+            time.sleep(0.005)
+        else:
+            return
+    raise RuntimeError('app did not start within {}s'.format(timeout))
+
+
+def time_restarts(ctx, config, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.monotonic()
+        process = ctx.Process(target=serve_main_app, args=(config, None))
+        process.start()
+        wait_for_port(config.main_port)
+        timings.append(time.monotonic() - start)
+        os.kill(process.pid, signal.SIGINT)
+        process.join(5)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('app_path')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    # stable modules are found the same way runserver finds them, without importing the app here
+    config = Config(app_path=args.app_path, main_port=free_port(), preload=True)
+    config.locate_app_factory()
+
+    forkserver = multiprocessing.get_context('forkserver')
+    forkserver.set_forkserver_preload(['sanic_devtools.serve'] + config.stable_modules)
+    modes = [
+        ('spawn', multiprocessing.get_context('spawn')),
+        ('preload', forkserver),
+    ]
+    # the first forkserver process pays for starting the server, like the first start in runserver
+    time_restarts(forkserver, config, 1)
+
+    print('{:<10} {:>10} {:>10} {:>10}'.format('mode', 'mean', 'median', 'max'))
+    for name, ctx in modes:
+        timings = time_restarts(ctx, config, args.runs)
+        print('{:<10} {:>9.3f}s {:>9.3f}s {:>9.3f}s'.format(
+            name, statistics.mean(timings), statistics.median(timings), max(timings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Compare the dev server's request throughput and latency over loopback TCP and a unix socket.
+
+The app runs in a dev server process listening on a socket bound the same way the watcher binds it, while a client
+in this process keeps a fixed number of keep-alive connections busy. Usage:
+
+    python benchmarks/uds_throughput.py example/app.py --requests 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+
+from aiohttp import ClientSession, TCPConnector, UnixConnector
+
+from sanic_devtools.config import Config
+from sanic_devtools.metrics import percentile
+from sanic_devtools.serve import create_main_socket, serve_main_app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def load(url, connector, requests, concurrency, loop):
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def client(session):
+        for _ in remaining:
+            start = time.monotonic()
+            async with session.get(url) as r:
+                await r.read()
+            latencies.append(time.monotonic() - start)
+
+    async with ClientSession(connector=connector, loop=loop) as session:
+        # warm up the app and the connections before measuring
+        await asyncio.gather(*[session.get(url) for _ in range(concurrency)], loop=loop)
+        start = time.monotonic()
+        await asyncio.gather(*[client(session) for _ in range(concurrency)], loop=loop)
+        elapsed = time.monotonic() - start
+    return requests / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('app_path')
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    loop = asyncio.new_event_loop()
+    tmp_dir = tempfile.mkdtemp(prefix='sdev-uds-bench-')
+    transports = [
+        ('tcp', {'main_port': free_port()}),
+        ('unix', {'unix': os.path.join(tmp_dir, 'app.sock')}),
+    ]
+    print('{:<8} {:>12} {:>10} {:>10} {:>10}'.format('socket', 'requests/s', 'p50', 'p99', 'max'))
+    try:
+        for name, kwargs in transports:
+            config = Config(app_path=args.app_path, **kwargs)
+            sock = loop.run_until_complete(create_main_socket(config, loop))
+            process = ctx.Process(target=serve_main_app, args=(config, None, sock))
+            process.start()
+            try:
+                if config.unix:
+                    connector = UnixConnector(path=config.unix, limit=args.concurrency, loop=loop)
+                else:
+                    connector = TCPConnector(limit=args.concurrency, loop=loop)
+                # connections queue in the socket's backlog until the app is ready
+                url = 'http://127.0.0.1:{}{}'.format(config.main_port, args.path)
+                throughput, latencies = loop.run_until_complete(
+                    load(url, connector, args.requests, args.concurrency, loop))
+            finally:
+                os.kill(process.pid, signal.SIGINT)
+                process.join(5)
+                sock.close()
+            print('{:<8} {:>12.0f} {:>8.2f}ms {:>8.2f}ms {:>8.2f}ms'.format(
+                name, throughput, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+                max(latencies) * 1000))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Benchmark change detection latency and idle CPU of the watcher backends as the watched tree grows.
+
+Usage:
+
+    python benchmarks/watch_latency.py --sizes 1000 10000 50000
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from watchgod import awatch
+
+from sanic_devtools.watchers import DEFAULT_IGNORE, GlobWatcher, InotifyWatcher, inotify_available
+
+FILES_PER_DIR = 50
+
+
+def make_tree(root, size):
+    for i in range(size):
+        dir_path = os.path.join(root, 'pkg{}'.format(i // FILES_PER_DIR))
+        os.makedirs(dir_path, exist_ok=True)
+        with open(os.path.join(dir_path, 'module{}.py'.format(i)), 'w') as f:
+            f.write('x = {}\n'.format(i))
+
+
+def create_watcher(backend, path, stop_event, loop):
+    if backend == 'inotify':
+        return InotifyWatcher(path, stop_event=stop_event, loop=loop)
+    return awatch(path, watcher_cls=GlobWatcher, watcher_kwargs={'ignore': DEFAULT_IGNORE}, stop_event=stop_event)
+
+
+async def measure(backend, path, touches, idle_time, loop):
+    stop_event = asyncio.Event(loop=loop)
+    watcher = create_watcher(backend, path, stop_event, loop)
+    batches = asyncio.Queue(loop=loop)
+
+    async def consume():
+        async for changes in watcher:
+            batches.put_nowait((time.monotonic(), changes))
+
+    task = loop.create_task(consume())
+    # let the watcher settle, the polling watcher walks the whole tree on its first check
+    await asyncio.sleep(1, loop=loop)
+
+    cpu_start = time.process_time()
+    await asyncio.sleep(idle_time, loop=loop)
+    idle_cpu = (time.process_time() - cpu_start) / idle_time
+
+    latencies = []
+    target = os.path.join(path, 'pkg0', 'module0.py')
+    for i in range(touches):
+        start = time.monotonic()
+        with open(target, 'w') as f:
+            f.write('x = {}\n'.format(-i))
+        detected, _ = await batches.get()
+        latencies.append(detected - start)
+        await asyncio.sleep(0.2, loop=loop)
+
+    stop_event.set()
+    await task
+    return idle_cpu, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--touches', type=int, default=5)
+    parser.add_argument('--idle-time', type=float, default=3)
+    args = parser.parse_args()
+
+    backends = ['poll'] + (['inotify'] if inotify_available() else [])
+    loop = asyncio.get_event_loop()
+    print('{:>8} {:<8} {:>14} {:>14} {:>10}'.format('files', 'backend', 'median latency', 'max latency', 'idle cpu'))
+    for size in args.sizes:
+        root = tempfile.mkdtemp(prefix='sdev-watch-bench-')
+        try:
+            make_tree(root, size)
+            for backend in backends:
+                idle_cpu, latencies = loop.run_until_complete(
+                    measure(backend, root, args.touches, args.idle_time, loop))
+                print('{:>8} {:<8} {:>13.1f}ms {:>13.1f}ms {:>9.1f}%'.format(
+                    size, backend, statistics.median(latencies) * 1000, max(latencies) * 1000, idle_cpu * 100))
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
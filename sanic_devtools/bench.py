@@ -0,0 +1,293 @@
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import Counter, OrderedDict
+from multiprocessing import Pipe, get_context
+from typing import List, Optional, Tuple
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+
+from .config import Config
+from .exceptions import SanicDevException
+from .log import rs_dft_logger as logger
+from .metrics import percentile
+from .serve import create_main_socket, serve_main_app, url_host
+from .watch import wait_for_exit
+
+# a target is a (method, path, body) tuple
+Target = Tuple[str, str, Optional[str]]
+PERCENTILES = 50, 90, 99
+# the error rate may rise by this fraction of requests whatever the tolerance, with an error free baseline any
+# error at all would otherwise be a regression
+ERROR_RATE_ALLOWANCE = 0.001
+
+
+def parse_targets(routes: List[str], request_file: Optional[str]=None) -> List[Target]:
+    """
+    Requests to send, each route is a path optionally preceded by a method, eg. "/" or "POST /items". Each line
+    of request_file is a route optionally followed by a body, blank lines and lines starting with "#" are ignored.
+    """
+    lines = list(routes)
+    if request_file:
+        with open(request_file) as f:
+            lines += [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    targets = []
+    for line in lines:
+        parts = line.split(None, 2)
+        if not parts[0].startswith('/'):
+            method = parts.pop(0).upper()
+        else:
+            method = 'GET'
+        if not parts or not parts[0].startswith('/'):
+            raise SanicDevException('invalid request "{}", should be "[METHOD] /path [body]"'.format(line))
+        targets.append((method, parts[0], parts[1] if len(parts) > 1 else None))
+    return targets or [('GET', '/', None)]
+
+
+def process_usage(pid: int) -> Optional[dict]:
+    """
+    Memory in bytes and cpu time in seconds used by a process so far, from /proc so None on other platforms or if
+    the process has gone.
+    """
+    try:
+        with open('/proc/{}/stat'.format(pid)) as f:
+            # the fields after the command name, which may contain spaces, start with the state: field 3
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/{}/status'.format(pid)) as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+    except (OSError, IndexError):
+        return None
+    return {
+        'rss': int(status['VmRSS'].split()[0]) * 1024,
+        'peak_rss': int(status['VmHWM'].split()[0]) * 1024,
+        'cpu': (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK'),
+    }
+
+
+class LoadResult:
+    """
+    Latencies, statuses and errors of the requests sent to each target.
+    """
+    def __init__(self):
+        self.latencies = OrderedDict()
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.elapsed = 0
+
+    def record(self, target: Target, start: float, status: Optional[int]=None, error: Optional[str]=None):
+        key = '{} {}'.format(*target[:2])
+        self.latencies.setdefault(key, []).append(time.monotonic() - start)
+        if error:
+            self.errors[error] += 1
+        else:
+            self.statuses[str(status)] += 1
+            if status >= 500:
+                self.errors[str(status)] += 1
+
+    @staticmethod
+    def _latency(values) -> dict:
+        latency = OrderedDict(('p{}'.format(p), percentile(values, p) * 1000) for p in PERCENTILES)
+        latency['mean'] = sum(values) / len(values) * 1000
+        latency['max'] = max(values) * 1000
+        return latency
+
+    def as_dict(self) -> dict:
+        all_latencies = [v for values in self.latencies.values() for v in values]
+        count, errors = len(all_latencies), sum(self.errors.values())
+        return OrderedDict([
+            ('requests', count),
+            ('duration', self.elapsed),
+            ('throughput', count / self.elapsed if self.elapsed else 0),
+            ('latency_ms', self._latency(all_latencies) if count else None),
+            ('errors', errors),
+            ('error_rate', errors / count if count else 0),
+            ('statuses', dict(self.statuses)),
+            ('error_kinds', dict(self.errors)),
+            ('routes', OrderedDict((key, {'requests': len(values), 'latency_ms': self._latency(values)})
+                                   for key, values in self.latencies.items())),
+        ])
+
+
+async def send_requests(session: ClientSession, base_url: str, targets: List[Target], requests: int,
+                        concurrency: int, result: LoadResult=None) -> LoadResult:
+    """
+    Send requests to targets in turn over concurrency keep-alive connections.
+    """
+    result = result or LoadResult()
+    remaining = iter(range(requests))
+
+    async def client():
+        for i in remaining:
+            target = targets[i % len(targets)]
+            method, path, body = target
+            start = time.monotonic()
+            try:
+                async with session.request(method, base_url + path, data=body) as r:
+                    await r.read()
+            except (ClientError, asyncio.TimeoutError) as e:
+                result.record(target, start, error=e.__class__.__name__)
+            else:
+                result.record(target, start, status=r.status)
+
+    start = time.monotonic()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    result.elapsed = time.monotonic() - start
+    return result
+
+
+class BenchServer:
+    """
+    App running in a dev server process started the same way the watcher starts it.
+    """
+    def __init__(self, config: Config, loop: asyncio.AbstractEventLoop):
+        self._config = config
+        self._loop = loop
+        self._sock = None
+        self._conn = None
+        self._ready = None
+        self.process = None
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(url_host(self._sock.getsockname()[0]), self._config.main_port)
+
+    async def start(self):
+        self._sock = await create_main_socket(self._config, self._loop)
+        if not self._config.main_port:
+            # bound to any free port
+            self._config.main_port = self._sock.getsockname()[1]
+        self._conn, child_conn = Pipe()
+        # a fresh interpreter like the watcher's, so nothing imported here is shared with the app
+        self.process = get_context('spawn').Process(target=serve_main_app,
+                                                    args=(self._config, None, self._sock, child_conn))
+        self.process.start()
+        child_conn.close()
+        self._ready = self._loop.create_future()
+        self._loop.add_reader(self._conn.fileno(), self._read_control)
+        await self._ready
+
+    def _read_control(self):
+        try:
+            kind, payload = self._conn.recv()
+        except (EOFError, OSError):
+            self._loop.remove_reader(self._conn.fileno())
+            if not self._ready.done():
+                self._ready.set_exception(SanicDevException('dev server exited before it was ready'))
+            return
+        # route and module reports are read so the pipe doesn't fill up, they're not needed
+        if self._ready.done():
+            return
+        if kind == 'ready':
+            self._ready.set_result(payload)
+        elif kind == 'failed':
+            self._ready.set_exception(SanicDevException('app failed to start: {}'.format(payload['error'])))
+
+    async def stop(self):
+        if self._conn:
+            self._loop.remove_reader(self._conn.fileno())
+            self._conn.close()
+        if self.process and self.process.is_alive():
+            os.kill(self.process.pid, signal.SIGINT)
+            timeout = self._config.drain_timeout + self._config.shutdown_timeout
+            if not await wait_for_exit(self.process, self._loop, timeout):
+                logger.warning('dev server has not terminated, sending SIGKILL')
+                os.kill(self.process.pid, signal.SIGKILL)
+                await wait_for_exit(self.process, self._loop, 1)
+        if self._sock:
+            self._sock.close()
+
+
+async def bench(url: str, targets: List[Target], *, requests: int, concurrency: int, timeout: float,
+                warmup: int=0, pid: Optional[int]=None, loop=None) -> dict:
+    """
+    Load test the app at url, with the resources used by process pid if it's known.
+    """
+    connector = TCPConnector(limit=concurrency, loop=loop)
+    async with ClientSession(connector=connector, timeout=ClientTimeout(total=timeout), loop=loop) as session:
+        if warmup:
+            await send_requests(session, url, targets, warmup, concurrency)
+        usage_before = pid and process_usage(pid)
+        result = await send_requests(session, url, targets, requests, concurrency)
+        usage_after = pid and process_usage(pid)
+
+    summary = OrderedDict([('url', url), ('concurrency', concurrency)])
+    summary.update(result.as_dict())
+    server = None
+    if usage_before and usage_after:
+        cpu = usage_after['cpu'] - usage_before['cpu']
+        server = OrderedDict([
+            ('pid', pid),
+            ('rss', usage_after['rss']),
+            ('peak_rss', usage_after['peak_rss']),
+            ('cpu', cpu),
+            ('cpu_percent', cpu / result.elapsed * 100 if result.elapsed else 0),
+        ])
+    summary['server'] = server
+    return summary
+
+
+def run_bench(config: Optional[Config], targets: List[Target], *, url: str=None, pid: int=None, **kwargs) -> dict:
+    """
+    Start the app described by config in a dev server process and load test it, or if url is given load test
+    an app which is already running.
+    """
+    loop = asyncio.get_event_loop()
+    server = None
+    try:
+        if url is None:
+            server = BenchServer(config, loop)
+            logger.debug('starting dev server on port %s', config.main_port)
+            loop.run_until_complete(server.start())
+            url, pid = server.url, server.process.pid
+        logger.info('sending %d requests to %s with %d connections...', kwargs['requests'], url,
+                    kwargs['concurrency'])
+        return loop.run_until_complete(bench(url.rstrip('/'), targets, pid=pid, loop=loop, **kwargs))
+    finally:
+        if server:
+            loop.run_until_complete(server.stop())
+
+
+def compare_baseline(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Regressions of result against a baseline result, each one a description. Throughput, p99 latency and error
+    rate regress when they're worse by more than tolerance percent, the error rate also when it's up by more than
+    ERROR_RATE_ALLOWANCE.
+    """
+    regressions = []
+    factor = tolerance / 100
+    if result['throughput'] < baseline['throughput'] * (1 - factor):
+        regressions.append('throughput {:0.0f} requests/s, baseline {:0.0f} requests/s'.format(
+            result['throughput'], baseline['throughput']))
+    latency, baseline_latency = result.get('latency_ms'), baseline.get('latency_ms')
+    if latency and baseline_latency and latency['p99'] > baseline_latency['p99'] * (1 + factor):
+        regressions.append('p99 latency {:0.2f}ms, baseline {:0.2f}ms'.format(latency['p99'],
+                                                                             baseline_latency['p99']))
+    error_rate = baseline['error_rate']
+    if result['error_rate'] > max(error_rate * (1 + factor), error_rate + ERROR_RATE_ALLOWANCE):
+        regressions.append('error rate {:0.2%}, baseline {:0.2%}'.format(result['error_rate'],
+                                                                        baseline['error_rate']))
+    return regressions
+
+
+def load_baseline(path: str) -> dict:
+    """
+    Read the result of an earlier run, raises SanicDevException if it isn't one.
+    """
+    try:
+        with open(path) as f:
+            baseline = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SanicDevException('unable to read baseline {}: {}'.format(path, e))
+    if not isinstance(baseline, dict):
+        raise SanicDevException('baseline {} is not a bench result'.format(path))
+    numbers = (int, float)
+    invalid = [k for k in ('throughput', 'error_rate') if not isinstance(baseline.get(k), numbers)]
+    latency = baseline.get('latency_ms')
+    if latency is not None and not (isinstance(latency, dict) and isinstance(latency.get('p99'), numbers)):
+        invalid.append('latency_ms')
+    if invalid:
+        raise SanicDevException('baseline {} is not a bench result, invalid or missing: {}'.format(
+            path, ', '.join(invalid)))
+    return baseline
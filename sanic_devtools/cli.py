@@ -1,3 +1,4 @@
+import json
 import sys
 import traceback
 from pathlib import Path
@@ -7,10 +8,16 @@ import click
 
 from .exceptions import SanicDevException
 from .log import main_logger, setup_logging
-from .config import INFER_HOST, DEFAULT_PORT
+from .config import (INFER_HOST, DEFAULT_PORT, DEFAULT_RELOAD_DELAY, DEFAULT_RELOAD_STORM_LIMIT,
+                     DEFAULT_SHUTDOWN_TIMEOUT, DEFAULT_DRAIN_TIMEOUT, DEFAULT_PROXY_QUEUE_SIZE, DEFAULT_PROXY_TIMEOUT,
+                     MAX_TRACE_FRAMES, DEFAULT_BLOCK_THRESHOLD, DEFAULT_UNIX_MODE, RELOAD_MODES, DEFAULT_BENCH_REQUESTS,
+                     DEFAULT_BENCH_CONCURRENCY, DEFAULT_BENCH_TIMEOUT, DEFAULT_BENCH_TOLERANCE, Config)
+from .bench import compare_baseline, load_baseline, parse_targets, run_bench
+from .loops import LOOP_CHOICES
 from .main import runserver as _runserver
 from .main import run_app
 from .version import VERSION
+from .watchers import WATCHER_BACKENDS
 
 
 DEFAULT_COOKIECUTTER_SRC = "https://github.com/harshanarayana/cookiecutter-sanic.git"
@@ -29,8 +36,9 @@ def cli():
 
 verbose_help = 'Enable verbose output.'
 root_help = 'Root directory project used to qualify other paths. env variable: AIO_ROOT'
-host_help = ('host used when referencing livereload and static files, if blank host is taken from the request header '
-             'with default of localhost. env variable AIO_HOST')
+host_help = ('host the dev server listens on and used when referencing livereload and static files, if blank the dev '
+             'server listens on 127.0.0.1 and host is taken from the request header with default of localhost. '
+             'env variable AIO_HOST')
 app_factory_help = ('name of the app factory to create an sanic.app.Sanic with, if missing default app-factory '
                     'names are tried. This can be either a function with signature '
                     '"def create_app(loop): -> Application" or "def create_app(): -> Application" '
@@ -39,8 +47,80 @@ port_help = 'Port to serve app from, default 8000. env variable: AIO_PORT'
 aux_port_help = 'Port to serve auxiliary app (reload, etc.) on, default port + 1. env variable: AIO_AUX_PORT'
 protocol_help = 'app web protocol, HttpProtocol or WebSocketProtocol'
 backlog_help = 'a number of unaccepted connections that the system will allow before refusing new connections'
-workers_help = 'sanic workers that will be spawned'
+workers_help = ('dev server processes to run, sharing the port. Reloads restart them one at a time so requests are '
+                'always served. default 1')
 access_log_help = 'Enables writing access logs'
+standby_help = ('keep a spare process with the app\'s dependencies already imported, '
+                'so restarts only reload the project\'s own modules. env variable: AIO_STANDBY')
+preload_help = ('fork dev server processes from a server which has imported sanic and the app\'s other stable '
+                'modules once, rather than spawning a fresh interpreter on every restart. env variable: AIO_PRELOAD')
+preload_module_help = 'extra module to import in the preload server, may be given multiple times'
+reload_delay_help = ('seconds without further changes to wait before restarting, changes made within this window '
+                     'are coalesced into one restart, default 0.1. env variable: AIO_RELOAD_DELAY')
+reload_storm_limit_help = ('pause reloads while more than this many files change at once, '
+                           'eg. during a git checkout, default 100. env variable: AIO_RELOAD_STORM_LIMIT')
+import_graph_help = ('only restart when a changed python file is imported by the app or new in one of its packages, '
+                     'default on. env variable: AIO_IMPORT_GRAPH')
+reload_mode_help = ('"restart" restarts the dev server process on changes, "hot" reloads changed modules and '
+                    'rebuilds the app\'s routes inside the running process, falling back to a restart when that '
+                    'isn\'t safe. default restart. env variable: AIO_RELOAD_MODE')
+watcher_help = ('how to watch for file changes, "inotify" (linux only), "poll" or "auto" to use inotify where '
+                'available. default auto. env variable: AIO_WATCHER')
+ignore_help = ('glob of files or directories to ignore, matched against names and paths relative to the watched '
+               'directory, may be given multiple times. VCS, virtualenv, cache and node_modules directories are '
+               'always ignored')
+watch_ext_help = 'only watch files with this extension, may be given multiple times. default all files'
+shutdown_timeout_help = ('seconds to wait for the dev server to shut down, on top of --drain-timeout, before '
+                         'killing it, default 5. env variable: AIO_SHUTDOWN_TIMEOUT')
+drain_timeout_help = ('seconds requests in progress are given to finish when the dev server stops or restarts before '
+                      'they\'re aborted, idle connections are closed straight away. default 3. '
+                      'env variable: AIO_DRAIN_TIMEOUT')
+livereload_help = ('whether to inject the livereload script into html responses and reload browsers on changes, '
+                   'default on. env variable: AIO_LIVERELOAD')
+static_help = 'Path of static files to serve from the aux app, relative to the root. env variable: AIO_STATIC_STATIC'
+static_url_help = 'URL path to serve static files from, default "/static/". env variable: AIO_STATIC_URL'
+proxy_help = ('forward requests to the aux port on to the app, holding them while the dev server restarts rather '
+              'than failing them. The aux app\'s own routes move under /_sanic_devtools/. env variable: AIO_PROXY')
+proxy_queue_size_help = ('requests to hold while the dev server restarts before rejecting new ones, default 100. '
+                         'env variable: AIO_PROXY_QUEUE_SIZE')
+proxy_timeout_help = ('seconds a request is held waiting for the dev server to restart, default 30. '
+                      'env variable: AIO_PROXY_TIMEOUT')
+warmup_help = ('after each reload replay this many of the most frequent recent GET requests seen by the proxy '
+               'before reporting the reload complete, default 0. env variable: AIO_WARMUP')
+profile_requests_help = ('profile the first N requests after each reload with cProfile, results are served by the '
+                         'aux app at /profile. env variable: AIO_PROFILE_REQUESTS')
+trace_malloc_help = ('trace memory allocations of the dev server with tracemalloc keeping N frames of traceback, '
+                     '1 is the cheapest, at most {}. Snapshots are taken and compared from the aux app at '
+                     '/memory. default 0 (off). env variable: AIO_TRACE_MALLOC'.format(MAX_TRACE_FRAMES))
+snapshot_requests_help = ('with --trace-malloc also take a snapshot every N requests, default 0 (off). '
+                          'env variable: AIO_SNAPSHOT_REQUESTS')
+loop_monitor_help = ('measure the dev server\'s event loop lag and log whatever blocks it for longer than '
+                     '--block-threshold along with its stack, stats are served by the aux app at /metrics/loop. '
+                     'env variable: AIO_LOOP_MONITOR')
+block_threshold_help = ('seconds the event loop has to be blocked for to be reported by --loop-monitor, default 0.1. '
+                        'env variable: AIO_BLOCK_THRESHOLD')
+loop_help = ('event loop for the dev server and aux app: "asyncio", "uvloop" or "auto" to use uvloop where it\'s '
+             'installed. default auto. env variable: AIO_LOOP')
+unix_help = ('serve the app on a unix socket at this path rather than on --port, a stale socket file is replaced. '
+             'env variable: AIO_UNIX')
+unix_mode_help = 'permissions of the --unix socket file, default 660. env variable: AIO_UNIX_MODE'
+fd_help = ('serve the app on an already bound socket inherited as this file descriptor, eg. from systemd, rather '
+           'than on --port. env variable: AIO_FD')
+bench_port_help = 'Port to serve the app from while benchmarking it, default any free port'
+url_help = 'URL of an app which is already running to benchmark rather than starting app-path'
+pid_help = 'process id of the app at --url, to report its memory and cpu usage'
+route_help = ('path to request, optionally preceded by a method, eg. "POST /items", may be given multiple times. '
+              'default "/"')
+request_file_help = ('file of requests to send, one per line as "[METHOD] /path [body]", requests are sent in turn '
+                     'along with any --route')
+requests_help = 'requests to send, default {}'.format(DEFAULT_BENCH_REQUESTS)
+concurrency_help = 'concurrent connections to send requests over, default {}'.format(DEFAULT_BENCH_CONCURRENCY)
+bench_warmup_help = 'requests to send before measuring, default 0'
+timeout_help = 'seconds before a request fails, default {}'.format(DEFAULT_BENCH_TIMEOUT)
+output_help = 'file to write the results to as json as well as printing them'
+baseline_help = 'results of an earlier run to compare with, fails if throughput, latency or error rate regress'
+tolerance_help = ('percent the results may be worse than --baseline by before failing, default {}'.format(
+                  DEFAULT_BENCH_TOLERANCE))
 template_src_help = 'provide your own cookiecutter template src, otherwise the default one will be used'
 output_dir_help = 'where to output the generated sanic project dir into'
 
@@ -55,8 +135,48 @@ output_dir_help = 'where to output the generated sanic project dir into'
 @click.option('--aux-port', 'aux_port', envvar='AIO_AUX_PORT', type=click.INT, help=aux_port_help)
 @click.option('--protocol', 'protocol', envvar='PROTOCOL', default='http', help=protocol_help)
 @click.option('--backlog', 'backlog', envvar='BACKLOG', default=100, type=click.INT, help=backlog_help)
-@click.option('--workers', 'workers', envvar='WORKERS', default=1, type=click.INT, help=workers_help)
+@click.option('--workers', 'workers', envvar='WORKERS', default=1, type=click.IntRange(1), help=workers_help)
 @click.option('--access-log', is_flag=True, help=access_log_help)
+@click.option('--standby', is_flag=True, envvar='AIO_STANDBY', help=standby_help)
+@click.option('--preload', is_flag=True, envvar='AIO_PRELOAD', help=preload_help)
+@click.option('--preload-module', 'preload_modules', multiple=True, help=preload_module_help)
+@click.option('--reload-delay', default=DEFAULT_RELOAD_DELAY, envvar='AIO_RELOAD_DELAY', type=click.FLOAT,
+              help=reload_delay_help)
+@click.option('--reload-storm-limit', default=DEFAULT_RELOAD_STORM_LIMIT, envvar='AIO_RELOAD_STORM_LIMIT',
+              type=click.INT, help=reload_storm_limit_help)
+@click.option('--import-graph/--no-import-graph', default=True, envvar='AIO_IMPORT_GRAPH', help=import_graph_help)
+@click.option('--reload-mode', default='restart', envvar='AIO_RELOAD_MODE', type=click.Choice(RELOAD_MODES),
+              help=reload_mode_help)
+@click.option('--watcher', default='auto', envvar='AIO_WATCHER', type=click.Choice(WATCHER_BACKENDS), help=watcher_help)
+@click.option('--ignore', multiple=True, help=ignore_help)
+@click.option('--watch-ext', 'watch_extensions', multiple=True, help=watch_ext_help)
+@click.option('--shutdown-timeout', default=DEFAULT_SHUTDOWN_TIMEOUT, envvar='AIO_SHUTDOWN_TIMEOUT', type=click.FLOAT,
+              help=shutdown_timeout_help)
+@click.option('--drain-timeout', default=DEFAULT_DRAIN_TIMEOUT, envvar='AIO_DRAIN_TIMEOUT', type=click.FLOAT,
+              help=drain_timeout_help)
+@click.option('-s', '--static', 'static_path', envvar='AIO_STATIC_STATIC', type=_dir_existing, help=static_help)
+@click.option('--static-url', envvar='AIO_STATIC_URL', default='/static/', help=static_url_help)
+@click.option('--proxy', is_flag=True, envvar='AIO_PROXY', help=proxy_help)
+@click.option('--proxy-queue-size', default=DEFAULT_PROXY_QUEUE_SIZE, envvar='AIO_PROXY_QUEUE_SIZE', type=click.INT,
+              help=proxy_queue_size_help)
+@click.option('--proxy-timeout', default=DEFAULT_PROXY_TIMEOUT, envvar='AIO_PROXY_TIMEOUT', type=click.FLOAT,
+              help=proxy_timeout_help)
+@click.option('--warmup', default=0, envvar='AIO_WARMUP', type=click.INT, help=warmup_help)
+@click.option('--profile-requests', default=0, envvar='AIO_PROFILE_REQUESTS', type=click.INT,
+              help=profile_requests_help)
+@click.option('--trace-malloc', default=0, envvar='AIO_TRACE_MALLOC', type=click.IntRange(0, MAX_TRACE_FRAMES),
+              help=trace_malloc_help)
+@click.option('--snapshot-requests', default=0, envvar='AIO_SNAPSHOT_REQUESTS', type=click.INT,
+              help=snapshot_requests_help)
+@click.option('--loop-monitor', is_flag=True, envvar='AIO_LOOP_MONITOR', help=loop_monitor_help)
+@click.option('--block-threshold', default=DEFAULT_BLOCK_THRESHOLD, envvar='AIO_BLOCK_THRESHOLD', type=click.FLOAT,
+              help=block_threshold_help)
+@click.option('--unix', envvar='AIO_UNIX', help=unix_help)
+@click.option('--unix-mode', default='{:o}'.format(DEFAULT_UNIX_MODE), envvar='AIO_UNIX_MODE', help=unix_mode_help)
+@click.option('--fd', envvar='AIO_FD', type=click.INT, help=fd_help)
+@click.option('--loop', 'event_loop', default='auto', envvar='AIO_LOOP', type=click.Choice(LOOP_CHOICES),
+              help=loop_help)
+@click.option('--livereload/--no-livereload', default=True, envvar='AIO_LIVERELOAD', help=livereload_help)
 @click.option('-v', '--verbose', is_flag=True, help=verbose_help)
 def runserver(**config):
     """
@@ -80,6 +200,63 @@ def runserver(**config):
         sys.exit(2)
 
 
+@cli.command()
+@click.argument('app-path', envvar='AIO_APP_PATH', type=_file_dir_existing, required=False)
+@click.option('--app-factory', 'app_factory_name', envvar='AIO_APP_FACTORY', help=app_factory_help)
+@click.option('-p', '--port', 'main_port', default=0, type=click.INT, help=bench_port_help)
+@click.option('--url', help=url_help)
+@click.option('--pid', type=click.INT, help=pid_help)
+@click.option('--route', 'routes', multiple=True, help=route_help)
+@click.option('--request-file', type=click.Path(exists=True, dir_okay=False), help=request_file_help)
+@click.option('-n', '--requests', default=DEFAULT_BENCH_REQUESTS, type=click.IntRange(1), help=requests_help)
+@click.option('-c', '--concurrency', default=DEFAULT_BENCH_CONCURRENCY, type=click.IntRange(1),
+              help=concurrency_help)
+@click.option('--warmup', default=0, type=click.IntRange(0), help=bench_warmup_help)
+@click.option('--timeout', default=DEFAULT_BENCH_TIMEOUT, type=click.FLOAT, help=timeout_help)
+@click.option('-o', '--output', type=click.Path(dir_okay=False, writable=True), help=output_help)
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help=baseline_help)
+@click.option('--tolerance', default=DEFAULT_BENCH_TOLERANCE, type=click.FLOAT, help=tolerance_help)
+@click.option('--loop', 'event_loop', default='auto', envvar='AIO_LOOP', type=click.Choice(LOOP_CHOICES),
+              help=loop_help)
+@click.option('-v', '--verbose', is_flag=True, help=verbose_help)
+def bench(**config):
+    """
+    Load test an Sanic app and print the throughput, latency percentiles and error rate as json.
+
+    The app at "app-path" is started in a dev server process like runserver does, or with "--url" an app which is
+    already running is used. With "--baseline" the command fails if the results are worse than an earlier run's.
+    """
+    setup_logging(config['verbose'])
+    try:
+        targets = parse_targets(config['routes'], config['request_file'])
+        baseline = config['baseline'] and load_baseline(config['baseline'])
+        app_config = None
+        if not config['url']:
+            app_config = Config(app_path=config['app_path'] or '.', app_factory_name=config['app_factory_name'],
+                                main_port=config['main_port'], event_loop=config['event_loop'], livereload=False,
+                                verbose=config['verbose'])
+        result = run_bench(app_config, targets, url=config['url'], pid=config['pid'], requests=config['requests'],
+                           concurrency=config['concurrency'], timeout=config['timeout'], warmup=config['warmup'])
+    except SanicDevException as e:
+        if config['verbose']:
+            tb = click.style(traceback.format_exc().strip('\n'), fg='white', dim=True)
+            main_logger.warning('SanicDevException traceback:\n%s', tb)
+        main_logger.error('Error: %s', e)
+        sys.exit(2)
+
+    output = json.dumps(result, indent=2)
+    click.echo(output)
+    if config['output']:
+        with open(config['output'], 'w') as f:
+            f.write(output + '\n')
+    if baseline:
+        regressions = compare_baseline(result, baseline, config['tolerance'])
+        for regression in regressions:
+            main_logger.error('regression: %s', regression)
+        if regressions:
+            sys.exit(1)
+
+
 @cli.command()
 @click.option('--template-src', 'template_src', default=DEFAULT_COOKIECUTTER_SRC, envvar='SANIC_TEMPLATE_SRC', help=template_src_help)
 @click.option('--output-dir', 'output_dir', default='.', envvar='SANIC_APP_OUTPUT_DIR', help=output_dir_help)
@@ -1,13 +1,17 @@
 import asyncio
 import inspect
+import os
 import re
 import sys
+from collections import OrderedDict
 from importlib import import_module
 from pathlib import Path
 from sanic.app import Sanic
 
 from .exceptions import SanicDevConfigError
+from .imports import importable_from, parse_module, stable_imports, top_level_names
 from .log import rs_dft_logger as logger
+from .loops import LOOP_CHOICES
 
 
 STD_FILE_NAMES = [
@@ -22,8 +26,27 @@ APP_FACTORY_NAMES = [
     'create_app',
 ]
 
+RELOAD_MODES = 'restart', 'hot'
+
 INFER_HOST = '<inference>'
 DEFAULT_PORT = 8000
+DEFAULT_RELOAD_DELAY = 0.1
+DEFAULT_RELOAD_STORM_LIMIT = 100
+DEFAULT_SHUTDOWN_TIMEOUT = 5
+DEFAULT_DRAIN_TIMEOUT = 3
+DEFAULT_PROXY_QUEUE_SIZE = 100
+DEFAULT_PROXY_TIMEOUT = 30
+# with the proxy the app's routes are served on the aux port, so devtools' own routes move under this prefix
+PROXY_AUX_PREFIX = '/_sanic_devtools'
+# every frame tracemalloc keeps makes allocations slower and traces bigger, so the traceback depth is capped
+MAX_TRACE_FRAMES = 32
+DEFAULT_BLOCK_THRESHOLD = 0.1
+DEFAULT_UNIX_MODE = 0o660
+DEFAULT_BENCH_REQUESTS = 10000
+DEFAULT_BENCH_CONCURRENCY = 50
+DEFAULT_BENCH_TIMEOUT = 10
+# percent throughput, latency or error rate may be worse than the baseline by before bench fails
+DEFAULT_BENCH_TOLERANCE = 10
 
 
 class Config:
@@ -39,7 +62,35 @@ class Config:
         protocol: str=None,
         workers: int=1,
         backlog: int=100,
-        access_log: bool=False):
+        access_log: bool=False,
+        standby: bool=False,
+        preload: bool=False,
+        preload_modules: list=None,
+        reload_delay: float=DEFAULT_RELOAD_DELAY,
+        reload_storm_limit: int=DEFAULT_RELOAD_STORM_LIMIT,
+        import_graph: bool=True,
+        reload_mode: str='restart',
+        watcher: str='auto',
+        ignore: list=None,
+        watch_extensions: list=None,
+        shutdown_timeout: float=DEFAULT_SHUTDOWN_TIMEOUT,
+        drain_timeout: float=DEFAULT_DRAIN_TIMEOUT,
+        livereload: bool=True,
+        static_path: str=None,
+        static_url: str='/static/',
+        proxy: bool=False,
+        proxy_queue_size: int=DEFAULT_PROXY_QUEUE_SIZE,
+        proxy_timeout: float=DEFAULT_PROXY_TIMEOUT,
+        warmup: int=0,
+        profile_requests: int=0,
+        trace_malloc: int=0,
+        snapshot_requests: int=0,
+        loop_monitor: bool=False,
+        block_threshold: float=DEFAULT_BLOCK_THRESHOLD,
+        event_loop: str='auto',
+        unix: str=None,
+        unix_mode: int=DEFAULT_UNIX_MODE,
+        fd: int=None):
         if root_path:
             self.root_path = Path(root_path).resolve()
             logger.debug('Root path specified: %s', self.root_path)
@@ -57,6 +108,36 @@ class Config:
 
         self.py_file = self._resolve_path(str(self.app_path), 'is_file', 'app-path')
         self.python_path = self._resolve_path(python_path, 'is_dir', 'python-path') or self.root_path
+        self.static_path = self._resolve_path(static_path, 'is_dir', 'static-path')
+        self.static_url = static_url
+        self.proxy = proxy
+        self.aux_prefix = PROXY_AUX_PREFIX if proxy else ''
+        self.proxy_queue_size = proxy_queue_size
+        self.proxy_timeout = proxy_timeout
+        self.warmup = warmup
+        self.profile_requests = profile_requests
+        if not 0 <= trace_malloc <= MAX_TRACE_FRAMES:
+            raise SanicDevConfigError('trace-malloc should be between 0 and {} frames, not {}'.format(
+                MAX_TRACE_FRAMES, trace_malloc))
+        self.trace_malloc = trace_malloc
+        self.snapshot_requests = snapshot_requests
+        self.loop_monitor = loop_monitor
+        self.block_threshold = block_threshold
+        if event_loop not in LOOP_CHOICES:
+            raise SanicDevConfigError('Unknown loop "{}", should be one of: {}'.format(
+                event_loop, ', '.join(LOOP_CHOICES)))
+        self.event_loop = event_loop
+        if unix and fd is not None:
+            raise SanicDevConfigError('unix and fd are mutually exclusive, the dev server listens on one socket')
+        self.unix = unix and os.path.abspath(unix)
+        try:
+            # an int like AppRunner takes, or octal as given on the command line
+            self.unix_mode = int(unix_mode, 8) if isinstance(unix_mode, str) else int(unix_mode)
+        except (TypeError, ValueError):
+            self.unix_mode = None
+        if self.unix_mode is None or not 0 <= self.unix_mode <= 0o777:
+            raise SanicDevConfigError('unix-mode should be octal permissions like "660", not "{}"'.format(unix_mode))
+        self.fd = fd
 
         self.app_factory_name = app_factory_name
         self.infer_host = host == INFER_HOST
@@ -67,6 +148,26 @@ class Config:
         self.workers = workers
         self.backlog = backlog
         self.access_log = access_log
+        self.standby = standby
+        self.preload = preload
+        self.preload_modules = list(preload_modules or [])
+        self.reload_delay = reload_delay
+        self.reload_storm_limit = reload_storm_limit
+        self.import_graph = import_graph
+        if reload_mode not in RELOAD_MODES:
+            raise SanicDevConfigError('Unknown reload mode "{}", should be one of: {}'.format(
+                reload_mode, ', '.join(RELOAD_MODES)))
+        self.reload_mode = reload_mode
+        self.watcher = watcher
+        self.ignore = list(ignore or [])
+        self.shutdown_timeout = shutdown_timeout
+        if drain_timeout < 0:
+            raise SanicDevConfigError('drain-timeout should not be negative, not {}'.format(drain_timeout))
+        self.drain_timeout = drain_timeout
+        self.livereload = livereload
+        self.watch_extensions = [e if e.startswith('.') else '.' + e for e in watch_extensions or []]
+        # modules outside the project imported by the app, populated by import_app_factory
+        self.stable_modules = []
         logger.debug('config loaded:\n%s', self)
 
     def _find_app_path(self, app_path: str) -> Path:
@@ -116,16 +217,59 @@ class Config:
                 raise SanicDevConfigError('{} is not a directory'.format(path))
         return path
 
+    def _module_path(self) -> str:
+        rel_py_file = self.py_file.relative_to(self.python_path)
+        return '.'.join(rel_py_file.with_suffix('').parts)
+
+    def locate_app_factory(self):
+        """
+        Check the app's module and factory exist without running the module, so the watcher process doesn't import
+        the app and all its dependencies only for the dev server process to import them again. Raise
+        SanicDevConfigError where import_app_factory would fail in a way which can be told from the source.
+
+        Sets watch_path and, when they're imported ahead of time by a standby or preload process, stable_modules by
+        following the project's imports statically.
+        """
+        module_path = self._module_path()
+        if not importable_from(module_path, self.python_path):
+            raise SanicDevConfigError('error importing "{}" from "{}": no module named "{}"'.format(
+                module_path, self.python_path, module_path.split('.')[0]))
+        try:
+            tree = parse_module(self.py_file)
+        except (SyntaxError, ValueError) as e:
+            raise SanicDevConfigError('error importing "{}" from "{}": {}'.format(module_path, self.python_path, e))
+
+        names, star_import = top_level_names(tree)
+        if self.app_factory_name is None:
+            try:
+                self.app_factory_name = next(an for an in APP_FACTORY_NAMES if an in names)
+            except StopIteration:
+                if not star_import:
+                    raise SanicDevConfigError('No name supplied and no default app factory '
+                                              'found in {s.py_file.name}'.format(s=self))
+                # the dev server picks the factory once it has imported the module
+                logger.debug('no default app factory defined directly in "%s"', module_path)
+            else:
+                logger.debug('found default attribute "%s" in module "%s"', self.app_factory_name, module_path)
+        elif self.app_factory_name not in names and not star_import:
+            raise SanicDevConfigError('Module "{s.py_file.name}" '
+                                      'does not define a "{s.app_factory_name}" attribute/class'.format(s=self))
+
+        self.watch_path = self.watch_path or self.py_file.parent
+        if self.standby or self.preload:
+            search_paths = list(OrderedDict.fromkeys(Path(p) for p in (self.python_path, self.root_path)))
+            self.stable_modules = stable_imports(self.py_file, module_path, search_paths)
+
     def import_app_factory(self):
         """
         Import attribute/class from from a python module. Raise SanicDevConfigError if the import failed.
 
         :return: (attribute, Path object for directory of file)
         """
-        rel_py_file = self.py_file.relative_to(self.python_path)
-        module_path = '.'.join(rel_py_file.with_suffix('').parts)
+        module_path = self._module_path()
 
         sys.path.append(str(self.python_path))
+        modules_before = set(sys.modules)
         try:
             module = import_module(module_path)
         except ImportError as e:
@@ -133,6 +277,7 @@ class Config:
                                   'from "{}": {}'.format(module_path, self.python_path, e)) from e
 
         logger.debug('successfully loaded "%s" from "%s"', module_path, self.python_path)
+        imported_modules = set(sys.modules) - modules_before
 
         if self.app_factory_name is None:
             try:
@@ -151,8 +296,22 @@ class Config:
                                   'does not define a "{s.app_factory_name}" attribute/class'.format(s=self)) from e
 
         self.watch_path = self.watch_path or Path(module.__file__).parent
+        self.stable_modules = self._find_stable_modules(imported_modules)
         return attr
 
+    def _find_stable_modules(self, names):
+        """
+        Pick the modules which live outside the project, these don't change while developing so are safe to
+        import ahead of time.
+        """
+        project_paths = tuple({os.path.join(str(p), '') for p in (self.root_path, self.python_path, self.watch_path)})
+        stable = []
+        for name in sorted(names):
+            module_file = getattr(sys.modules.get(name), '__file__', None)
+            if module_file and not module_file.startswith(project_paths):
+                stable.append(name)
+        return stable
+
     async def load_app(self, app_factory):
         if isinstance(app_factory, Sanic):
             app = app_factory
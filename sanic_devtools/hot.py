@@ -0,0 +1,135 @@
+import logging
+import os
+import re
+import sys
+import types
+from importlib import reload
+
+from sanic.app import Sanic
+from sanic.blueprints import Blueprint
+
+from .exceptions import SanicDevException
+from .log import rs_dft_logger as logger
+
+# module level values which are recreated by reloading the module, anything else is state we'd throw away
+RELOADABLE_TYPES = (
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.ModuleType,
+    type,
+    str, bytes, int, float, complex, bool, type(None), tuple, frozenset,
+    Blueprint,
+    logging.Logger,
+    type(re.compile('')),
+)
+
+
+class HotReloadError(SanicDevException):
+    pass
+
+
+def project_modules(watch_path) -> dict:
+    """
+    Loaded modules which live under watch_path.
+
+    :return: dict of module file -> module
+    """
+    root = os.path.join(os.path.realpath(str(watch_path)), '')
+    modules = {}
+    for module in list(sys.modules.values()):
+        module_file = getattr(module, '__file__', None)
+        if module_file:
+            module_file = os.path.realpath(module_file)
+            if module_file.startswith(root):
+                modules[module_file] = module
+    return modules
+
+
+def module_dependencies(module, module_names) -> set:
+    """
+    Names of the project modules referenced by module, either directly or by importing one of their attributes.
+    """
+    deps = set()
+    for value in list(vars(module).values()):
+        if isinstance(value, types.ModuleType):
+            name = value.__name__
+        else:
+            name = getattr(value, '__module__', None)
+        if name in module_names and name != module.__name__:
+            deps.add(name)
+    return deps
+
+
+def check_reloadable(module):
+    """
+    Raise HotReloadError if a module holds state at module level which reloading it would replace, eg. an app or
+    a client instance.
+    """
+    for name, value in vars(module).items():
+        if name.startswith('__') or type(value).__module__ == 'typing':
+            continue
+        if isinstance(value, Sanic):
+            raise HotReloadError('"{}" defines the app "{}"'.format(module.__name__, name))
+        if not isinstance(value, RELOADABLE_TYPES):
+            raise HotReloadError('"{}.{}" is a module level {} instance'.format(
+                module.__name__, name, value.__class__.__name__))
+
+
+def reload_order(changed, graph) -> list:
+    """
+    Changed modules and every module depending on them, ordered so each module is reloaded after the modules it
+    imports from.
+
+    :param changed: names of changed modules
+    :param graph: dict of module name -> names of the modules it depends on
+    """
+    dependents = {}
+    for name, deps in graph.items():
+        for dep in deps:
+            dependents.setdefault(dep, set()).add(name)
+
+    to_reload, stack = set(), list(changed)
+    while stack:
+        name = stack.pop()
+        if name not in to_reload:
+            to_reload.add(name)
+            stack.extend(dependents.get(name, ()))
+
+    order = []
+    remaining = {name: graph.get(name, set()) & to_reload for name in to_reload}
+    while remaining:
+        ready = sorted(name for name, deps in remaining.items() if not deps)
+        if not ready:
+            raise HotReloadError('import cycle between {}'.format(', '.join(sorted(remaining))))
+        order.extend(ready)
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+def reload_modules(config, changed_files) -> list:
+    """
+    Reload the modules for changed_files and their dependents in dependency order.
+
+    :return: names of the reloaded modules
+    """
+    modules = project_modules(config.watch_path)
+    changed = set()
+    for path in changed_files:
+        module = modules.get(os.path.realpath(path))
+        if module is None:
+            raise HotReloadError('"{}" is not loaded'.format(path))
+        changed.add(module.__name__)
+
+    by_name = {m.__name__: m for m in modules.values()}
+    graph = {name: module_dependencies(module, by_name) for name, module in by_name.items()}
+    order = reload_order(changed, graph)
+    for name in order:
+        check_reloadable(by_name[name])
+
+    for name in order:
+        logger.debug('reloading "%s"', name)
+        reload(by_name[name])
+    return order
@@ -0,0 +1,158 @@
+import ast
+from importlib.machinery import PathFinder
+from importlib.util import find_spec
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+
+def parse_module(path: Path) -> ast.Module:
+    """
+    Parse a python file without running it, raises SyntaxError.
+    """
+    return ast.parse(path.read_bytes(), filename=str(path))
+
+
+def top_level_names(tree: ast.Module) -> Tuple[Set[str], bool]:
+    """
+    Names a module defines at module level, including inside if, try and with blocks.
+
+    :return: (names, whether a star import means names may be incomplete)
+    """
+    names, star = set(), False
+    nodes = list(tree.body)
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                names.update(assigned_names(target))
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            # "x += 1" and a bare annotation "x: int" don't define x
+            names.update(assigned_names(node.target))
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == '*':
+                    star = True
+                else:
+                    names.add(alias.asname or alias.name.split('.')[0])
+        elif isinstance(node, (ast.If, ast.For, ast.While, ast.With, ast.Try)):
+            for field in ('body', 'orelse', 'finalbody', 'handlers'):
+                nodes.extend(getattr(node, field, []))
+        elif isinstance(node, ast.ExceptHandler):
+            nodes.extend(node.body)
+    return names, star
+
+
+def assigned_names(target: ast.AST) -> List[str]:
+    """
+    Names bound by assigning to target, "a.b = 1" and "a[b] = 1" bind neither a nor b.
+    """
+    if isinstance(target, ast.Name):
+        return [target.id]
+    if isinstance(target, ast.Starred):
+        return assigned_names(target.value)
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return [name for element in target.elts for name in assigned_names(element)]
+    return []
+
+
+def statements(tree: ast.Module):
+    """
+    Every statement in a module including those nested in functions, classes and blocks, skipping expressions
+    which can't contain imports and make up most of the tree.
+    """
+    nodes = list(tree.body)
+    while nodes:
+        node = nodes.pop()
+        yield node
+        for field in ('body', 'orelse', 'finalbody', 'handlers'):
+            nodes.extend(getattr(node, field, ()))
+
+
+def imported_names(tree: ast.Module, module_name: str, is_package: bool=False) -> List[Tuple[str, bool]]:
+    """
+    Absolute names of the modules imported anywhere in a module, for "from a import b" both "a" and "a.b" since
+    b may be a module.
+
+    :return: list of (name, whether it's certainly a module)
+    """
+    package = module_name if is_package else module_name.rpartition('.')[0]
+    names = []
+    for node in statements(tree):
+        if isinstance(node, ast.Import):
+            names.extend((alias.name, True) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package.split('.') if package else []
+                if node.level - 1 > len(parts):
+                    # beyond the top level package, the import would fail
+                    continue
+                base = '.'.join(parts[:len(parts) - node.level + 1] + ([node.module] if node.module else []))
+            else:
+                base = node.module
+            if base:
+                names.append((base, True))
+            names.extend(('{}.{}'.format(base, a.name) if base else a.name, False)
+                         for a in node.names if a.name != '*')
+    return names
+
+
+def find_project_module(name: str, search_paths: List[Path]) -> Optional[Path]:
+    """
+    File of a module which lives in one of search_paths, None if it's found elsewhere or not at all.
+    """
+    parts = name.split('.')
+    for search_path in search_paths:
+        base = search_path.joinpath(*parts)
+        for path in (base.with_suffix('.py'), base / '__init__.py'):
+            if path.is_file():
+                return path
+    return None
+
+
+def stable_imports(py_file: Path, module_name: str, search_paths: List[Path]) -> List[str]:
+    """
+    Follow the imports of a module through the project's modules without running any of them, picking out the
+    modules imported from outside the project. These don't change while developing so are safe to import ahead
+    of time.
+    """
+    stable, checked = set(), set()
+    seen = {str(py_file)}
+    queue = [(py_file, module_name)]
+    while queue:
+        path, name = queue.pop()
+        try:
+            tree = parse_module(path)
+        except (SyntaxError, ValueError, OSError):
+            # reported when the dev server imports the module
+            continue
+        for imported, is_module in imported_names(tree, name, path.name == '__init__.py'):
+            project_path = find_project_module(imported, search_paths)
+            if project_path:
+                if str(project_path) not in seen:
+                    seen.add(str(project_path))
+                    queue.append((project_path, imported))
+            elif is_module and imported not in checked:
+                checked.add(imported)
+                if is_importable(imported):
+                    stable.add(imported)
+    return sorted(stable)
+
+
+def is_importable(name: str) -> bool:
+    """
+    Whether a top level module or package exists, the module itself isn't found since that would mean importing
+    its packages.
+    """
+    try:
+        return find_spec(name.split('.')[0]) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def importable_from(name: str, path: Path) -> bool:
+    """
+    Whether the top level module or package of name can be imported from path, without importing anything.
+    """
+    return PathFinder.find_spec(name.split('.')[0], [str(path)]) is not None
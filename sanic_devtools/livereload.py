@@ -0,0 +1,127 @@
+import json
+
+from sanic.response import HTTPResponse
+from sanic.websocket import ConnectionClosed
+
+from .log import rs_aux_logger as aux_logger
+
+LIVE_RELOAD_PATH = '/livereload'
+LIVE_RELOAD_JS_PATH = '/livereload.js'
+LIVE_RELOAD_PROTOCOL = 'http://livereload.com/protocols/official-7'
+LIVE_RELOAD_SNIPPET = '\n<script src="http://{}:{}{}' + LIVE_RELOAD_JS_PATH + '"></script>\n'
+
+# browser client for the livereload websocket, it speaks enough of the livereload protocol that the livereload
+# browser extensions work with the aux app too
+LIVE_RELOAD_JS = """\
+(function () {
+  'use strict';
+  var src = new URL(document.currentScript.src);
+  // the websocket is served next to the script, under the aux app's prefix if it has one
+  var url = 'ws://' + src.host + src.pathname.replace(/\\.js$/, '');
+  var delay = 500;
+
+  function reloadCss(path) {
+    var links = document.querySelectorAll('link[rel="stylesheet"]');
+    var found = false;
+    for (var i = 0; i < links.length; i++) {
+      var href = new URL(links[i].href);
+      if (path && href.pathname.replace(/^\\//, '') === path.replace(/^\\//, '')) {
+        href.searchParams.set('livereload', Date.now());
+        links[i].href = href.toString();
+        found = true;
+      }
+    }
+    return found;
+  }
+
+  function connect() {
+    var ws = new WebSocket(url);
+    ws.onopen = function () {
+      delay = 500;
+      ws.send(JSON.stringify({command: 'hello', protocols: ['%(protocol)s']}));
+    };
+    ws.onmessage = function (event) {
+      var msg = JSON.parse(event.data);
+      if (msg.command === 'reload' && !(msg.liveCSS && /\\.css$/.test(msg.path) && reloadCss(msg.path))) {
+        window.location.reload();
+      }
+    };
+    ws.onclose = function () {
+      setTimeout(connect, delay);
+      delay = Math.min(delay * 2, 5000);
+    };
+  }
+  connect();
+})();
+""" % {'protocol': LIVE_RELOAD_PROTOCOL}
+
+
+def inject_livereload(app, config):
+    """
+    Add the livereload client script to html responses from the app.
+    """
+    async def livereload_middleware(request, response):
+        if not isinstance(response, HTTPResponse):
+            # streaming responses have already been written
+            return
+        content_type = response.headers.get('Content-Type', response.content_type) or ''
+        if not content_type.startswith('text/html'):
+            return
+        host = config.host
+        if config.infer_host:
+            host = request.headers.get('host', 'localhost').rsplit(':', 1)[0]
+        response.body += LIVE_RELOAD_SNIPPET.format(host, config.aux_port, config.aux_prefix).encode()
+
+    app.register_middleware(livereload_middleware, 'response')
+
+
+class LiveReloadClients:
+    """
+    Browsers connected to the livereload websocket.
+    """
+    def __init__(self):
+        self.sockets = set()
+
+    async def serve(self, ws):
+        try:
+            msg = json.loads(await ws.recv())
+        except (ConnectionClosed, ValueError):
+            return
+        if msg.get('command') != 'hello':
+            aux_logger.warning('unexpected livereload message %s', msg)
+            return
+        await ws.send(json.dumps({
+            'command': 'hello',
+            'protocols': [LIVE_RELOAD_PROTOCOL],
+            'serverName': 'sanic-devtools',
+        }))
+        self.sockets.add(ws)
+        aux_logger.debug('browser connected, %d connected', len(self.sockets))
+        try:
+            while True:
+                # the client only sends "info" messages, which aren't needed
+                await ws.recv()
+        except ConnectionClosed:
+            pass
+        finally:
+            self.sockets.discard(ws)
+            aux_logger.debug('browser disconnected, %d connected', len(self.sockets))
+
+    async def reload(self, path: str=None) -> int:
+        """
+        Prompt connected browsers to reload, stylesheets matching path are swapped in place of a full page reload.
+
+        :return: number of browsers prompted
+        """
+        msg = json.dumps({'command': 'reload', 'path': path or '/', 'liveCSS': True, 'liveImg': True})
+        count = 0
+        for ws in list(self.sockets):
+            try:
+                await ws.send(msg)
+            except ConnectionClosed:
+                self.sockets.discard(ws)
+            else:
+                count += 1
+        if count:
+            aux_logger.info('prompted reload of %s on %d browser%s', path or 'page', count, '' if count == 1 else 's')
+        return count
@@ -0,0 +1,36 @@
+import asyncio
+
+from .exceptions import SanicDevConfigError
+
+LOOP_CHOICES = 'auto', 'asyncio', 'uvloop'
+
+
+def set_loop_policy(choice: str='auto') -> str:
+    """
+    Set the event loop policy for the process, "auto" uses uvloop where it's installed like sanic itself does.
+
+    Sanic sets uvloop's policy as soon as it's imported, so "asyncio" has to put the default policy back. The policy
+    is only replaced if it's not already the right one, so an existing event loop isn't discarded needlessly.
+
+    :return: name of the event loop implementation which will be used
+    """
+    uvloop = None
+    if choice != 'asyncio':
+        try:
+            import uvloop
+        except ImportError:
+            if choice == 'uvloop':
+                raise SanicDevConfigError('uvloop is not installed, install it or use --loop asyncio')
+
+    policy = asyncio.get_event_loop_policy()
+    if uvloop:
+        if not isinstance(policy, uvloop.EventLoopPolicy):
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        return 'uvloop'
+    if type(policy) is not asyncio.DefaultEventLoopPolicy:
+        asyncio.set_event_loop_policy(None)
+    return 'asyncio'
+
+
+def loop_name(loop: asyncio.AbstractEventLoop) -> str:
+    return 'uvloop' if type(loop).__module__.startswith('uvloop') else 'asyncio'
@@ -1,18 +1,27 @@
 import asyncio
 import contextlib
 import os
-from multiprocessing import set_start_method
+import socket
+from multiprocessing import get_all_start_methods, set_forkserver_preload, set_start_method
 
 from .log import rs_dft_logger as logger
 from .config import Config
+from .loops import set_loop_policy
 from .runner import AppRunner
-from .serve import HOST, check_port_open, create_auxiliary_app
-from .watch import AppTask
+from .serve import HOST, create_auxiliary_app, create_main_socket
+from .proxy import RestartProxy
+from .static import StaticFiles
+from .watch import AppTask, StaticTask
 
 
 def run_app(app, port, loop):
     runner = AppRunner(app, HOST, port, loop=loop)
-    loop.run_until_complete(runner.start())
+    try:
+        loop.run_until_complete(runner.start())
+    except Exception:
+        # eg. the aux port is in use, stop whatever the app's before_server_start listeners started
+        loop.run_until_complete(runner.trigger_events(runner.before_stop_events))
+        raise
 
     try:
         loop.run_forever()
@@ -26,39 +35,80 @@ def run_app(app, port, loop):
         logger.debug('shutdown took %0.2fs', loop.time() - start)
 
 
-def runserver(**config_kwargs):
+def set_process_start_method(config: Config):
     """
-    Prepare app ready to run development server.
+    Force a full reload in sub processes so they load an updated version of code, this must be called only once.
 
-    :param config_kwargs: see config.Config for more details
-    :return: tuple (auxiliary app, auxiliary app port, event loop)
+    With "preload" sub processes are forked from a server which has already imported the app's stable modules
+    while the project's own modules are still imported afresh by each process.
     """
-    # force a full reload in sub processes so they load an updated version of code, this must be called only once
+    method = 'spawn'
+    if config.preload:
+        if 'forkserver' in get_all_start_methods():
+            method = 'forkserver'
+        else:  # pragma: no cover
+            logger.warning('forkserver start method not available, falling back to spawn')
     try:
-        set_start_method('spawn')
+        set_start_method(method)
     except RuntimeError as e:
         logger.warning(str(e))
+        return
+
+    if method == 'forkserver':
+        modules = ['sanic_devtools.serve'] + config.preload_modules + config.stable_modules
+        logger.debug('preloading %d modules in forkserver', len(modules))
+        set_forkserver_preload(modules)
 
+
+def runserver(**config_kwargs):
+    """
+    Prepare app ready to run development server.
+
+    :param config_kwargs: see config.Config for more details
+    :return: tuple (auxiliary app, auxiliary app port, event loop)
+    """
     config = Config(**config_kwargs)
-    config.import_app_factory()
+    # the app is only imported by the dev server process, which starts while the aux server does
+    config.locate_app_factory()
+    set_process_start_method(config)
+    # applied again by each dev server process
+    loop_impl = set_loop_policy(config.event_loop)
     loop = asyncio.get_event_loop()
 
-    loop.run_until_complete(check_port_open(config.main_port, loop))
+    sock = loop.run_until_complete(create_main_socket(config, loop))
+    if config.fd is not None and sock.family != socket.AF_UNIX:
+        # requests from the watcher and proxy go to wherever the inherited socket is bound
+        config.main_port = sock.getsockname()[1]
+
+    main_manager = AppTask(config, loop, sock)
+    static_manager = static_files = None
+    if config.static_path:
+        static_files = StaticFiles(config.static_path, config.static_url)
+        static_manager = StaticTask(config.static_path, loop, static_files, main_manager.livereload,
+                                    backend=config.watcher)
 
-    aux_app = create_auxiliary_app()
+    proxy = None
+    if config.proxy:
+        proxy = RestartProxy(main_manager, config.main_port, config.proxy_queue_size, config.proxy_timeout,
+                             host=main_manager.request_host)
 
-    main_manager = AppTask(config, loop)
+    aux_app = create_auxiliary_app(main_manager, static_files, proxy)
 
     async def start(app, loop):
         await main_manager.start(app)
+        if static_manager:
+            await static_manager.start(app)
 
     async def close(app, loop):
+        if static_manager:
+            await static_manager.close(app)
         await main_manager.close(app)
 
-    aux_app.register_listener(start, 'after_server_start')
+    # started before the aux server rather than after it, so the dev server process imports the app meanwhile
+    aux_app.register_listener(start, 'before_server_start')
     aux_app.register_listener(close, 'before_server_stop')
 
     url = 'http://{0.host}:{0.aux_port}'.format(config)
-    logger.info('Starting aux server at %s ◆', url)
+    logger.info('Starting aux server at %s with %s ◆', url, loop_impl)
 
     return aux_app, config.aux_port, loop
@@ -0,0 +1,149 @@
+import linecache
+import os
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from .config import MAX_TRACE_FRAMES
+
+# snapshots kept by the dev server, beyond this the oldest except the startup baseline are dropped
+MAX_SNAPSHOTS = 10
+# how allocations are grouped when comparing snapshots, see tracemalloc.Snapshot.statistics
+GROUP_BY = 'lineno', 'filename', 'traceback'
+
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+class MemoryTracer:
+    """
+    Trace the dev server's memory allocations with tracemalloc, taking snapshots on demand and every N requests
+    so the allocations which grew between two snapshots can be found.
+
+    Snapshots stay in the dev server process, only their summaries and comparisons are sent to the watcher.
+    """
+    def __init__(self, frames: int=1, every: int=0, on_snapshot=None, max_snapshots: int=MAX_SNAPSHOTS):
+        assert 1 <= frames <= MAX_TRACE_FRAMES, frames
+        self.frames = frames
+        self.every = every
+        self.on_snapshot = on_snapshot
+        self.max_snapshots = max_snapshots
+        self.requests = 0
+        self._snapshots = OrderedDict()
+        self._next_id = 1
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        # the baseline everything else is compared to
+        return self.take_snapshot('startup')
+
+    def stop(self):
+        tracemalloc.stop()
+        self._snapshots.clear()
+
+    def take_snapshot(self, label: str) -> dict:
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        traced, peak = tracemalloc.get_traced_memory()
+        info = {
+            'id': self._next_id,
+            'label': label,
+            'time': time.time(),
+            'pid': os.getpid(),
+            'requests': self.requests,
+            'traced': traced,
+            'peak': peak,
+        }
+        self._next_id += 1
+        self._snapshots[info['id']] = snapshot, info
+        if len(self._snapshots) > self.max_snapshots:
+            baseline, *rest = self._snapshots
+            del self._snapshots[rest[0]]
+        return info
+
+    def request_finished(self):
+        self.requests += 1
+        if self.every and self.requests % self.every == 0:
+            info = self.take_snapshot('requests')
+            if self.on_snapshot:
+                self.on_snapshot(info)
+
+    def snapshots(self) -> list:
+        return [info for _, info in self._snapshots.values()]
+
+    def compare(self, first: int=None, second: int=None, limit: int=10, group: str='lineno') -> dict:
+        """
+        Allocations which grew most between two snapshots, by default the latest two.
+
+        :return: dict with the two snapshots' summaries, the total growth and the top limit stats,
+          raises ValueError if a snapshot is unknown
+        """
+        assert group in GROUP_BY, group
+        ids = list(self._snapshots)
+        if second is None:
+            second = ids[-1]
+        if first is None:
+            earlier = [i for i in ids if i < second]
+            if not earlier:
+                raise ValueError('no snapshot before {} to compare it to'.format(second))
+            first = earlier[-1]
+        try:
+            (old, old_info), (new, new_info) = self._snapshots[first], self._snapshots[second]
+        except KeyError as e:
+            raise ValueError('unknown snapshot {}, snapshots: {}'.format(e, ', '.join(map(str, ids))))
+        stats = new.compare_to(old, group)
+        growth = sorted((s for s in stats if s.size_diff > 0), key=lambda s: s.size_diff, reverse=True)
+        return {
+            'first': old_info,
+            'second': new_info,
+            'group': group,
+            'size_diff': sum(s.size_diff for s in stats),
+            'count_diff': sum(s.count_diff for s in stats),
+            'stats': [stat_dict(s, group) for s in growth[:limit]],
+        }
+
+
+def stat_dict(stat: tracemalloc.StatisticDiff, group: str) -> dict:
+    frames = list(stat.traceback)
+    if sys.version_info >= (3, 7):
+        # tracebacks are ordered oldest frame first since 3.7
+        frames.reverse()
+    frame = frames[0]
+    d = {
+        'file': frame.filename,
+        'line': frame.lineno if group != 'filename' else None,
+        'size': stat.size,
+        'size_diff': stat.size_diff,
+        'count': stat.count,
+        'count_diff': stat.count_diff,
+    }
+    if group == 'traceback':
+        d['traceback'] = ['{}:{}'.format(f.filename, f.lineno) for f in frames]
+    return d
+
+
+def format_diff(diff: dict) -> str:
+    """
+    A comparison of snapshots as text, in the style of tracemalloc's own StatisticDiff.__str__.
+    """
+    lines = [
+        'snapshot {first[id]} ({first[label]}, {first[requests]} requests) -> '
+        'snapshot {second[id]} ({second[label]}, {second[requests]} requests): '
+        '{size:+.1f} KiB in {count:+d} blocks'.format(
+            size=diff['size_diff'] / 1024, count=diff['count_diff'], **diff
+        )
+    ]
+    for stat in diff['stats']:
+        location = stat['file'] if stat['line'] is None else '{}:{}'.format(stat['file'], stat['line'])
+        lines.append('{}: size={:.1f} KiB ({:+.1f} KiB), count={} ({:+d})'.format(
+            location, stat['size'] / 1024, stat['size_diff'] / 1024, stat['count'], stat['count_diff']
+        ))
+        for frame in stat.get('traceback', [])[1:]:
+            lines.append('    ' + frame)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,253 @@
+import math
+import time
+from collections import OrderedDict, deque
+
+
+def percentile(values, p):
+    """
+    Nearest rank percentile of a list of values, None if the list is empty.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+class PhaseTimer:
+    """
+    Time consecutive phases of work, each mark records the time since the previous one.
+    """
+    def __init__(self, start: float=None):
+        self.phases = OrderedDict()
+        self._last = time.monotonic() if start is None else start
+
+    def mark(self, phase: str):
+        now = time.monotonic()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    def update(self, phases):
+        """
+        Add phases timed elsewhere, eg. in the dev server process, and carry on timing from now.
+        """
+        self.phases.update(phases)
+        self._last = time.monotonic()
+
+
+class ReloadTimeline(PhaseTimer):
+    """
+    Phases of a single (re)start of the dev server, from the change being detected to the first successful request.
+    """
+    def __init__(self, reload: int, start: float=None):
+        super().__init__(start)
+        self.reload = reload
+        self.time = time.time()
+        # wall clock time the dev server process was started or handed the app, to time interpreter startup
+        self.spawned_at = None
+        # requests replayed to warm up the app with cold and warm latencies
+        self.warmup = []
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def summary(self):
+        phases = ', '.join('{} {:0.0f}ms'.format(k, v * 1000) for k, v in self.phases.items())
+        return '{} {} took {:0.2f}s: {}'.format('reload' if self.reload else 'start', self.reload, self.total, phases)
+
+    def as_dict(self):
+        return {
+            'reload': self.reload,
+            'time': self.time,
+            'total': self.total,
+            'phases': self.phases,
+            'warmup': self.warmup,
+        }
+
+
+class ReloadHistory:
+    """
+    Rolling history of reload timelines with percentiles for each phase.
+    """
+    def __init__(self, maxlen=100):
+        self.timelines = deque(maxlen=maxlen)
+
+    def add(self, timeline: ReloadTimeline):
+        self.timelines.append(timeline)
+
+    def percentiles(self):
+        durations = OrderedDict()
+        for timeline in self.timelines:
+            durations.setdefault('total', []).append(timeline.total)
+            for phase, duration in timeline.phases.items():
+                durations.setdefault(phase, []).append(duration)
+        return OrderedDict(
+            (phase, {'count': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95)})
+            for phase, values in durations.items()
+        )
+
+    def as_dict(self):
+        return {
+            'reloads': [t.as_dict() for t in self.timelines],
+            'phases': self.percentiles(),
+        }
+
+
+class LatencyHistogram:
+    """
+    Fixed size log-linear histogram of latencies in the style of HdrHistogram: values are counted in buckets
+    which are exact below 32µs and then split each power of two into 16, giving percentiles within ~6%.
+    """
+    SUB_BUCKET_BITS = 5
+    SUB_BUCKETS = 1 << (SUB_BUCKET_BITS - 1)
+    # values are clamped to about 67 seconds
+    MAX_VALUE = (1 << 26) - 1
+    BUCKETS = (MAX_VALUE.bit_length() - SUB_BUCKET_BITS) * SUB_BUCKETS + 2 * SUB_BUCKETS
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def bucket_index(cls, value: int) -> int:
+        shift = max(value.bit_length() - cls.SUB_BUCKET_BITS, 0)
+        return shift * cls.SUB_BUCKETS + (value >> shift)
+
+    @classmethod
+    def bucket_value(cls, index: int) -> float:
+        """
+        Middle of the range of values counted in a bucket.
+        """
+        if index < 2 * cls.SUB_BUCKETS:
+            return index
+        shift = (index - cls.SUB_BUCKETS) // cls.SUB_BUCKETS
+        lower = (index - shift * cls.SUB_BUCKETS) << shift
+        return lower + ((1 << shift) - 1) / 2
+
+    def record(self, duration: float):
+        value = min(int(duration * 1e6), self.MAX_VALUE)
+        self.counts[self.bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p) -> float:
+        """
+        Latency in seconds at percentile p, None if nothing has been recorded.
+        """
+        if not self.count:
+            return None
+        if p >= 100:
+            return self.max / 1e6
+        rank = max(math.ceil(p / 100 * self.count), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bucket_value(index), self.max) / 1e6
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def as_dict(self) -> dict:
+        return {
+            'buckets': {i: c for i, c in enumerate(self.counts) if c},
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        histogram = cls()
+        for index, count in data['buckets'].items():
+            histogram.counts[int(index)] = count
+        histogram.count, histogram.total, histogram.max = data['count'], data['total'], data['max']
+        return histogram
+
+
+class RouteHistograms:
+    """
+    Latency histograms for each route and method handled by the dev server.
+    """
+    def __init__(self):
+        self.histograms = {}
+        self.since = time.time()
+        self.count = 0
+
+    def record(self, method: str, route: str, duration: float):
+        key = '{} {}'.format(method, route)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(duration)
+        self.count += 1
+
+    def reset(self):
+        self.__init__()
+
+    def snapshot(self) -> dict:
+        return {
+            'since': self.since,
+            'routes': {key: h.as_dict() for key, h in self.histograms.items()},
+        }
+
+
+class RouteMetrics:
+    """
+    Route latencies reported by the dev server, kept separately for each reload so they can be compared.
+    """
+    def __init__(self, maxlen=10):
+        self.versions = deque(maxlen=maxlen)
+
+    def start_version(self, reload: int):
+        self.versions.append({'reload': reload, 'started': time.time(), 'since': None, 'sources': {}})
+
+    def update(self, snapshot: dict, source=None):
+        """
+        Replace the histograms reported by source, with several workers each reports its own.
+        """
+        version = self.versions[-1]
+        if snapshot['since'] < version['started']:
+            # from before the latest reload
+            return
+        version['since'] = min(version['since'] or snapshot['since'], snapshot['since'])
+        version['sources'][source] = {key: LatencyHistogram.from_dict(h) for key, h in snapshot['routes'].items()}
+
+    def as_dict(self, now: float=None):
+        now = now or time.time()
+        versions = []
+        for i, version in enumerate(self.versions):
+            # throughput is measured until the next reload
+            end = self.versions[i + 1]['started'] if i + 1 < len(self.versions) else now
+            elapsed = max(end - (version['since'] or version['started']), 1e-6)
+            versions.append({
+                'reload': version['reload'],
+                'started': version['started'],
+                'routes': {
+                    key: {
+                        'count': h.count,
+                        'throughput': h.count / elapsed,
+                        'mean': h.total / h.count / 1e6,
+                        'p50': h.percentile(50),
+                        'p90': h.percentile(90),
+                        'p99': h.percentile(99),
+                        'max': h.max / 1e6,
+                    }
+                    for key, h in sorted(self._merge(version['sources']).items())
+                },
+            })
+        return {'reloads': versions}
+
+    @staticmethod
+    def _merge(sources: dict) -> dict:
+        routes = {}
+        for histograms in sources.values():
+            for key, h in histograms.items():
+                routes.setdefault(key, LatencyHistogram()).merge(h)
+        return routes
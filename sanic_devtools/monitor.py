@@ -0,0 +1,136 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from .log import rs_dft_logger as dft_logger
+from .metrics import LatencyHistogram
+
+try:
+    current_task = asyncio.current_task
+except AttributeError:  # pragma: no cover
+    # python < 3.7
+    current_task = asyncio.Task.current_task
+
+# frames kept of the stack of a blocked event loop, innermost first
+BLOCK_STACK_DEPTH = 20
+# frames of the stack shown when logging a block
+BLOCK_LOG_FRAMES = 5
+# distinct blocking stacks kept, further ones are only counted
+MAX_BLOCK_STACKS = 100
+
+
+class LoopMonitor:
+    """
+    Measure how late the event loop runs callbacks and catch whatever blocks it.
+
+    A callback scheduled every threshold / 2 seconds measures the loop's lag, while a watchdog thread captures the
+    stack of the loop's thread when the callback is late, so the code blocking the loop can be reported once it
+    finishes. The request being handled at the time is found from the current task.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold: float):
+        self.loop = loop
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.lag = LatencyHistogram()
+        self.blocks = {}
+        self.block_count = 0
+        self.dropped = 0
+        self.since = time.time()
+        # task -> "METHOD path" of the request it's handling
+        self.requests = {}
+        self._expected = None
+        self._captured = None
+        self._handle = None
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name='sanic-devtools-loop-monitor', daemon=True)
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._schedule(time.monotonic())
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._handle:
+            self._handle.cancel()
+        self._thread.join()
+
+    def request_started(self, request):
+        task = current_task(self.loop)
+        if task is not None:
+            self.requests[task] = '{} {}'.format(request.method, request.path)
+
+    def request_finished(self):
+        self.requests.pop(current_task(self.loop), None)
+
+    def _schedule(self, now):
+        self._expected = now + self.interval
+        self._handle = self.loop.call_later(self.interval, self._tick)
+
+    def _tick(self):
+        now = time.monotonic()
+        lag = max(now - self._expected, 0)
+        self.lag.record(lag)
+        captured, self._captured = self._captured, None
+        if lag >= self.threshold:
+            self._record_block(lag, captured)
+        self._schedule(now)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            expected = self._expected
+            if self._captured is None and time.monotonic() - expected > self.threshold / 2:
+                captured = self._capture()
+                # the loop may have caught up while capturing
+                if expected == self._expected:
+                    self._captured = captured
+
+    def _capture(self):
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:  # pragma: no cover
+            return None
+        stack = [
+            '{}:{} in {}'.format(f.filename, f.lineno, f.name)
+            for f in reversed(traceback.extract_stack(frame, limit=BLOCK_STACK_DEPTH))
+        ]
+        task = current_task(self.loop)
+        return stack, task and self.requests.get(task)
+
+    def _record_block(self, duration: float, captured):
+        stack, request = captured or ([], None)
+        self.block_count += 1
+        key = tuple(stack)
+        block = self.blocks.get(key)
+        if block is None:
+            if len(self.blocks) >= MAX_BLOCK_STACKS:
+                self.dropped += 1
+            else:
+                block = self.blocks[key] = {'stack': stack, 'count': 0, 'total': 0, 'max': 0, 'request': None}
+        if block is not None:
+            block['count'] += 1
+            block['total'] += duration
+            block['max'] = max(block['max'], duration)
+            block['request'] = request or block['request']
+        dft_logger.warning('event loop blocked for %0.0fms%s%s', duration * 1000,
+                           ' handling "{}"'.format(request) if request else '',
+                           ''.join('\n  ' + line for line in stack[:BLOCK_LOG_FRAMES]) or ', stack not captured')
+
+    def snapshot(self) -> dict:
+        lag = self.lag
+        return {
+            'since': self.since,
+            'threshold': self.threshold,
+            'lag': {
+                'count': lag.count,
+                'mean': lag.total / lag.count / 1e6 if lag.count else None,
+                'p50': lag.percentile(50),
+                'p99': lag.percentile(99),
+                'max': lag.max / 1e6,
+            },
+            'block_count': self.block_count,
+            'dropped': self.dropped,
+            'blocks': sorted(self.blocks.values(), key=lambda b: b['total'], reverse=True),
+        }
@@ -0,0 +1,123 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_MODES = 'cprofile', 'sample'
+# seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+# functions listed in the text pstats report
+PSTATS_LINES = 50
+
+
+class StackSampler:
+    """
+    Statistical profiler sampling the stack of a thread from a background thread, it only slows the app down by
+    the cost of taking each sample.
+    """
+    def __init__(self, thread_id: int, interval: float=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sanic-devtools-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """
+        Samples in the "collapsed stack" format used by flamegraph.pl and speedscope.
+        """
+        return ''.join('{} {}\n'.format(stack, count) for stack, count in sorted(self.stacks.items()))
+
+
+class Profiler:
+    """
+    Profile the dev server with cProfile or by sampling stacks.
+
+    With requests set only the handling of that many requests is profiled, on_done is called with the results once
+    they've finished.
+    """
+    def __init__(self, mode: str='cprofile', requests: int=None, on_done=None):
+        assert mode in PROFILE_MODES, mode
+        self.mode = mode
+        self.requests = requests
+        self.on_done = on_done
+        self._handled = 0
+        self._active = 0
+        self._started = None
+        self._profile = None
+        self._sampler = None
+
+    def start(self):
+        self._started = time.monotonic()
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            if self.requests is None:
+                self._profile.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+
+    def request_started(self):
+        if self.requests is not None and self._profile and self._active == 0:
+            self._profile.enable()
+        self._active += 1
+
+    def request_finished(self) -> bool:
+        """
+        :return: True once the requests to profile have all been handled and on_done has been called
+        """
+        self._active -= 1
+        self._handled += 1
+        if self.requests is None:
+            return False
+        if self._profile and self._active == 0:
+            self._profile.disable()
+        if self._handled >= self.requests and self._active == 0:
+            result = self.stop()
+            if self.on_done:
+                self.on_done(result)
+            return True
+        return False
+
+    def stop(self) -> dict:
+        result = {
+            'mode': self.mode,
+            'duration': time.monotonic() - self._started,
+            'requests': self._handled,
+        }
+        if self._profile:
+            self._profile.disable()
+            stream = io.StringIO()
+            stats = pstats.Stats(self._profile, stream=stream)
+            stats.sort_stats('cumulative').print_stats(PSTATS_LINES)
+            result['text'] = stream.getvalue()
+            # the same as Stats.dump_stats, loadable with pstats.Stats or snakeviz once written to a file
+            result['pstats'] = marshal.dumps(stats.stats)
+        else:
+            self._sampler.stop()
+            result['samples'] = sum(self._sampler.stacks.values())
+            result['collapsed'] = self._sampler.collapsed()
+        return result
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import deque
+
+from aiohttp import ClientConnectionError, ClientConnectorError
+from multidict import CIMultiDict
+from sanic.response import HTTPResponse, text
+
+from .config import DEFAULT_PROXY_QUEUE_SIZE, DEFAULT_PROXY_TIMEOUT
+from .log import rs_aux_logger as aux_logger
+from .metrics import percentile
+from .serve import HOST
+from .watch import FAILED, READY
+
+# attempts to forward a request, a request forwarded just as the dev server stops is queued again
+PROXY_ATTEMPTS = 3
+# a request which may have reached the dev server before it stopped is only sent again if repeating it is harmless
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailer', 'trailers',
+    'transfer-encoding', 'upgrade',
+}
+
+
+def full_path(request) -> str:
+    return request.path + ('?' + request.query_string if request.query_string else '')
+
+
+class ProxyStats:
+    def __init__(self, maxlen=1000):
+        self.forwarded = 0
+        self.queued = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.failed = 0
+        self.queue_waits = deque(maxlen=maxlen)
+
+    def as_dict(self):
+        waits = list(self.queue_waits)
+        return {
+            'forwarded': self.forwarded,
+            'queued': self.queued,
+            'replayed': self.replayed,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'failed': self.failed,
+            'queue_wait': {
+                'count': len(waits),
+                'p50': percentile(waits, 50),
+                'p95': percentile(waits, 95),
+                'max': max(waits) if waits else None,
+            },
+        }
+
+
+class RestartProxy:
+    """
+    Forward requests to the dev server, holding them while it restarts rather than failing them.
+
+    Requests are forwarded over the watcher's keep-alive connection pool, while the dev server isn't ready up to
+    queue_size requests wait for it for up to timeout seconds. A request cut off by the dev server stopping is
+    sent again once it's ready, unless it may have been acted on and isn't idempotent.
+    """
+    methods = 'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'
+
+    def __init__(self, app_task, port: int, queue_size: int=DEFAULT_PROXY_QUEUE_SIZE,
+                 timeout: float=DEFAULT_PROXY_TIMEOUT, host: str=HOST):
+        self._app_task = app_task
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.waiting = 0
+        self.stats = ProxyStats()
+
+    async def handle(self, request, path: str=''):
+        queued = False
+        for _ in range(PROXY_ATTEMPTS):
+            if self._app_task.state != READY:
+                if not queued:
+                    if self.waiting >= self.queue_size:
+                        self.stats.rejected += 1
+                        return text('dev server restarting, proxy queue full', status=503)
+                    self.stats.queued += 1
+                    queued = True
+                error = await self._wait_ready()
+                if error:
+                    return error
+            try:
+                response = await self._forward(request)
+            except ClientConnectionError as e:
+                if self._app_task.state == READY:
+                    # the dev server is up, so this isn't a restart
+                    self.stats.failed += 1
+                    return text('error proxying request to dev server: {}'.format(e), status=502)
+                if not isinstance(e, ClientConnectorError) and request.method not in IDEMPOTENT_METHODS:
+                    # the connection was made so the old dev server may have acted on the request already
+                    self.stats.failed += 1
+                    return text('dev server stopped while handling request, not retrying {}'.format(request.method),
+                                status=502)
+                aux_logger.debug('dev server stopped while proxying %s, retrying: %s', request.path, e)
+            else:
+                self._app_task.request_log.record(request.method, full_path(request), response.status)
+                self.stats.forwarded += 1
+                if queued:
+                    self.stats.replayed += 1
+                return response
+        self.stats.failed += 1
+        return text('dev server did not become ready', status=502)
+
+    async def _wait_ready(self):
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            state = await self._app_task.wait_ready(self.timeout)
+        except asyncio.TimeoutError:
+            self.stats.timed_out += 1
+            return text('timed out waiting for dev server to restart', status=504)
+        finally:
+            self.waiting -= 1
+            self.stats.queue_waits.append(time.monotonic() - start)
+        if state == FAILED:
+            self.stats.failed += 1
+            failure = self._app_task.failure or {}
+            return text('dev server failed to start: {}'.format(failure.get('error')), status=502)
+
+    async def _forward(self, request):
+        headers = CIMultiDict((k, v) for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS)
+        headers['X-Forwarded-For'] = request.ip
+        headers['X-Forwarded-Host'] = request.headers.get('host', '')
+        url = 'http://{}:{}{}'.format(self.host, self.port, full_path(request))
+        async with self._app_task.session.request(request.method, url, headers=headers, data=request.body,
+                                                  allow_redirects=False) as r:
+            body = await r.read()
+        response_headers = CIMultiDict(
+            (k, v) for k, v in r.headers.items()
+            if k.lower() not in HOP_BY_HOP_HEADERS and k.lower() != 'content-length'
+        )
+        if request.method == 'HEAD' and 'Content-Length' in r.headers:
+            response_headers['Content-Length'] = r.headers['Content-Length']
+        return HTTPResponse(body_bytes=body, status=r.status, headers=response_headers,
+                            content_type=r.headers.get('Content-Type', 'application/octet-stream'))
@@ -1,9 +1,33 @@
 import asyncio
+import contextlib
+import os
+import time
 from asyncio import Protocol
+from socket import socket
 from ssl import SSLContext
-from sanic.server import serve, HttpProtocol
+from sanic.response import HTTPResponse
+from sanic.server import serve, HttpProtocol, Signal
+from sanic.websocket import WebSocketProtocol
 from typing import Any, Optional, Type, Union
 
+from .config import DEFAULT_DRAIN_TIMEOUT
+from .log import rs_dft_logger as dft_logger
+from .sockets import bind_unix_socket
+
+# requests for this path are answered by the runner itself, so devtools can check the server is responding
+PING_PATH = '/_sanic_devtools/ping'
+# how often close checks whether connections have finished draining
+DRAIN_POLL_INTERVAL = 0.01
+
+
+class ConnectionSet(set):
+    """
+    Set of open connections which is always truthy, HttpProtocol replaces an empty set with its own so the
+    connections wouldn't be shared otherwise.
+    """
+    def __bool__(self):
+        return True
+
 
 class AppRunner:
 
@@ -14,12 +38,16 @@ class AppRunner:
         port: int,
         debug: bool=False,
         ssl: Union[dict, SSLContext, None]=None,
+        sock: Optional[socket]=None,
+        unix: Optional[str]=None,
+        unix_mode: int=0o660,
         workers: int=1,
         protocol: Type[Protocol]=None,
         backlog: int=100,
         register_sys_signals: bool=True,
         access_log: Optional[bool]=None,
         run_async: bool=True,
+        drain_timeout: float=DEFAULT_DRAIN_TIMEOUT,
         loop: asyncio.AbstractEventLoop=None):
 
         self.app = app
@@ -30,18 +58,43 @@ class AppRunner:
         if access_log is not None:
             self.app.config.ACCESS_LOG = access_log
 
+        # path of the unix socket bound by the runner, it's removed on close
+        self.unix = None
+        if unix and sock is None:
+            sock = bind_unix_socket(unix, unix_mode, backlog)
+            self.unix = unix
+
+        # when serving from an existing socket it's already bound, so sanic mustn't be given an address too
         self.server_settings = self.app._helper(
-            host=host,
-            port=port,
+            host=None if sock else host,
+            port=None if sock else port,
             debug=debug,
             ssl=ssl,
+            sock=sock,
             workers=workers,
-            protocol=(protocol or HttpProtocol),
+            protocol=(protocol or (WebSocketProtocol if self.app.websocket_enabled else HttpProtocol)),
             backlog=backlog,
             register_sys_signals=register_sys_signals,
             loop=self.loop,
             run_async=run_async,
         )
+        self.server_settings['request_handler'] = self.handle_request
+        # open connections, added and removed by the protocol, and a signal of our own so that once stopped
+        # responses are sent with "Connection: close" rather than sanic's shared default
+        self.connections = ConnectionSet()
+        self.server_settings['connections'] = self.connections
+        self.server_settings['signal'] = Signal()
+        self.drain_timeout = drain_timeout
+        # requests being handled right now
+        self.active_requests = 0
+        # profiler.Profiler counting requests as they're handled
+        self.profiler = None
+        # metrics.RouteHistograms recording the latency of each request
+        self.route_histograms = None
+        # memory.MemoryTracer snapshotting allocations every N requests
+        self.memory_tracer = None
+        # monitor.LoopMonitor attributing event loop blocks to requests
+        self.loop_monitor = None
         # states
         self.server = None
         self.closed = None
@@ -66,6 +119,49 @@ class AppRunner:
     async def trigger_events(self, events):
         await self.app.trigger_events(events, self.loop)
 
+    async def handle_request(self, request, write_callback, stream_callback):
+        if request.path == PING_PATH:
+            # set by app.handle_request otherwise, sanic's access log needs it
+            request.app = self.app
+            write_callback(HTTPResponse(status=204))
+            return
+        start = time.monotonic()
+        profiler, loop_monitor = self.profiler, self.loop_monitor
+        self.active_requests += 1
+        try:
+            if profiler is None and loop_monitor is None:
+                await self.app.handle_request(request, write_callback, stream_callback)
+            else:
+                if profiler is not None:
+                    profiler.request_started()
+                if loop_monitor is not None:
+                    loop_monitor.request_started(request)
+                try:
+                    await self.app.handle_request(request, write_callback, stream_callback)
+                finally:
+                    if loop_monitor is not None:
+                        loop_monitor.request_finished()
+                    if profiler is not None and profiler.request_finished() and self.profiler is profiler:
+                        self.profiler = None
+        finally:
+            self.active_requests -= 1
+        if self.route_histograms is not None:
+            # uri_template is set by sanic once a route has matched
+            route = getattr(request, 'uri_template', None) or '<unmatched>'
+            self.route_histograms.record(request.method, route, time.monotonic() - start)
+        if self.memory_tracer is not None:
+            self.memory_tracer.request_finished()
+
+    def reload_app(self, app):
+        """
+        Serve requests with the routes, blueprints, middleware and error handler of a freshly loaded app, while
+        keeping the running app object along with anything its listeners set up, eg. connection pools.
+        """
+        for attr in ('router', 'blueprints', '_blueprint_order', 'request_middleware', 'response_middleware',
+                     'named_request_middleware', 'named_response_middleware', 'error_handler'):
+            if hasattr(app, attr):
+                setattr(self.app, attr, getattr(app, attr))
+
     async def start(self):
         # Trigger before_start events
         await self.trigger_events(self.before_start_events)
@@ -76,24 +172,74 @@ class AppRunner:
         # Trigger after_start events
         await self.trigger_events(self.after_start_events)
 
-    async def close(self):
+    async def drain(self) -> dict:
         """
-        Close server.
+        Stop accepting connections, close idle keep-alive connections straight away and give requests in progress
+        until drain_timeout to finish before aborting them.
+
+        :return: dict of the drain's duration, requests which finished and requests which were aborted
+        """
+        start = time.monotonic()
+        in_flight = self.active_requests
+        self.server.close()
+        self.server_settings['signal'].stopped = True
+        deadline = start + self.drain_timeout
+        while True:
+            # connections become idle as their responses are sent, unless the client sent another request first
+            for conn in list(self.connections):
+                if conn.transport is not None:
+                    conn.close_if_idle()
+            if not len(self.connections) or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(DRAIN_POLL_INTERVAL, loop=self.loop)
+
+        aborted = self.active_requests
+        for conn in list(self.connections):
+            if getattr(conn, 'websocket', None):
+                await conn.websocket.close_connection()
+            else:
+                conn.close()
+        if aborted:
+            # let the cancelled handlers run their cleanup before the app's stop listeners
+            await asyncio.sleep(0, loop=self.loop)
+        result = {
+            'duration': time.monotonic() - start,
+            'drained': max(in_flight - aborted, 0),
+            'aborted': aborted,
+        }
+        if aborted:
+            dft_logger.warning('aborted %d request%s still running after %0.1fs, %d finished', aborted,
+                               '' if aborted == 1 else 's', self.drain_timeout, result['drained'])
+        else:
+            dft_logger.debug('drained connections in %0.3fs, %d requests finished', result['duration'],
+                             result['drained'])
+        return result
+
+    async def close(self) -> Optional[dict]:
+        """
+        Close server, draining connections first.
+
+        :return: the result of drain or None if the server wasn't running
         """
         if not self.is_running or self.closed:
-            return
+            return None
 
         # Trigger before_stop events
         await self.trigger_events(self.before_stop_events)
 
         # Stop Server
-        self.server.close()
+        drain_result = await self.drain()
         await self.server.wait_closed()
 
         # Trigger after_stop events
         await self.trigger_events(self.after_stop_events)
 
+        if self.unix:
+            with contextlib.suppress(OSError):
+                os.unlink(self.unix)
+
         self.closed = True
         self.is_running = False
         self.app.is_running = False
+        return drain_result
     
\ No newline at end of file
@@ -1,25 +1,45 @@
 import asyncio
 import contextlib
+import errno
 import json
 import mimetypes
+import signal
+import socket
 import sys
+import time
+import traceback
+from importlib import import_module
 from pathlib import Path
 from typing import Optional
 
 from sanic.app import Sanic
 from sanic.server import serve, HttpProtocol
 from sanic.websocket import WebSocketProtocol
-from sanic.response import json
+from sanic.response import json, raw, text
 
 from .exceptions import SanicDevException
 from .log import rs_aux_logger as aux_logger
 from .log import rs_dft_logger as dft_logger
 from .log import setup_logging
-from .config import Config
+from .config import PROXY_AUX_PREFIX, Config
+from .hot import HotReloadError, project_modules, reload_modules
+from .livereload import LIVE_RELOAD_JS, LIVE_RELOAD_JS_PATH, LIVE_RELOAD_PATH, inject_livereload
+from .loops import loop_name, set_loop_policy
+from .memory import GROUP_BY, MemoryTracer, format_diff
+from .metrics import PhaseTimer, RouteHistograms
+from .monitor import LoopMonitor
+from .profiler import PROFILE_MODES, Profiler
 from .runner import AppRunner
+from .sockets import IN_USE, bind_unix_socket, socket_from_fd, unix_socket_state
 
 
 HOST = "127.0.0.1"
+# how often the dev server checks for modules imported after startup
+MODULE_REPORT_INTERVAL = 1
+# how often the dev server sends route latencies to the watcher
+ROUTE_REPORT_INTERVAL = 2
+# how often the dev server sends event loop lag and blocks to the watcher
+LOOP_REPORT_INTERVAL = 2
 PROTOCOLS = {
     "http": HttpProtocol,
     "websocket": WebSocketProtocol,
@@ -45,6 +65,80 @@ async def check_port_open(port, loop, delay=1):
     raise SanicDevException('The port {} is already is use'.format(port))
 
 
+async def create_main_socket(config: Config, loop, delay=1):
+    """
+    Bind the main app's listening socket in the watcher process, it's handed to each dev server process so
+    the kernel queues new connections in the backlog while the server restarts rather than refusing them.
+
+    The socket is a TCP socket on main_port, a unix socket or one inherited as a file descriptor.
+    """
+    if config.fd is not None:
+        return socket_from_fd(config.fd, config.backlog)
+    address = config.unix or 'port {}'.format(config.main_port)
+    for i in range(5, 0, -1):
+        try:
+            if config.unix:
+                return bind_unix_socket(config.unix, config.unix_mode, config.backlog)
+            return bind_tcp_socket(main_host(config), config.main_port, config.backlog)
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE:  # pragma: no cover
+                raise
+            dft_logger.warning('%s is already in use, waiting %d...', address, i)
+            await asyncio.sleep(delay, loop=loop)
+    if config.unix:
+        raise SanicDevException('{} is already in use'.format(config.unix))
+    raise SanicDevException('The port {} is already in use'.format(config.main_port))
+
+
+def main_host(config: Config) -> str:
+    """
+    Address the main app listens on, loopback unless a host was given.
+    """
+    return HOST if config.infer_host else config.host
+
+
+def url_host(host: str) -> str:
+    """
+    Host used in urls by the watcher, proxy and bench to reach the main app listening on host, a wildcard address
+    is reached over loopback.
+    """
+    if host in ('', '0.0.0.0'):
+        return HOST
+    if host == '::':
+        return '[::1]'
+    return '[{}]'.format(host) if ':' in host else host
+
+
+def bind_tcp_socket(host: str, port: int, backlog: int) -> socket.socket:
+    try:
+        # the address family follows the host, eg. "::" is IPv6
+        family, _, _, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM,
+                                                      flags=socket.AI_PASSIVE)[0]
+    except socket.gaierror as e:
+        raise SanicDevException('unable to resolve host "{}": {}'.format(host, e))
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind(address)
+    except OSError:
+        sock.close()
+        raise
+    sock.listen(backlog)
+    return sock
+
+
+async def check_unix_socket(path, loop, delay=1):
+    """
+    Like check_port_open for a unix socket, a stale socket file counts as free since it's replaced when binding.
+    """
+    for i in range(5, 0, -1):
+        if unix_socket_state(path) != IN_USE:
+            return
+        dft_logger.warning('%s is already in use, waiting %d...', path, i)
+        await asyncio.sleep(delay, loop=loop)
+    raise SanicDevException('{} is already in use'.format(path))
+
+
 @contextlib.contextmanager
 def set_tty(tty_path):  # pragma: no cover
     try:
@@ -59,47 +153,381 @@ def set_tty(tty_path):  # pragma: no cover
         yield
 
 
-def serve_main_app(config: Config, tty_path: Optional[str]):
+def serve_main_app(config: Config, tty_path: Optional[str], sock: Optional[socket.socket]=None, conn=None):
+    entered = time.time()
     with set_tty(tty_path):
         setup_logging(config.verbose)
-        app_factory = config.import_app_factory()
+        timer = PhaseTimer()
+        set_loop_policy(config.event_loop)
         loop = asyncio.get_event_loop()
-        runner = loop.run_until_complete(start_main_app(config, app_factory, loop))
+        try:
+            app_factory = config.import_app_factory()
+            timer.mark('import_app_factory')
+            runner = loop.run_until_complete(start_main_app(config, app_factory, loop, sock=sock, timer=timer))
+        except Exception as e:
+            if conn is not None:
+                conn.send(('failed', {'error': str(e) or e.__class__.__name__, 'traceback': traceback.format_exc()}))
+            raise
+        if conn is not None:
+            # the app is accepting requests now
+            conn.send(('ready', {'entered': entered, 'phases': timer.phases, 'loop': loop_name(loop)}))
+            if config.profile_requests:
+                profile_requests(conn, config, runner)
+            if config.trace_malloc:
+                runner.memory_tracer = MemoryTracer(config.trace_malloc, config.snapshot_requests,
+                                                    on_snapshot=lambda info: conn.send(('snapshot', info)))
+                conn.send(('snapshot', runner.memory_tracer.start()))
+            loop.add_reader(conn.fileno(), read_control, conn, config, runner, loop)
+            report_loaded_modules(conn, config, loop)
+            runner.route_histograms = RouteHistograms()
+            loop.call_later(ROUTE_REPORT_INTERVAL, report_route_metrics, conn, runner, loop)
+            if config.loop_monitor:
+                runner.loop_monitor = LoopMonitor(loop, config.block_threshold)
+                runner.loop_monitor.start()
+                loop.call_later(LOOP_REPORT_INTERVAL, report_loop_metrics, conn, runner.loop_monitor, loop)
+        # stop the loop between callbacks rather than raising KeyboardInterrupt wherever the loop happens to be,
+        # inside a transport's callback it's only logged and the server never stops
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signal.SIGINT, loop.stop)
         try:
             loop.run_forever()
         except KeyboardInterrupt:  # pragma: no cover
             pass
         finally:
+            with contextlib.suppress(NotImplementedError):
+                # so a second SIGINT interrupts draining
+                loop.remove_signal_handler(signal.SIGINT)
+            if runner.loop_monitor is not None:
+                runner.loop_monitor.stop()
             with contextlib.suppress(asyncio.TimeoutError, KeyboardInterrupt):
-                loop.run_until_complete(runner.close())
+                drain_result = loop.run_until_complete(runner.close())
+                if conn is not None and drain_result is not None:
+                    with contextlib.suppress(OSError):
+                        conn.send(('drained', drain_result))
+
+
+def serve_standby_app(conn, stable_modules, tty_path: Optional[str], sock: Optional[socket.socket]=None):
+    """
+    Run a pre-warmed standby process: import the app's stable dependencies straight away, then wait for the
+    watcher to hand over a config before loading the app itself.
+    """
+    for module_name in stable_modules:
+        try:
+            import_module(module_name)
+        except Exception:  # pragma: no cover
+            # the real import in serve_main_app will report anything important
+            pass
+    try:
+        config = conn.recv()
+    except (EOFError, KeyboardInterrupt):
+        config = None
+    if config is None:
+        conn.close()
+    else:
+        serve_main_app(config, tty_path, sock, conn)
+
+
+def loaded_module_files(watch_path) -> set:
+    """
+    Files of the loaded modules which live under watch_path, these are the files which need a restart when changed.
+    """
+    return set(project_modules(watch_path))
+
+
+def report_loaded_modules(conn, config: Config, loop, reported=frozenset(), module_count=0):
+    """
+    Send the watcher the files of the app's loaded modules, then keep checking for modules imported later on
+    eg. lazily by a request handler.
+    """
+    if len(sys.modules) != module_count:
+        new_files = loaded_module_files(config.watch_path) - reported
+        if new_files:
+            try:
+                conn.send(('modules', sorted(new_files)))
+            except OSError:  # pragma: no cover
+                # the watcher has gone away
+                return
+            reported = reported | new_files
+    loop.call_later(MODULE_REPORT_INTERVAL, report_loaded_modules, conn, config, loop, reported, len(sys.modules))
+
+
+def report_route_metrics(conn, runner: AppRunner, loop, reported=(None, 0)):
+    """
+    Send the watcher route latency histograms whenever more requests have been handled.
+    """
+    histograms = runner.route_histograms
+    if (histograms.since, histograms.count) != reported:
+        try:
+            conn.send(('routes', histograms.snapshot()))
+        except OSError:  # pragma: no cover
+            return
+        reported = histograms.since, histograms.count
+    loop.call_later(ROUTE_REPORT_INTERVAL, report_route_metrics, conn, runner, loop, reported)
 
 
-async def start_main_app(config: Config, app_factory, loop):
+def report_loop_metrics(conn, monitor: LoopMonitor, loop):
+    """
+    Send the watcher the event loop's lag and the blocks caught by the monitor.
+    """
+    try:
+        conn.send(('loop', monitor.snapshot()))
+    except OSError:  # pragma: no cover
+        return
+    loop.call_later(LOOP_REPORT_INTERVAL, report_loop_metrics, conn, monitor, loop)
+
+
+def profile_requests(conn, config: Config, runner: AppRunner):
+    """
+    Profile the next config.profile_requests requests, when the app starts and again after each hot reload.
+    """
+    if runner.profiler is not None and runner.profiler.requests is None:
+        # a profile started from the aux app is still running
+        return
+    runner.profiler = Profiler(requests=config.profile_requests, on_done=lambda result: conn.send(('profile', result)))
+    runner.profiler.start()
+
+
+def read_control(conn, config: Config, runner: AppRunner, loop):
+    """
+    Handle a message from the watcher on the dev server's control pipe.
+    """
+    try:
+        kind, payload = conn.recv()
+    except (EOFError, OSError):
+        # the watcher has gone away
+        loop.remove_reader(conn.fileno())
+        return
+    if kind == 'reload':
+        loop.create_task(hot_reload_app(conn, config, runner, payload))
+    elif kind == 'profile_start':
+        if runner.profiler:
+            conn.send(('profile_failed', 'already profiling'))
+        else:
+            runner.profiler = Profiler(payload['mode'])
+            runner.profiler.start()
+            conn.send(('profile_started', payload['mode']))
+    elif kind == 'profile_stop':
+        if runner.profiler:
+            profiler, runner.profiler = runner.profiler, None
+            conn.send(('profile', profiler.stop()))
+        else:
+            conn.send(('profile_failed', 'not profiling'))
+    elif kind == 'take_snapshot':
+        if runner.memory_tracer:
+            conn.send(('snapshot_taken', runner.memory_tracer.take_snapshot(payload)))
+        else:
+            conn.send(('memory_failed', 'not tracing memory allocations'))
+    elif kind == 'compare_snapshots':
+        if runner.memory_tracer:
+            try:
+                conn.send(('snapshots_compared', runner.memory_tracer.compare(**payload)))
+            except ValueError as e:
+                conn.send(('memory_failed', str(e)))
+        else:
+            conn.send(('memory_failed', 'not tracing memory allocations'))
+
+
+async def hot_reload_app(conn, config: Config, runner: AppRunner, changed_files):
+    """
+    Reload changed modules in place and serve the routes of a freshly loaded app, the watcher falls back to
+    restarting the process if this fails.
+    """
+    try:
+        modules = reload_modules(config, changed_files)
+        app = await config.load_app(config.import_app_factory())
+        if config.livereload:
+            inject_livereload(app, config)
+    except HotReloadError as e:
+        conn.send(('reload_failed', str(e)))
+    except Exception:
+        conn.send(('reload_failed', traceback.format_exc()))
+    else:
+        runner.reload_app(app)
+        if runner.route_histograms is not None:
+            # latencies of the reloaded code are reported separately
+            runner.route_histograms.reset()
+        conn.send(('reloaded', modules))
+        if config.profile_requests:
+            profile_requests(conn, config, runner)
+        if runner.memory_tracer is not None:
+            # to compare what's allocated by the reloaded code with before
+            conn.send(('snapshot', runner.memory_tracer.take_snapshot('reload')))
+
+
+async def start_main_app(config: Config, app_factory, loop, sock: Optional[socket.socket]=None,
+                         timer: Optional[PhaseTimer]=None):
+    timer = timer or PhaseTimer()
     app = await config.load_app(app_factory)
-    await check_port_open(config.main_port, loop)
+    if config.livereload:
+        inject_livereload(app, config)
+    timer.mark('load_app')
+    unix = None
+    if sock is None:
+        if config.fd is not None:
+            sock = socket_from_fd(config.fd, config.backlog)
+        elif config.unix:
+            await check_unix_socket(config.unix, loop)
+            unix = config.unix
+        else:
+            await check_port_open(config.main_port, loop)
+        timer.mark('check_port_open')
     # Create Sanic AppRunner
     runner = AppRunner(
             app,
             config.host,
             config.main_port,
-            workers=config.workers,
+            sock=sock,
+            unix=unix,
+            unix_mode=config.unix_mode,
+            # each dev server process is a single worker, config.workers processes are supervised by the watcher
+            workers=1,
             protocol=PROTOCOLS[config.protocol],
             backlog=config.backlog,
             access_log=config.access_log,
+            drain_timeout=config.drain_timeout,
             loop=loop,
         )
     # start AppRunner
     await runner.start()
+    timer.mark('runner_start')
     return runner
 
 
-def create_auxiliary_app():
+def create_auxiliary_app(app_task=None, static_files=None, proxy=None):
     app = Sanic("SANIC_DEV_AUX_APP")
-    @app.route("/")
-    def aux_home(request):
-        return json({"status": "ok"})
+    # with the proxy devtools' routes are namespaced so they don't hide the app's routes
+    prefix = PROXY_AUX_PREFIX if proxy is not None else ""
+    if proxy is None:
+        # with the proxy "/" is the app's
+        @app.route("/")
+        def aux_home(request):
+            return json({"status": "ok"})
+
+    if app_task is not None:
+        @app.route(prefix + "/status")
+        async def dev_server_status(request):
+            # ?wait=<seconds> waits for the dev server to be ready (or fail) before responding
+            wait = request.args.get("wait")
+            if wait is not None:
+                try:
+                    await app_task.wait_ready(float(wait))
+                except ValueError:
+                    return json({"error": "invalid wait"}, status=400)
+                except asyncio.TimeoutError:
+                    pass
+            return json(app_task.status())
+
+        @app.route(prefix + "/metrics/reloads")
+        def reload_metrics(request):
+            return json(app_task.reload_history.as_dict())
+
+        @app.route(prefix + LIVE_RELOAD_JS_PATH)
+        def livereload_js(request):
+            return raw(LIVE_RELOAD_JS.encode(), content_type="application/javascript")
+
+        @app.websocket(prefix + LIVE_RELOAD_PATH)
+        async def livereload(request, ws):
+            await app_task.livereload.serve(ws)
+
+        @app.route(prefix + "/metrics/routes")
+        def route_metrics(request):
+            return json(app_task.route_metrics.as_dict())
+
+        @app.route(prefix + "/metrics/loop")
+        def loop_metrics(request):
+            if app_task.loop_metrics is None:
+                return json({"error": "no event loop metrics, run with --loop-monitor"}, status=404)
+            return json(app_task.loop_metrics)
+
+        @app.route(prefix + "/profile/start", methods=["GET", "POST"])
+        async def profile_start(request):
+            mode = request.args.get("mode", "cprofile")
+            if mode not in PROFILE_MODES:
+                return json({"error": "unknown mode, should be one of: {}".format(", ".join(PROFILE_MODES))},
+                            status=400)
+            try:
+                await app_task.profile_start(mode)
+            except (SanicDevException, asyncio.TimeoutError) as e:
+                return json({"error": str(e) or "timed out"}, status=409)
+            return json({"status": "profiling", "mode": mode})
+
+        @app.route(prefix + "/profile/stop", methods=["GET", "POST"])
+        async def profile_stop(request):
+            try:
+                result = await app_task.profile_stop()
+            except (SanicDevException, asyncio.TimeoutError) as e:
+                return json({"error": str(e) or "timed out"}, status=409)
+            return profile_response(result, request.args.get("format"))
+
+        @app.route(prefix + "/profile")
+        def profile_result(request):
+            if app_task.profile_result is None:
+                return json({"error": "no profile yet"}, status=404)
+            return profile_response(app_task.profile_result, request.args.get("format"))
+
+        @app.route(prefix + "/memory/snapshots")
+        def memory_snapshots(request):
+            return json(app_task.memory_snapshots)
+
+        @app.route(prefix + "/memory/snapshot", methods=["GET", "POST"])
+        async def memory_snapshot(request):
+            try:
+                info = await app_task.take_snapshot(request.args.get("label", "manual"))
+            except (SanicDevException, asyncio.TimeoutError) as e:
+                return json({"error": str(e) or "timed out"}, status=409)
+            return json(info)
+
+        @app.route(prefix + "/memory/diff")
+        async def memory_diff(request):
+            # ?first=<id>&second=<id> default to the latest two snapshots
+            try:
+                kwargs = {k: int(request.args.get(k)) for k in ("first", "second", "limit") if k in request.args}
+            except ValueError:
+                return json({"error": "first, second and limit should be integers"}, status=400)
+            group = request.args.get("group", "lineno")
+            if group not in GROUP_BY:
+                return json({"error": "unknown group, should be one of: {}".format(", ".join(GROUP_BY))},
+                            status=400)
+            try:
+                diff = await app_task.compare_snapshots(group=group, **kwargs)
+            except (SanicDevException, asyncio.TimeoutError) as e:
+                return json({"error": str(e) or "timed out"}, status=409)
+            if request.args.get("format") == "text":
+                return text(format_diff(diff))
+            return json(diff)
+
+    if static_files is not None:
+        aux_logger.debug('serving static files from %s at %s', static_files.root, static_files.url)
+
+        @app.route(static_files.url + "<path:path>", methods=["GET", "HEAD"])
+        async def static(request, path):
+            return await static_files.handle(request, path)
+
+    if proxy is not None:
+        @app.route(prefix + "/metrics/proxy")
+        def proxy_metrics(request):
+            return json(proxy.stats.as_dict())
+
+        # registered last so devtools' own routes take precedence
+        @app.route("/", methods=proxy.methods)
+        @app.route("/<path:path>", methods=proxy.methods)
+        async def proxy_request(request, path=""):
+            return await proxy.handle(request, path)
     return app
 
 
+def profile_response(result, fmt=None):
+    """
+    Profile results as text: the pstats report (or with format=pstats the binary stats) for cProfile and collapsed
+    stacks for the sampler.
+    """
+    if "collapsed" in result:
+        return text(result["collapsed"])
+    if fmt == "pstats":
+        return raw(result["pstats"], content_type="application/octet-stream",
+                   headers={"Content-Disposition": 'attachment; filename="dev_server.pstats"'})
+    return text(result["text"])
+
+
 def _get_protocol(protocol: str):
     return WebSocketProtocol if protocol == "websocket" else HttpProtocol
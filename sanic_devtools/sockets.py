@@ -0,0 +1,88 @@
+import errno
+import os
+import socket
+import stat
+
+from .exceptions import SanicDevException
+from .log import rs_dft_logger as dft_logger
+
+# state of a unix socket path
+FREE = 'free'
+STALE = 'stale'
+IN_USE = 'in use'
+
+
+def unix_socket_state(path: str) -> str:
+    """
+    Whether anything is listening on the unix socket at path, a socket file left behind by a server which has exited
+    refuses connections. Raises SanicDevException if path exists but isn't a socket.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return FREE
+    if not stat.S_ISSOCK(st.st_mode):
+        raise SanicDevException('{} exists and is not a socket'.format(path))
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        return STALE
+    else:
+        return IN_USE
+    finally:
+        probe.close()
+
+
+def bind_unix_socket(path: str, mode: int, backlog: int) -> socket.socket:
+    """
+    Bind a listening unix socket at path, replacing a stale socket file. Raises OSError with errno EADDRINUSE if
+    another server is listening on it.
+    """
+    if unix_socket_state(path) == STALE:
+        dft_logger.debug('removing stale socket %s', path)
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(path)
+        os.chmod(path, mode)
+        sock.listen(backlog)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def socket_from_fd(fd: int, backlog: int) -> socket.socket:
+    """
+    Listen on an already bound socket inherited as file descriptor fd, eg. from systemd or a process manager.
+    """
+    try:
+        family, sock_type = socket_kind(fd)
+    except OSError as e:
+        if e.errno in (errno.ENOTSOCK, errno.EBADF):
+            raise SanicDevException('fd {} is not a socket: {}'.format(fd, e))
+        raise  # pragma: no cover
+    if sock_type != socket.SOCK_STREAM:
+        raise SanicDevException('fd {} is not a stream socket'.format(fd))
+    sock = socket.socket(family, sock_type, fileno=fd)
+    sock.listen(backlog)
+    return sock
+
+
+def socket_kind(fd: int):
+    """
+    Family and type of the socket fd, python 3.6 doesn't read them from the file descriptor itself so they're asked
+    of the socket. Raises OSError with errno ENOTSOCK if fd isn't a socket.
+    """
+    probe = socket.socket(fileno=fd)
+    try:
+        if hasattr(socket, 'SO_DOMAIN'):
+            family = probe.getsockopt(socket.SOL_SOCKET, socket.SO_DOMAIN)
+        else:  # pragma: no cover
+            # without SO_DOMAIN (eg. macos) rely on python >= 3.7 having read it from fd
+            family = probe.family
+        return socket.AddressFamily(family), socket.SocketKind(probe.getsockopt(socket.SOL_SOCKET, socket.SO_TYPE))
+    finally:
+        # the probe doesn't own fd
+        probe.detach()
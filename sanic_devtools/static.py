@@ -0,0 +1,193 @@
+import asyncio
+import mimetypes
+import os
+import re
+import stat
+from collections import OrderedDict, namedtuple
+from email.utils import formatdate
+from functools import partial
+
+from sanic.response import HTTPResponse, raw, stream
+
+from .log import rs_aux_logger as aux_logger
+
+# files up to this size are kept in memory, bigger ones are sent with sendfile
+SMALL_FILE_SIZE = 64 * 1024
+# total size of the small files kept in memory
+CACHE_SIZE = 16 * 1024 * 1024
+# read size where sendfile isn't supported by the event loop
+CHUNK_SIZE = 256 * 1024
+
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+FileMeta = namedtuple('FileMeta', 'path size mtime inode etag content_type')
+
+
+async def push_data(protocol, data: bytes):
+    """
+    Write data to a streaming response, protocol.push_data is a coroutine from sanic 19.12.
+    """
+    result = protocol.push_data(data)
+    if asyncio.iscoroutine(result):
+        await result
+
+
+def parse_range(header: str, size: int):
+    """
+    Parse a single byte range, multiple ranges aren't supported so like malformed headers they're ignored.
+
+    :return: (start, end) inclusive or None to send the whole file, raises ValueError if the range is unsatisfiable
+    """
+    m = RANGE_RE.fullmatch(header.strip())
+    if not m or not any(m.groups()) or size == 0:
+        # an empty file has no byte range to send, so it's sent whole
+        return None
+    start, end = m.groups()
+    if not start:
+        suffix = int(end)
+        if suffix == 0:
+            raise ValueError('empty suffix range')
+        return max(size - suffix, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('range not satisfiable')
+    return start, end
+
+
+class StaticFiles:
+    """
+    Serve files from a directory.
+
+    File metadata is cached until the watcher reports the file changed, so requests don't stat the file, and
+    small files are kept in a bounded LRU cache. Bigger files are sent with sendfile.
+    """
+    def __init__(self, root, url: str='/static/', small_file_size: int=SMALL_FILE_SIZE, cache_size: int=CACHE_SIZE):
+        self.root = os.path.realpath(str(root))
+        self.url = '/{}/'.format(url.strip('/')) if url.strip('/') else '/'
+        self.small_file_size = small_file_size
+        self.cache_size = cache_size
+        self._meta = {}
+        self._content = OrderedDict()
+        self._content_size = 0
+
+    def url_path(self, path) -> str:
+        return self.url + os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def resolve(self, rel_path: str):
+        path = os.path.realpath(os.path.join(self.root, rel_path))
+        if path.startswith(os.path.join(self.root, '')):
+            return path
+
+    def file_meta(self, path: str):
+        meta = self._meta.get(path)
+        if meta is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            if not stat.S_ISREG(st.st_mode):
+                return None
+            meta = FileMeta(
+                path=path,
+                size=st.st_size,
+                mtime=st.st_mtime,
+                inode=st.st_ino,
+                etag='"{:x}-{:x}-{:x}"'.format(st.st_ino, st.st_mtime_ns, st.st_size),
+                content_type=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            )
+            self._meta[path] = meta
+        return meta
+
+    def invalidate(self, paths):
+        """
+        Forget the cached metadata and content of changed files.
+        """
+        for path in paths:
+            path = os.path.realpath(path)
+            self._meta.pop(path, None)
+            content = self._content.pop(path, None)
+            if content is not None:
+                self._content_size -= len(content)
+
+    def _read_small(self, meta: FileMeta) -> bytes:
+        content = self._content.get(meta.path)
+        if content is not None:
+            self._content.move_to_end(meta.path)
+            return content
+        with open(meta.path, 'rb') as f:
+            content = f.read()
+        self._content[meta.path] = content
+        self._content_size += len(content)
+        while self._content_size > self.cache_size:
+            _, evicted = self._content.popitem(last=False)
+            self._content_size -= len(evicted)
+        return content
+
+    async def handle(self, request, rel_path: str):
+        path = self.resolve(rel_path)
+        meta = path and self.file_meta(path)
+        if not meta:
+            return HTTPResponse(status=404)
+
+        headers = {
+            'ETag': meta.etag,
+            'Last-Modified': formatdate(meta.mtime, usegmt=True),
+            'Accept-Ranges': 'bytes',
+            # always revalidate, a file can change at any time during development
+            'Cache-Control': 'no-cache',
+        }
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            tags = [t.strip() for t in if_none_match.split(',')]
+            if '*' in tags or meta.etag in tags or 'W/' + meta.etag in tags:
+                return HTTPResponse(status=304, headers=headers)
+
+        status, start, end = 200, 0, meta.size - 1
+        range_header = request.headers.get('Range')
+        if range_header and request.headers.get('If-Range', meta.etag) == meta.etag:
+            try:
+                file_range = parse_range(range_header, meta.size)
+            except ValueError:
+                headers['Content-Range'] = 'bytes */{}'.format(meta.size)
+                return HTTPResponse(status=416, headers=headers)
+            if file_range:
+                status, (start, end) = 206, file_range
+                headers['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, meta.size)
+        length = end - start + 1
+
+        if request.method == 'HEAD':
+            headers['Content-Length'] = str(length)
+            return HTTPResponse(status=status, headers=headers, content_type=meta.content_type)
+        try:
+            if meta.size <= self.small_file_size:
+                body = self._read_small(meta)
+                return raw(body[start:end + 1], status=status, headers=headers, content_type=meta.content_type)
+            f = open(meta.path, 'rb')
+        except OSError:
+            # changed since it was cached without the watcher noticing (yet)
+            self.invalidate([meta.path])
+            return HTTPResponse(status=404)
+        return stream(partial(self._sendfile, f, start, length), status=status, headers=headers,
+                      content_type=meta.content_type)
+
+    async def _sendfile(self, f, offset: int, count: int, response):
+        protocol = response.protocol
+        with f:
+            # sanic always streams with chunked encoding, the file is sent as a single chunk
+            await push_data(protocol, b'%x\r\n' % count)
+            await protocol.drain()
+            try:
+                await asyncio.get_event_loop().sendfile(protocol.transport, f, offset, count)
+            except (AttributeError, NotImplementedError):
+                # the event loop (eg. uvloop or python < 3.7) doesn't support sendfile
+                f.seek(offset)
+                while count > 0:
+                    data = f.read(min(CHUNK_SIZE, count))
+                    if not data:  # pragma: no cover
+                        aux_logger.warning('%s was truncated while being sent', f.name)
+                        break
+                    await push_data(protocol, data)
+                    await protocol.drain()
+                    count -= len(data)
+            await push_data(protocol, b'\r\n')
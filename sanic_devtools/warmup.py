@@ -0,0 +1,52 @@
+import asyncio
+import time
+from collections import Counter, deque
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+
+# how long a replayed request may take
+WARMUP_TIMEOUT = 10
+
+
+class RequestLog:
+    """
+    Bounded log of recent successful GET requests to the app, replayed to warm it up after a reload.
+    """
+    def __init__(self, maxlen=500):
+        self.requests = deque(maxlen=maxlen)
+
+    def record(self, method: str, path: str, status: int):
+        if method == 'GET' and 200 <= status < 300:
+            self.requests.append(path)
+
+    def top(self, n: int) -> list:
+        """
+        The n most frequently requested paths.
+        """
+        return [path for path, _ in Counter(self.requests).most_common(n)]
+
+
+async def replay(session: ClientSession, url: str):
+    start = time.monotonic()
+    try:
+        async with session.get(url, allow_redirects=False, timeout=ClientTimeout(total=WARMUP_TIMEOUT)) as r:
+            await r.read()
+            status = r.status
+    except (ClientError, asyncio.TimeoutError):
+        status = None
+    return status, time.monotonic() - start
+
+
+async def warm_up(session: ClientSession, base_url: str, paths: list) -> list:
+    """
+    Replay requests to paths concurrently, then again to compare the latency of the first "cold" request after a
+    reload with a "warm" one.
+
+    :return: list of dicts with path, status, cold and warm latencies
+    """
+    cold = await asyncio.gather(*[replay(session, base_url + path) for path in paths])
+    warm = await asyncio.gather(*[replay(session, base_url + path) for path in paths])
+    return [
+        {'path': path, 'status': cold_status, 'cold': cold_time, 'warm': warm_time}
+        for path, (cold_status, cold_time), (_, warm_time) in zip(paths, cold, warm)
+    ]
@@ -1,26 +1,86 @@
 import asyncio
+import contextlib
 import os
 import signal
+import socket
 import sys
-from multiprocessing import Process
+import time
+from multiprocessing import Pipe, Process
 
-from aiohttp import ClientSession
-from watchgod import awatch
+from aiohttp import ClientError, ClientSession, ClientTimeout, UnixConnector
+from watchgod import Change, awatch
 
 from .exceptions import SanicDevException
 from .log import rs_dft_logger as logger
 from .config import Config
-from .serve import serve_main_app
+from .livereload import LiveReloadClients
+from .loops import loop_name
+from .static import StaticFiles
+from .warmup import RequestLog, warm_up
+from .metrics import ReloadHistory, ReloadTimeline, RouteMetrics
+from .runner import PING_PATH
+from .serve import main_host, serve_main_app, serve_standby_app, url_host
+from .watchers import DEFAULT_IGNORE, GlobWatcher, InotifyWatcher, inotify_available
+
+# how long a change storm has to settle before reloads resume
+STORM_QUIET_PERIOD = 2
+# how long to wait for the dev server to hot reload before restarting it instead
+HOT_RELOAD_TIMEOUT = 10
+# how long to wait for the dev server to reply to other control messages
+CONTROL_TIMEOUT = 30
+
+# snapshot summaries kept by the watcher, the snapshots themselves are kept by the dev server
+MEMORY_SNAPSHOT_HISTORY = 100
+
+# states of the dev server process
+STARTING = 'starting'
+READY = 'ready'
+FAILED = 'failed'
+STOPPING = 'stopping'
+
+
+async def wait_for_exit(process: Process, loop: asyncio.AbstractEventLoop, timeout: float) -> bool:
+    """
+    Wait for a process to exit without blocking the event loop by watching its sentinel, then reap it.
+
+    :return: True if the process exited within timeout
+    """
+    if process.is_alive():
+        exited = loop.create_future()
+        loop.add_reader(process.sentinel, lambda: exited.done() or exited.set_result(None))
+        try:
+            await asyncio.wait_for(exited, timeout, loop=loop)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            loop.remove_reader(process.sentinel)
+    # the sentinel is closed as the process exits, so it's only moments from being reaped
+    process.join(1)
+    return True
 
 
 class WatchTask:
-    def __init__(self, path: str, loop: asyncio.AbstractEventLoop):
+    def __init__(self, path: str, loop: asyncio.AbstractEventLoop, *,
+                 backend: str='poll', ignore=DEFAULT_IGNORE, extensions=None):
         self._loop = loop
         self._app = None
         self._task = None
         assert path
         self.stopper = asyncio.Event(loop=self._loop)
-        self._awatch = awatch(path, stop_event=self.stopper)
+        self._awatch = self._create_watcher(path, backend, ignore, extensions)
+
+    def _create_watcher(self, path, backend, ignore, extensions):
+        if backend in ('auto', 'inotify'):
+            if inotify_available():
+                try:
+                    return InotifyWatcher(path, ignore=ignore, extensions=extensions, stop_event=self.stopper,
+                                          loop=self._loop)
+                except OSError as e:
+                    logger.warning('unable to watch %s with inotify, falling back to polling: %s', path, e)
+            elif backend == 'inotify':
+                logger.warning('inotify is not available, falling back to polling')
+        return awatch(path, watcher_cls=GlobWatcher, watcher_kwargs={'ignore': ignore, 'extensions': extensions},
+                      stop_event=self.stopper)
 
     async def start(self, app):
         self._app = app
@@ -38,63 +98,744 @@ class WatchTask:
                 self._task.cancel()
 
 
+class Worker:
+    """
+    A dev server process serving from the shared socket alongside the main one, and what it has reported about its
+    health.
+    """
+    def __init__(self, index: int, process: Process, conn, reload: int, loop: asyncio.AbstractEventLoop):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        # the reload whose code the worker is running
+        self.reload = reload
+        self.state = STARTING
+        self.started = time.time()
+        self.startup = None
+        # event loop implementation the worker is running
+        self.loop = None
+        self.requests = 0
+        self.loop_lag = None
+        self.stopping = False
+        # set to "ready" or "failed" once the worker has started or failed to
+        self.started_waiter = loop.create_future()
+
+    def set_state(self, state):
+        self.state = state
+        if state in (READY, FAILED) and not self.started_waiter.done():
+            self.started_waiter.set_result(state)
+
+    def as_dict(self) -> dict:
+        return {
+            'index': self.index,
+            'pid': self.process.pid,
+            'state': self.state,
+            'reload': self.reload,
+            'uptime': time.time() - self.started,
+            'startup': self.startup,
+            'loop': self.loop,
+            'requests': self.requests,
+            'loop_lag_p99': self.loop_lag,
+        }
+
+
 class AppTask(WatchTask):
     template_files = '.html', '.jinja', '.jinja2'
+    # changes to these are picked up by reloading the browser, without restarting the dev server
+    static_files = '.css', '.js'
 
-    def __init__(self, config: Config, loop: asyncio.AbstractEventLoop):
+    def __init__(self, config: Config, loop: asyncio.AbstractEventLoop, sock: socket.socket=None):
         self._config = config
+        # listening socket shared by every dev server process, owned by the watcher
+        self._sock = sock
+        # with a unix socket the watcher's own requests to the dev server go over it too
+        self._unix_path = sock.getsockname() if sock is not None and sock.family == socket.AF_UNIX else None
+        # host of the watcher's own requests, wherever the socket is bound since an inherited one may be anywhere
+        if sock is not None and sock.family != socket.AF_UNIX:
+            self.request_host = url_host(sock.getsockname()[0])
+        else:
+            self.request_host = url_host(main_host(config))
         self._reloads = 0
+        self._restarts = 0
+        self._live_checks = 20
         self._session = None
         self._runner = None
-        super().__init__(self._config.watch_path, loop)
+        self._process = None
+        # whether the running process has been asked to stop
+        self._stopping = False
+        self._control = None
+        # health of the main dev server process, as reported for the extra workers
+        self._primary = None
+        # extra worker processes when running with more than one worker
+        self._workers = []
+        self._roll_task = None
+        self._standby = None
+        # files of the modules loaded by the running dev server, None until it has reported them
+        self._module_index = None
+        # reply message kind -> future waiting for a reply from the dev server
+        self._reply_waiters = {}
+        self._restart_task = None
+        self._pending_changes = set()
+        self._changes_detected = None
+        self._detect_latency = None
+        self._coalesced = 0
+        # timeline of the (re)start in progress
+        self._timeline = None
+        self.reload_history = ReloadHistory()
+        self.route_metrics = RouteMetrics()
+        self.route_metrics.start_version(0)
+        self.state = None
+        # details of why the dev server failed to start, the error and traceback sent by the process
+        self.failure = None
+        self._state_waiters = []
+        self.livereload = LiveReloadClients()
+        # recent requests, recorded by the proxy
+        self.request_log = RequestLog()
+        # results of the latest profile of the dev server
+        self.profile_result = None
+        # summaries of the tracemalloc snapshots taken by the running dev server
+        self.memory_snapshots = []
+        # event loop lag and blocks reported by the running dev server's monitor
+        self.loop_metrics = None
+        # how the most recently stopped dev server process drained its connections
+        self.last_drain = None
+        ignore = DEFAULT_IGNORE + tuple(self._config.ignore)
+        if self._config.static_path:
+            static_dir = os.path.relpath(str(self._config.static_path), str(self._config.watch_path))
+            if not static_dir.startswith(os.pardir):
+                # watched by StaticTask
+                ignore += (static_dir,)
+        super().__init__(
+            self._config.watch_path,
+            loop,
+            backend=self._config.watcher,
+            ignore=ignore,
+            extensions=self._config.watch_extensions,
+        )
 
     async def _run(self, live_checks=20):
-        self._session = ClientSession()
+        # responses are passed through as they are by the proxy
+        connector = UnixConnector(path=self._unix_path) if self._unix_path else None
+        self._session = ClientSession(connector=connector, auto_decompress=False)
+        self._live_checks = live_checks
         try:
+            self._timeline = ReloadTimeline(0)
             self._start_dev_server()
 
             async for changes in self._awatch:
                 self._reloads += 1
+                if self._is_imported(changes):
+                    # browsers are reloaded once the dev server is ready again
+                    self._schedule_restart(changes)
+                    continue
                 if any(f.endswith('.py') for _, f in changes):
-                    logger.debug('%d changes, restarting server', len(changes))
-                    self._stop_dev_server()
-                    self._start_dev_server()
+                    logger.debug('%d changes not imported by the app, not restarting', len(changes))
+                browser_changes = [f for _, f in changes if f.endswith(self.template_files + self.static_files)]
+                if browser_changes:
+                    await self.src_reload(browser_changes[0] if len(browser_changes) == 1 else None)
+        except asyncio.CancelledError:
+            # closed before the watcher's first check, eg. the aux server failed to start
+            raise
         except Exception as exc:
             logger.exception(exc)
             await self._session.close()
             raise SanicDevException('error running dev server')
 
+    def _is_imported(self, changes):
+        """
+        Whether any changed python file is imported by the running app, or is new in one of its packages where it
+        might be picked up. Before the dev server has reported its modules every python file counts.
+        """
+        py_changes = [(change, path) for change, path in changes if path.endswith('.py')]
+        if not py_changes or not self._config.import_graph or self._module_index is None:
+            return bool(py_changes)
+
+        package_dirs = {os.path.dirname(f) for f in self._module_index if os.path.basename(f) == '__init__.py'}
+        for change, path in py_changes:
+            path = os.path.realpath(path)
+            if path in self._module_index:
+                return True
+            if change == Change.added and os.path.dirname(path) in package_dirs:
+                return True
+        return False
+
+    def _schedule_restart(self, changes):
+        """
+        Restart once changes have settled for reload_delay, a newer batch of changes cancels the pending restart
+        so bursts of changes (git checkout, formatters, save-all) coalesce into a single restart.
+        """
+        if not self._pending_changes:
+            self._changes_detected = time.monotonic()
+            self._detect_latency = self._detection_latency(changes)
+        self._pending_changes.update(path for _, path in changes)
+        if self._restart_task and not self._restart_task.done():
+            self._restart_task.cancel()
+            self._coalesced += 1
+        self._restart_task = self._loop.create_task(self._restart())
+
+    @staticmethod
+    def _detection_latency(changes):
+        """
+        Time between the latest change being written and the watcher noticing it.
+        """
+        mtimes = []
+        for _, path in changes:
+            try:
+                mtimes.append(os.stat(path).st_mtime)
+            except OSError:
+                pass
+        return max(time.time() - max(mtimes), 0) if mtimes else None
+
+    async def _restart(self):
+        timeline = ReloadTimeline(self._restarts + 1, start=self._changes_detected)
+        if self._detect_latency is not None:
+            timeline.phases['detect'] = self._detect_latency
+        delay = self._config.reload_delay
+        # all the changes since the last restart, so a storm of small batches is caught too
+        pending = len(self._pending_changes)
+        if pending > self._config.reload_storm_limit:
+            logger.warning('%d files changed, pausing reloads until changes settle', pending)
+            delay = max(delay, STORM_QUIET_PERIOD)
+        await asyncio.sleep(delay, loop=self._loop)
+        timeline.mark('debounce')
+
+        changes, self._pending_changes = self._pending_changes, set()
+        coalesced, self._coalesced = self._coalesced, 0
+        if coalesced:
+            logger.info('%d changes, restarting server, coalesced %d restarts', len(changes), coalesced)
+        else:
+            logger.debug('%d changes, restarting server', len(changes))
+        # counted only once the restart is certain, a restart cancelled by newer changes isn't one
+        self._restarts += 1
+        self.route_metrics.start_version(self._restarts)
+        self._timeline = timeline
+        if self._config.reload_mode == 'hot':
+            if await self._hot_reload(changes):
+                timeline.mark('hot_reload')
+                self._loop.create_task(self._finish_timeline(timeline))
+                return
+            timeline.mark('hot_reload_attempt')
+        await self._stop_dev_server()
+        timeline.mark('stop')
+        self._start_dev_server()
+
+    def _hot_reload_blocker(self, changes):
+        """
+        Why changes can't be hot reloaded, the dev server checks the modules themselves once asked to reload.
+        """
+        if self._module_index is None or not self._process.is_alive():
+            return 'dev server not running'
+        app_module = os.path.realpath(str(self._config.py_file))
+        for path in changes:
+            path = os.path.realpath(path)
+            if path == app_module:
+                return 'app factory module changed'
+            if path not in self._module_index:
+                return '"{}" is not loaded'.format(path)
+
+    async def _hot_reload(self, changes):
+        py_changes = sorted(path for path in changes if path.endswith('.py'))
+        blocker = self._hot_reload_blocker(py_changes)
+        if blocker:
+            logger.info('%s, restarting instead of hot reloading', blocker)
+            return False
+
+        try:
+            kind, payload = await self._control_request(('reload', py_changes), ('reloaded', 'reload_failed'),
+                                                        HOT_RELOAD_TIMEOUT)
+        except asyncio.TimeoutError:
+            kind, payload = 'reload_failed', 'timed out'
+
+        if kind == 'reloaded':
+            logger.info('Hot reloaded %d modules ●', len(payload))
+            logger.debug('reloaded modules: %s', ', '.join(payload))
+            for worker in self._workers:
+                # replies are handled by _read_worker_control, a worker which fails to reload is replaced
+                worker.conn.send(('reload', py_changes))
+            return True
+        logger.warning('hot reload failed, restarting: %s', payload)
+        return False
+
     def _start_dev_server(self):
         act = 'Start' if self._reloads == 0 else 'Restart'
-        logger.info('%sing dev server at http://%s:%s ●', act, self._config.host, self._config.main_port)
+        if self._unix_path:
+            logger.info('%sing dev server at unix:%s ●', act, self._unix_path)
+        else:
+            logger.info('%sing dev server at http://%s:%s ●', act, self._config.host, self._config.main_port)
+
+        if self._standby and self._standby[0].is_alive():
+            logger.debug('handing over to standby process')
+            self._process, self._control = self._standby
+            self._control.send(self._config)
+        else:
+            self._control, child_conn = Pipe()
+            self._process = Process(
+                target=serve_main_app,
+                args=(self._config, self._tty_path(), self._sock, child_conn),
+            )
+            self._process.start()
+            child_conn.close()
+        self._standby = None
+        self._stopping = False
+        self._module_index = None
+        self._primary = Worker(0, self._process, self._control, self._restarts, self._loop)
+        self._set_state(STARTING)
+        self._loop.add_reader(self._control.fileno(), self._read_control, self._control)
+        if self._timeline:
+            self._timeline.mark('spawn')
+            self._timeline.spawned_at = time.time()
+
+        if self._config.standby:
+            self._start_standby()
+
+    def _start_standby(self):
+        """
+        Spawn a spare process which imports the app's dependencies now, so the next restart only has to load
+        the project's own modules.
+        """
+        conn, child_conn = Pipe()
+        process = Process(
+            target=serve_standby_app,
+            args=(child_conn, self._config.stable_modules, self._tty_path(), self._sock),
+        )
+        process.start()
+        child_conn.close()
+        self._standby = process, conn
 
+    def _read_control(self, conn):
+        """
+        Handle a message from the dev server process on its control pipe.
+        """
         try:
-            tty_path = os.ttyname(sys.stdin.fileno())
+            kind, payload = conn.recv()
+        except (EOFError, OSError):
+            # the dev server process has exited
+            self._close_control(conn)
+            if conn is self._control and self.state in (STARTING, READY):
+                self._loop.create_task(self._process_exited(self._process))
+            return
+        if conn is not self._control:  # pragma: no cover
+            # late message from a process which has since been replaced
+            return
+        if kind == 'ready':
+            self._set_state(READY)
+            # snapshots don't outlive the process which took them
+            self.memory_snapshots = []
+            self.loop_metrics = None
+            if self._primary:
+                self._primary.startup = time.time() - self._primary.started
+                self._primary.loop = payload.get('loop')
+            if self._config.workers > 1:
+                self._schedule_roll()
+            timeline = self._timeline
+            if timeline and timeline.spawned_at:
+                timeline.phases['interpreter'] = max(payload['entered'] - timeline.spawned_at, 0)
+                timeline.update(payload['phases'])
+                self._loop.create_task(self._finish_timeline(timeline))
+        elif kind == 'failed':
+            logger.error('dev server failed to start: %s', payload['error'])
+            self._timeline = None
+            self._set_state(FAILED, payload)
+            if self._workers:
+                logger.warning('%d other worker%s still running the previous code', len(self._workers),
+                               '' if len(self._workers) == 1 else 's')
+        elif kind == 'modules':
+            self._module_index = (self._module_index or set()).union(payload)
+            logger.debug('dev server has loaded %d project modules', len(self._module_index))
+        elif kind == 'routes':
+            self.route_metrics.update(payload, self._process.pid)
+            if self._primary:
+                self._primary.requests = sum(h['count'] for h in payload['routes'].values())
+        elif kind == 'loop':
+            self.loop_metrics = payload
+            if self._primary:
+                self._primary.loop_lag = payload['lag']['p99']
+        elif kind == 'profile':
+            self.profile_result = payload
+            if payload['requests'] and 'profile' not in self._reply_waiters:
+                logger.info('profiled %d requests, see http://%s:%s%s/profile', payload['requests'],
+                            self._config.host, self._config.aux_port, self._config.aux_prefix)
+        elif kind == 'drained':
+            # already logged by the dev server
+            self.last_drain = payload
+        elif kind in ('snapshot', 'snapshot_taken'):
+            self.memory_snapshots = self.memory_snapshots[-MEMORY_SNAPSHOT_HISTORY + 1:] + [payload]
+            if kind == 'snapshot':
+                logger.debug('%s memory snapshot %d, %d bytes traced', payload['label'], payload['id'],
+                             payload['traced'])
+        waiter = self._reply_waiters.get(kind)
+        if waiter and not waiter.done():
+            waiter.set_result((kind, payload))
+
+    async def _control_request(self, message, replies, timeout):
+        """
+        Send a message to the dev server and wait for one of the reply kinds.
+
+        :return: (kind, payload) of the reply, raises asyncio.TimeoutError if there's no reply within timeout
+        """
+        waiter = self._loop.create_future()
+        for kind in replies:
+            self._reply_waiters[kind] = waiter
+        try:
+            self._control.send(message)
+            return await asyncio.wait_for(waiter, timeout, loop=self._loop)
+        finally:
+            for kind in replies:
+                self._reply_waiters.pop(kind, None)
+
+    async def profile_start(self, mode: str):
+        if self.state != READY:
+            raise SanicDevException('dev server not ready')
+        kind, payload = await self._control_request(('profile_start', {'mode': mode}),
+                                                    ('profile_started', 'profile_failed'), CONTROL_TIMEOUT)
+        if kind == 'profile_failed':
+            raise SanicDevException(payload)
+
+    async def profile_stop(self) -> dict:
+        if self.state != READY:
+            raise SanicDevException('dev server not ready')
+        kind, payload = await self._control_request(('profile_stop', None), ('profile', 'profile_failed'),
+                                                    CONTROL_TIMEOUT)
+        if kind == 'profile_failed':
+            raise SanicDevException(payload)
+        return payload
+
+    async def take_snapshot(self, label: str='manual') -> dict:
+        self._check_tracing()
+        kind, payload = await self._control_request(('take_snapshot', label), ('snapshot_taken', 'memory_failed'),
+                                                    CONTROL_TIMEOUT)
+        if kind == 'memory_failed':
+            raise SanicDevException(payload)
+        return payload
+
+    async def compare_snapshots(self, first: int=None, second: int=None, limit: int=10, group: str='lineno') -> dict:
+        """
+        Compare two of the dev server's tracemalloc snapshots, see memory.MemoryTracer.compare.
+        """
+        self._check_tracing()
+        message = 'compare_snapshots', {'first': first, 'second': second, 'limit': limit, 'group': group}
+        kind, payload = await self._control_request(message, ('snapshots_compared', 'memory_failed'),
+                                                    CONTROL_TIMEOUT)
+        if kind == 'memory_failed':
+            raise SanicDevException(payload)
+        return payload
+
+    def _check_tracing(self):
+        if not self._config.trace_malloc:
+            raise SanicDevException('not tracing memory allocations, run with --trace-malloc')
+        if self.state != READY:
+            raise SanicDevException('dev server not ready')
+
+    def _schedule_roll(self):
+        if self._roll_task and not self._roll_task.done():
+            self._roll_task.cancel()
+        self._roll_task = self._loop.create_task(self._roll_workers())
+
+    async def _roll_workers(self):
+        """
+        Bring the extra workers up to date with the main dev server one at a time: each is only stopped once its
+        replacement is ready, so there are always workers accepting connections from the shared socket.
+
+        A roll interrupted by a newer one leaves workers to be replaced or stopped by the newer roll.
+        """
+        reload = self._restarts
+        extras = self._config.workers - 1
+        missing = [self._spawn_worker(self._free_index(), reload) for _ in range(extras - len(self._workers))]
+        if missing:
+            await asyncio.gather(*[w.started_waiter for w in missing])
+        for worker in sorted((w for w in self._workers if w.reload < reload), key=lambda w: w.index):
+            if len(self._workers) <= extras:
+                replacement = self._spawn_worker(worker.index, reload)
+                if await replacement.started_waiter != READY:
+                    logger.warning('worker %d failed to start, stopping rolling restart', replacement.index)
+                    return
+            await self._stop_worker(worker)
+        logger.debug('%d workers running reload %d', len(self._workers) + 1, reload)
+
+    def _free_index(self):
+        used = {w.index for w in self._workers}
+        return next(i for i in range(1, len(used) + 2) if i not in used)
+
+    def _spawn_worker(self, index: int, reload: int) -> Worker:
+        conn, child_conn = Pipe()
+        # only the main dev server reads from the tty, eg. for pdb
+        process = Process(target=serve_main_app, args=(self._config, None, self._sock, child_conn))
+        process.start()
+        child_conn.close()
+        worker = Worker(index, process, conn, reload, self._loop)
+        self._workers.append(worker)
+        self._loop.add_reader(conn.fileno(), self._read_worker_control, worker)
+        logger.debug('started worker %d, pid %d', index, process.pid)
+        return worker
+
+    def _read_worker_control(self, worker: Worker):
+        """
+        Handle a message from an extra worker, control requests like profiling only go to the main dev server.
+        """
+        try:
+            kind, payload = worker.conn.recv()
+        except (EOFError, OSError):
+            self._close_control(worker.conn)
+            self._loop.create_task(self._worker_exited(worker))
+            return
+        if kind == 'ready':
+            worker.startup = time.time() - worker.started
+            worker.loop = payload.get('loop')
+            worker.set_state(READY)
+        elif kind == 'failed':
+            logger.error('worker %d failed to start: %s', worker.index, payload['error'])
+            worker.set_state(FAILED)
+        elif kind == 'routes':
+            self.route_metrics.update(payload, worker.process.pid)
+            worker.requests = sum(h['count'] for h in payload['routes'].values())
+        elif kind == 'loop':
+            worker.loop_lag = payload['lag']['p99']
+        elif kind == 'reloaded':
+            worker.reload = self._restarts
+        elif kind == 'reload_failed':
+            logger.warning('worker %d failed to hot reload, replacing it: %s', worker.index, payload)
+            worker.reload = -1
+            self._schedule_roll()
+        elif kind == 'drained':
+            self.last_drain = payload
+
+    @property
+    def _stop_timeout(self):
+        # the dev server may spend up to drain_timeout letting requests finish before shutting down
+        return self._config.drain_timeout + self._config.shutdown_timeout
+
+    async def _worker_exited(self, worker: Worker):
+        await wait_for_exit(worker.process, self._loop, 1)
+        if worker.stopping:
+            return
+        if worker in self._workers:
+            self._workers.remove(worker)
+        crashed = worker.state == READY
+        worker.set_state(FAILED)
+        logger.error('worker %d exited unexpectedly, exit code: %s', worker.index, worker.process.exitcode)
+        if crashed and not self.stopper.is_set():
+            # a worker which fails to start isn't replaced until the next reload
+            self._schedule_roll()
+
+    async def _stop_worker(self, worker: Worker):
+        worker.stopping = True
+        worker.state = STOPPING
+        if worker in self._workers:
+            self._workers.remove(worker)
+        if worker.process.is_alive():
+            os.kill(worker.process.pid, signal.SIGINT)
+            if not await wait_for_exit(worker.process, self._loop, self._stop_timeout):
+                logger.warning('worker %d has not terminated, sending SIGKILL', worker.index)
+                os.kill(worker.process.pid, signal.SIGKILL)
+                await wait_for_exit(worker.process, self._loop, 1)
+        self._close_control(worker.conn)
+        logger.debug('stopped worker %d', worker.index)
+
+    async def _process_exited(self, process):
+        """
+        The dev server exited without being asked to, eg. it crashed while importing the app.
+        """
+        await wait_for_exit(process, self._loop, 1)
+        if process is self._process and self.state in (STARTING, READY):
+            error = 'dev server exited unexpectedly, exit code: {}'.format(process.exitcode)
+            logger.error(error)
+            self._timeline = None
+            self._set_state(FAILED, {'error': error, 'traceback': None})
+
+    def _set_state(self, state, failure=None):
+        logger.debug('dev server %s', state)
+        self.state = state
+        if self._primary:
+            self._primary.state = state
+        self.failure = failure
+        waiters, self._state_waiters = self._state_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(state)
+
+    async def wait_ready(self, timeout: float=None) -> str:
+        """
+        Wait for the dev server to be ready to accept requests or to fail to start.
+
+        :return: the state of the dev server, "ready" or "failed", raises asyncio.TimeoutError after timeout
+        """
+        async def wait():
+            while self.state not in (READY, FAILED):
+                waiter = self._loop.create_future()
+                self._state_waiters.append(waiter)
+                await waiter
+            return self.state
+        return await asyncio.wait_for(wait(), timeout, loop=self._loop)
+
+    @property
+    def session(self) -> ClientSession:
+        """
+        Keep-alive connection pool for requests to the dev server.
+        """
+        return self._session
+
+    @property
+    def main_url(self) -> str:
+        """
+        Base url of the dev server for the watcher's own requests.
+        """
+        return 'http://{}:{}'.format(self.request_host, self._config.main_port)
+
+    async def src_reload(self, path: str=None):
+        """
+        Prompt browsers to reload, path is the changed file if there's only one.
+        """
+        if path is not None:
+            try:
+                path = os.path.relpath(path, str(self._config.watch_path))
+            except ValueError:  # pragma: no cover
+                pass
+        return await self.livereload.reload(path)
+
+    def status(self) -> dict:
+        return {
+            'state': self.state,
+            'pid': self._process and self._process.pid,
+            'restarts': self._restarts,
+            'failure': self.failure,
+            'loop': loop_name(self._loop),
+            'last_drain': self.last_drain,
+            'workers': [w.as_dict() for w in [self._primary] + sorted(self._workers, key=lambda w: w.index) if w],
+        }
+
+    async def _finish_timeline(self, timeline):
+        if await self._check_first_request():
+            timeline.mark('first_request')
+            if self._config.warmup:
+                await self._warmup(timeline)
+        if timeline is not self._timeline:
+            # superseded by a newer restart
+            return
+        self._timeline = None
+        if timeline.reload:
+            self._loop.create_task(self.src_reload())
+        self.reload_history.add(timeline)
+        logger.info(timeline.summary())
+
+    async def _warmup(self, timeline):
+        """
+        Replay the most frequent recent requests so lazy imports, caches and connection pools are set up before the
+        reload is reported as complete.
+        """
+        paths = self.request_log.top(self._config.warmup)
+        if not paths:
+            return
+        timeline.warmup = await warm_up(self._session, self.main_url, paths)
+        timeline.mark('warmup')
+        for route in timeline.warmup:
+            logger.debug('warmed up %s: status %s, cold %0.0fms, warm %0.0fms',
+                         route['path'], route['status'], route['cold'] * 1000, route['warm'] * 1000)
+
+    async def _check_first_request(self):
+        url = self.main_url + PING_PATH
+        for _ in range(self._live_checks):
+            try:
+                async with self._session.get(url, timeout=ClientTimeout(total=1)):
+                    return True
+            except (ClientError, asyncio.TimeoutError):
+                await asyncio.sleep(0.1, loop=self._loop)
+        logger.warning('dev server not responding at %s', url)
+        return False
+
+    def _close_control(self, conn):
+        if conn.closed:
+            return
+        self._loop.remove_reader(conn.fileno())
+        conn.close()
+
+    async def _stop_standby(self):
+        if not self._standby:
+            return
+        process, conn = self._standby
+        self._standby = None
+        if process.is_alive():
+            logger.debug('stopping standby process...')
+            conn.send(None)
+            if not await wait_for_exit(process, self._loop, 1):
+                process.terminate()
+                await wait_for_exit(process, self._loop, 1)
+        conn.close()
+
+    @staticmethod
+    def _tty_path():
+        try:
+            return os.ttyname(sys.stdin.fileno())
         except OSError:  # pragma: no branch
             # fileno() always fails with pytest
-            tty_path = '/dev/tty'
+            return '/dev/tty'
         except AttributeError:
             # on windows, without a windows machine I've no idea what else to do here
-            tty_path = None
+            return None
 
-        self._process = Process(target=serve_main_app, args=(self._config, tty_path))
-        self._process.start()
-
-    def _stop_dev_server(self):
+    async def _stop_dev_server(self):
+        """
+        Stop the dev server with SIGINT, escalating to SIGKILL if it hasn't drained its connections and exited within
+        drain_timeout plus shutdown_timeout. This is cancellable, a cancelled stop is picked up by the next one.
+        """
+        if self._process is None:
+            return
         if self._process.is_alive():
             logger.debug('stopping server process...')
+            self._set_state(STOPPING)
             os.kill(self._process.pid, signal.SIGINT)
-            self._process.join(5)
-            if self._process.exitcode is None:
+            self._stopping = True
+            if await wait_for_exit(self._process, self._loop, self._stop_timeout):
+                logger.debug('process stopped')
+            else:
                 logger.warning('process has not terminated, sending SIGKILL')
                 os.kill(self._process.pid, signal.SIGKILL)
-                self._process.join(1)
-            else:
-                logger.debug('process stopped')
+                await wait_for_exit(self._process, self._loop, 1)
+        elif self._stopping:
+            logger.debug('process stopped')
+        elif self.state == FAILED:
+            logger.debug('server process exited, exit code: %s', self._process.exitcode)
         else:
             logger.warning('server process already dead, exit code: %s', self._process.exitcode)
+        if self._control:
+            self._close_control(self._control)
 
     async def close(self, *args):
         self.stopper.set()
-        self._stop_dev_server()
-        await asyncio.gather(super().close(), self._session.close())
+        if self._restart_task:
+            self._restart_task.cancel()
+        if self._roll_task:
+            self._roll_task.cancel()
+        await self._stop_standby()
+        await asyncio.gather(self._stop_dev_server(), *[self._stop_worker(w) for w in list(self._workers)])
+        if self._sock:
+            self._sock.close()
+            if self._unix_path and self._config.unix:
+                # bound by the watcher rather than inherited
+                with contextlib.suppress(OSError):
+                    os.unlink(self._unix_path)
+        if self._session:
+            await asyncio.gather(super().close(), self._session.close())
+        else:
+            # closed before the watcher had started
+            await super().close()
+
+
+class StaticTask(WatchTask):
+    """
+    Watch the static files directory, invalidating cached files and reloading browsers when they change.
+    """
+    def __init__(self, path: str, loop: asyncio.AbstractEventLoop, static_files: StaticFiles,
+                 livereload: LiveReloadClients, *, backend: str='poll'):
+        self._static_files = static_files
+        self._livereload = livereload
+        super().__init__(path, loop, backend=backend)
+
+    async def _run(self):
+        try:
+            async for changes in self._awatch:
+                paths = [path for _, path in changes]
+                self._static_files.invalidate(paths)
+                await self._livereload.reload(self._static_files.url_path(paths[0]) if len(paths) == 1 else None)
+        except Exception as exc:
+            logger.exception(exc)
+            raise SanicDevException('error running static file watcher')
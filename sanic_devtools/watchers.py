@@ -0,0 +1,242 @@
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import sys
+from fnmatch import fnmatch
+
+from watchgod import Change, DefaultWatcher
+
+from .log import rs_dft_logger as logger
+
+WATCHER_BACKENDS = 'auto', 'inotify', 'poll'
+
+DEFAULT_IGNORE = (
+    '.git', '.hg', '__pycache__', 'node_modules', 'site-packages', '.venv', 'venv', '.tox', '.nox',
+    '.mypy_cache', '.pytest_cache', '.idea', '*.py[cod]', '*.sw?', '*~', '.#*',
+)
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class PathFilter:
+    """
+    Decide which files and directories are watched from ignore globs and, optionally, a set of file extensions.
+
+    Globs are matched against both the name and the path relative to the watched directory.
+    """
+    def __init__(self, root_path, ignore=DEFAULT_IGNORE, extensions=None):
+        self.root_path = str(root_path)
+        self.ignore = tuple(ignore)
+        self.extensions = tuple(extensions) if extensions else None
+
+    def is_ignored(self, path, name):
+        rel_path = os.path.relpath(path, self.root_path)
+        return any(fnmatch(name, g) or fnmatch(rel_path, g) for g in self.ignore)
+
+    def should_watch_dir(self, path, name):
+        return not self.is_ignored(path, name)
+
+    def should_watch_file(self, path, name):
+        if self.extensions and not name.endswith(self.extensions):
+            return False
+        return not self.is_ignored(path, name)
+
+
+class GlobWatcher(DefaultWatcher):
+    """
+    watchgod polling watcher using PathFilter, this is the fallback where inotify isn't available.
+    """
+    def __init__(self, root_path, ignore=DEFAULT_IGNORE, extensions=None):
+        self._filter = PathFilter(root_path, ignore, extensions)
+        super().__init__(root_path)
+
+    def should_watch_dir(self, entry):
+        return self._filter.should_watch_dir(entry.path, entry.name)
+
+    def should_watch_file(self, entry):
+        return self._filter.should_watch_file(entry.path, entry.name)
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:  # pragma: no cover
+        return None
+    if not hasattr(libc, 'inotify_init1'):  # pragma: no cover
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+def inotify_available():
+    return _libc is not None
+
+
+class InotifyWatcher:
+    """
+    Watch a directory tree with inotify, yielding batches of changes like watchgod.awatch without walking the tree.
+
+    Events are read from the inotify fd on the event loop, events arriving within min_sleep milliseconds of each
+    other are grouped into a single batch.
+    """
+    def __init__(self, path, *, ignore=DEFAULT_IGNORE, extensions=None, min_sleep=50, stop_event=None, loop=None):
+        self._loop = loop or asyncio.get_event_loop()
+        self._filter = PathFilter(path, ignore, extensions)
+        self._min_sleep = min_sleep / 1000
+        self._stop_event = stop_event
+        self._changes = set()
+        self._changed = asyncio.Event(loop=self._loop)
+        self._watches = {}
+        self._reading = False
+        self.lock = asyncio.Lock(loop=self._loop)
+
+        self._fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise self._os_error()
+        try:
+            self._add_tree(str(path))
+        except OSError:
+            os.close(self._fd)
+            raise
+        logger.debug('inotify watching %d directories under %s', len(self._watches), path)
+
+    @staticmethod
+    def _os_error():
+        e = ctypes.get_errno()
+        return OSError(e, os.strerror(e))
+
+    def _add_watch(self, dir_path):
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(dir_path), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            error = self._os_error()
+            if error.errno == errno.ENOSPC:
+                raise OSError(error.errno, 'inotify watch limit reached, see fs.inotify.max_user_watches')
+            if error.errno not in (errno.ENOENT, errno.ENOTDIR):  # pragma: no cover
+                raise error
+            return
+        self._watches[wd] = dir_path
+
+    def _add_tree(self, dir_path, new=False):
+        """
+        Watch dir_path and the directories below it, when new is True the files found are reported as added.
+        """
+        self._add_watch(dir_path)
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if self._filter.should_watch_dir(entry.path, entry.name):
+                    self._add_tree(entry.path, new)
+            elif new and self._filter.should_watch_file(entry.path, entry.name):
+                self._changes.add((Change.added, entry.path))
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:  # pragma: no cover
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0').decode(errors='surrogateescape')
+            offset += name_len
+            self._handle_event(wd, mask, name)
+        if self._changes:
+            self._changed.set()
+
+    def _handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            logger.warning('inotify event queue overflowed, some changes may have been missed')
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        dir_path = self._watches.get(wd)
+        if dir_path is None or not name:
+            return
+        path = os.path.join(dir_path, name)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO) and self._filter.should_watch_dir(path, name):
+                try:
+                    self._add_tree(path, new=True)
+                except OSError as e:
+                    logger.warning('unable to watch %s: %s', path, e)
+            return
+        if not self._filter.should_watch_file(path, name):
+            return
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            self._changes.add((Change.added, path))
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self._changes.discard((Change.modified, path))
+            self._changes.add((Change.deleted, path))
+        elif (Change.added, path) not in self._changes:
+            # writing to a new file in the same batch still counts as just adding it
+            self._changes.add((Change.modified, path))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._reading and self._fd is not None:
+            # events are queued by the kernel from when the watches were added, so it's fine to start reading late
+            self._loop.add_reader(self._fd, self._read_events)
+            self._reading = True
+        async with self.lock:
+            while True:
+                if self._stop_event and self._stop_event.is_set():
+                    self.close()
+                    raise StopAsyncIteration()
+                waiters = [self._loop.create_task(self._changed.wait())]
+                if self._stop_event:
+                    waiters.append(self._loop.create_task(self._stop_event.wait()))
+                _, pending = await asyncio.wait(waiters, loop=self._loop, return_when=asyncio.FIRST_COMPLETED)
+                for task in pending:
+                    task.cancel()
+                if not self._changed.is_set():
+                    continue
+
+                # group events arriving close together, eg. an editor writing then renaming a file
+                while True:
+                    count = len(self._changes)
+                    await asyncio.sleep(self._min_sleep, loop=self._loop)
+                    if len(self._changes) == count:
+                        break
+                changes, self._changes = self._changes, set()
+                self._changed.clear()
+                return changes
+
+    def close(self):
+        if self._fd is not None:
+            if self._reading:
+                self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
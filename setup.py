@@ -12,7 +12,7 @@ install_requires = [
     'click>=6.6',
     'devtools>=0.5',
     'Pygments>=2.2.0',
-    'watchgod>=0.2',
+    'watchgod>=0.5',
     'sanic',
 ]
 
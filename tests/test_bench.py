@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+
+import pytest
+from click.testing import CliRunner
+from pytest_toolbox import mktree
+
+from sanic_devtools.bench import bench, compare_baseline, load_baseline, parse_targets, process_usage
+from sanic_devtools.cli import cli
+from sanic_devtools.config import Config
+from sanic_devtools.exceptions import SanicDevException
+from sanic_devtools.serve import start_main_app
+
+from .conftest import SIMPLE_APP
+
+
+def test_parse_targets(tmpdir):
+    assert parse_targets([]) == [('GET', '/', None)]
+    request_file = tmpdir.join('requests.txt')
+    request_file.write('# comment\n\n/about\npost /items {"name": "x"}\n')
+    assert parse_targets(['/', 'DELETE /items/1'], str(request_file)) == [
+        ('GET', '/', None),
+        ('DELETE', '/items/1', None),
+        ('GET', '/about', None),
+        ('POST', '/items', '{"name": "x"}'),
+    ]
+    with pytest.raises(SanicDevException):
+        parse_targets(['GET about'])
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc')
+def test_process_usage():
+    usage = process_usage(os.getpid())
+    assert usage['rss'] > 0
+    assert usage['peak_rss'] >= usage['rss']
+    assert usage['cpu'] > 0
+
+
+def test_compare_baseline():
+    baseline = {'throughput': 1000, 'latency_ms': {'p99': 10}, 'error_rate': 0}
+    assert compare_baseline({'throughput': 950, 'latency_ms': {'p99': 10.5}, 'error_rate': 0}, baseline, 10) == []
+    assert compare_baseline({'throughput': 800, 'latency_ms': {'p99': 20}, 'error_rate': 0.01}, baseline, 10) == [
+        'throughput 800 requests/s, baseline 1000 requests/s',
+        'p99 latency 20.00ms, baseline 10.00ms',
+        'error rate 1.00%, baseline 0.00%',
+    ]
+    # a single error isn't a regression against an error free baseline
+    assert compare_baseline({'throughput': 1000, 'latency_ms': {'p99': 10}, 'error_rate': 0.0001}, baseline, 10) == []
+
+
+@pytest.mark.parametrize('content', ['[1, 2]', '{"requests": 10}', '{"throughput": 1, "error_rate": "x"}',
+                                     '{"throughput": 1, "error_rate": 0, "latency_ms": {}}'])
+def test_load_baseline_invalid(tmpdir, content):
+    path = tmpdir.join('baseline.json')
+    path.write(content)
+    with pytest.raises(SanicDevException) as exc_info:
+        load_baseline(str(path))
+    assert 'is not a bench result' in str(exc_info.value)
+
+
+async def test_bench(unused_port, tmpworkdir, loop):
+    mktree(tmpworkdir, SIMPLE_APP)
+    config = Config(app_path='app.py', main_port=unused_port)
+    runner = await start_main_app(config, config.import_app_factory(), loop)
+    try:
+        result = await bench('http://127.0.0.1:{}'.format(unused_port), [('GET', '/', None), ('GET', '/missing', None)],
+                             requests=20, concurrency=3, timeout=5, warmup=5, pid=os.getpid(), loop=loop)
+    finally:
+        await runner.close()
+    assert result['requests'] == 20
+    assert result['statuses'] == {'200': 10, '404': 10}
+    assert result['errors'] == 0
+    assert {k: v['requests'] for k, v in result['routes'].items()} == {'GET /': 10, 'GET /missing': 10}
+    assert result['latency_ms']['p50'] <= result['latency_ms']['max']
+    if sys.platform.startswith('linux'):
+        assert result['server']['pid'] == os.getpid()
+
+
+def test_bench_cli_baseline(mocker, tmpdir):
+    result = {'throughput': 500, 'latency_ms': {'p99': 10}, 'error_rate': 0}
+    mock_run_bench = mocker.patch('sanic_devtools.cli.run_bench', return_value=result)
+    baseline = tmpdir.join('baseline.json')
+    baseline.write(json.dumps({'throughput': 1000, 'latency_ms': {'p99': 10}, 'error_rate': 0}))
+    output = tmpdir.join('output.json')
+    runner = CliRunner()
+    r = runner.invoke(cli, ['bench', '--url', 'http://localhost:8000', '--route', '/', '-o', str(output),
+                            '--baseline', str(baseline)])
+    assert r.exit_code == 1, r.output
+    assert 'regression: throughput 500 requests/s, baseline 1000 requests/s' in r.output
+    assert json.loads(output.read()) == result
+    assert mock_run_bench.call_args[0] == (None, [('GET', '/', None)])
+    assert mock_run_bench.call_args[1]['url'] == 'http://localhost:8000'
+
+    r = runner.invoke(cli, ['bench', '--url', 'http://localhost:8000', '--baseline', str(baseline),
+                            '--tolerance', '60'])
+    assert r.exit_code == 0, r.output
+
+    baseline.write(json.dumps({'requests': 10}))
+    r = runner.invoke(cli, ['bench', '--url', 'http://localhost:8000', '--baseline', str(baseline)])
+    assert r.exit_code == 2, r.output
+    assert 'is not a bench result, invalid or missing: throughput, error_rate' in r.output
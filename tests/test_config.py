@@ -1,3 +1,5 @@
+import sys
+
 import pytest
 from sanic import Sanic
 from pytest_toolbox import mktree
@@ -38,3 +40,116 @@ def app_factory():
     config = Config(app_path='app_not_sanic.py')
     with pytest.raises(SanicDevConfigError):
         await config.load_app(config.import_app_factory())
+
+
+async def test_stable_modules(tmpworkdir):
+    mktree(tmpworkdir, {
+        'stable_app.py': """\
+import colorsys
+import stable_helpers
+from sanic import Sanic
+app = Sanic()
+""",
+        'stable_helpers.py': '',
+    })
+    sys.modules.pop('colorsys', None)
+    config = Config(app_path='stable_app.py')
+    config.import_app_factory()
+    assert 'colorsys' in config.stable_modules
+    assert 'stable_helpers' not in config.stable_modules
+    assert 'stable_app' not in config.stable_modules
+
+
+def test_locate_app_factory(tmpworkdir):
+    mktree(tmpworkdir, {
+        'located_app.py': """\
+import json
+from sanic import Sanic
+from sanic.response import text
+from located_pkg import views
+from . import nothing
+
+raise RuntimeError('the module should not be run')
+
+try:
+    import ujson
+except ImportError:
+    pass
+
+def create_app():
+    return Sanic()
+""",
+        'located_pkg': {
+            '__init__.py': '',
+            'views.py': """\
+import colorsys
+from .helpers import helper
+""",
+            'helpers.py': """\
+def helper():
+    import urllib.parse
+""",
+        },
+    })
+    config = Config(app_path='located_app.py', standby=True)
+    config.locate_app_factory()
+    assert config.app_factory_name == 'create_app'
+    assert config.watch_path == tmpworkdir
+    assert 'located_app' not in sys.modules
+    assert 'located_pkg' not in sys.modules
+    assert 'colorsys' in config.stable_modules
+    assert 'urllib.parse' in config.stable_modules
+    assert {'json', 'sanic', 'sanic.response'} <= set(config.stable_modules)
+    assert 'sanic.response.text' not in config.stable_modules
+    assert not any(m.startswith('located_') for m in config.stable_modules)
+
+
+@pytest.mark.parametrize('source,factory_name,error', [
+    ('x = 1', None, 'No name supplied and no default app factory found in located_app.py'),
+    ('app += 1', None, 'No name supplied and no default app factory found in located_app.py'),
+    ('app: int', None, 'No name supplied and no default app factory found in located_app.py'),
+    ('x = {}\nx[app] = x.app = 1', None, 'No name supplied and no default app factory found in located_app.py'),
+    ('def create_app(): pass', 'missing', 'Module "located_app.py" does not define a "missing" attribute/class'),
+    ('def create_app(:', None, 'error importing "located_app"'),
+])
+def test_locate_app_factory_errors(tmpworkdir, source, factory_name, error):
+    mktree(tmpworkdir, {'located_app.py': source})
+    config = Config(app_path='located_app.py', app_factory_name=factory_name)
+    with pytest.raises(SanicDevConfigError) as exc_info:
+        config.locate_app_factory()
+    assert error in str(exc_info.value)
+
+
+@pytest.mark.parametrize('source', ['app = 1', 'app: int = 1', 'other, (app, *rest) = 1, (2, 3)'])
+def test_locate_app_factory_assigned(tmpworkdir, source):
+    mktree(tmpworkdir, {'located_app.py': source})
+    config = Config(app_path='located_app.py')
+    config.locate_app_factory()
+    assert config.app_factory_name == 'app'
+
+
+def test_locate_app_factory_star_import(tmpworkdir):
+    mktree(tmpworkdir, {
+        'located_app.py': 'from located_factories import *',
+        'located_factories.py': 'def app_factory(): pass',
+    })
+    config = Config(app_path='located_app.py')
+    # can't be told without running the module, so it's left to the dev server
+    config.locate_app_factory()
+    assert config.app_factory_name is None
+    config = Config(app_path='located_app.py', app_factory_name='app_factory')
+    config.locate_app_factory()
+    assert config.app_factory_name == 'app_factory'
+
+
+@pytest.mark.parametrize('unix_mode,expected', [('660', 0o660), (0o600, 0o600), ('0755', 0o755)])
+def test_unix_mode(tmpworkdir, unix_mode, expected):
+    mktree(tmpworkdir, SIMPLE_APP)
+    assert Config(app_path='app.py', unix_mode=unix_mode).unix_mode == expected
+
+
+@pytest.mark.parametrize('unix_mode', ['rw', '999', 0o1777, None])
+def test_unix_mode_invalid(tmpworkdir, unix_mode):
+    mktree(tmpworkdir, SIMPLE_APP)
+    with pytest.raises(SanicDevConfigError):
+        Config(app_path='app.py', unix_mode=unix_mode)
@@ -0,0 +1,85 @@
+import sys
+import types
+
+import pytest
+from pytest_toolbox import mktree
+from sanic import Sanic
+
+from sanic_devtools.config import Config
+from sanic_devtools.hot import HotReloadError, check_reloadable, reload_modules, reload_order
+
+
+def test_reload_order():
+    graph = {
+        'app': {'routes'},
+        'routes': {'views', 'utils'},
+        'views': {'utils'},
+        'utils': set(),
+        'scripts': {'utils'},
+    }
+    assert reload_order({'views'}, graph) == ['views', 'routes', 'app']
+    assert reload_order({'utils'}, graph) == ['utils', 'scripts', 'views', 'routes', 'app']
+
+
+def test_reload_order_cycle():
+    with pytest.raises(HotReloadError):
+        reload_order({'a'}, {'a': {'b'}, 'b': {'a'}})
+
+
+def test_check_reloadable():
+    module = types.ModuleType('views')
+    module.handler = lambda request: None
+    module.NAME = 'views'
+    check_reloadable(module)
+
+    module.app = Sanic('test_check_reloadable')
+    with pytest.raises(HotReloadError) as excinfo:
+        check_reloadable(module)
+    assert excinfo.value.args[0] == '"views" defines the app "app"'
+
+    del module.app
+    module.cache = {}
+    with pytest.raises(HotReloadError) as excinfo:
+        check_reloadable(module)
+    assert excinfo.value.args[0] == '"views.cache" is a module level dict instance'
+
+
+def test_reload_modules(tmpworkdir, monkeypatch):
+    mktree(tmpworkdir, {
+        'hot_app.py': """\
+from sanic import Sanic
+from hot_routes import register_routes
+
+def create_app():
+    app = Sanic('hot_app')
+    register_routes(app)
+    return app
+""",
+        'hot_routes.py': """\
+from hot_views import hello
+
+def register_routes(app):
+    app.add_route(hello, '/')
+""",
+        'hot_views.py': """\
+async def hello(request):
+    return 1
+""",
+    })
+    config = Config(app_path='hot_app.py')
+    config.import_app_factory()
+    old_hello = sys.modules['hot_routes'].hello
+
+    tmpworkdir.join('hot_views.py').write('async def hello(request):\n    return 2\n')
+    modules = reload_modules(config, [str(tmpworkdir.join('hot_views.py'))])
+    assert modules == ['hot_views', 'hot_routes', 'hot_app']
+    assert sys.modules['hot_routes'].hello is not old_hello
+    assert sys.modules['hot_routes'].hello is sys.modules['hot_views'].hello
+
+
+def test_reload_modules_not_loaded(tmpworkdir):
+    mktree(tmpworkdir, {'hot_app2.py': 'from sanic import Sanic\n\ndef create_app():\n    return Sanic()\n'})
+    config = Config(app_path='hot_app2.py')
+    config.import_app_factory()
+    with pytest.raises(HotReloadError):
+        reload_modules(config, [str(tmpworkdir.join('missing.py'))])
@@ -0,0 +1,51 @@
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+from sanic import Sanic
+from sanic.response import html, text
+from sanic.websocket import WebSocketProtocol
+
+from sanic_devtools.livereload import LIVE_RELOAD_PROTOCOL, LiveReloadClients, inject_livereload
+from sanic_devtools.serve import create_auxiliary_app
+
+
+async def test_inject_livereload(sanic_client):
+    app = Sanic('livereload_inject')
+
+    @app.route('/')
+    async def index(request):
+        return html('<h1>hello</h1>')
+
+    @app.route('/text')
+    async def plain(request):
+        return text('hello')
+
+    inject_livereload(app, MagicMock(infer_host=True, aux_port=8001, aux_prefix=''))
+    cli = await sanic_client(app)
+    r = await cli.get('/', headers={'host': 'example.com:8000'})
+    assert await r.text() == '<h1>hello</h1>\n<script src="http://example.com:8001/livereload.js"></script>\n'
+    r = await cli.get('/text')
+    assert await r.text() == 'hello'
+
+
+async def test_livereload_websocket(sanic_client):
+    app_task = MagicMock(livereload=LiveReloadClients())
+    cli = await sanic_client(create_auxiliary_app(app_task), protocol=WebSocketProtocol)
+    r = await cli.get('/livereload.js')
+    assert r.status == 200
+    assert 'new WebSocket' in await r.text()
+
+    ws = await cli.ws_connect('/livereload')
+    await ws.send_str(json.dumps({'command': 'hello', 'protocols': [LIVE_RELOAD_PROTOCOL]}))
+    msg = json.loads(await ws.receive_str())
+    assert msg['command'] == 'hello'
+    assert len(app_task.livereload.sockets) == 1
+
+    assert await app_task.livereload.reload('static/styles.css') == 1
+    msg = json.loads(await ws.receive_str())
+    assert msg == {'command': 'reload', 'path': 'static/styles.css', 'liveCSS': True, 'liveImg': True}
+    await ws.close()
+    await asyncio.sleep(0.05)
+    assert app_task.livereload.sockets == set()
+    assert await app_task.livereload.reload() == 0
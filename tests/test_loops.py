@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from sanic_devtools.loops import loop_name, set_loop_policy
+
+uvloop = pytest.importorskip('uvloop')
+
+
+@pytest.fixture
+def restore_policy():
+    policy = asyncio.get_event_loop_policy()
+    yield
+    asyncio.set_event_loop_policy(policy)
+
+
+def test_asyncio_loop(restore_policy):
+    assert set_loop_policy('asyncio') == 'asyncio'
+    loop = asyncio.new_event_loop()
+    try:
+        assert isinstance(loop, asyncio.SelectorEventLoop)
+        assert loop_name(loop) == 'asyncio'
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize('choice', ['uvloop', 'auto'])
+def test_uvloop(restore_policy, choice):
+    set_loop_policy('asyncio')
+    assert set_loop_policy(choice) == 'uvloop'
+    policy = asyncio.get_event_loop_policy()
+    assert isinstance(policy, uvloop.EventLoopPolicy)
+    # already uvloop's policy so it's kept
+    set_loop_policy(choice)
+    assert asyncio.get_event_loop_policy() is policy
+    loop = policy.new_event_loop()
+    try:
+        assert loop_name(loop) == 'uvloop'
+    finally:
+        loop.close()
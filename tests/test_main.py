@@ -5,29 +5,33 @@ import signal
 import time
 from multiprocessing import Process
 from unittest import mock
+from unittest.mock import MagicMock
 
 import aiohttp
 import pytest
 from sanic import Sanic
 from pytest_toolbox import mktree
 
-from sanic_devtools.main import run_app, runserver
+from sanic_devtools.main import run_app, runserver, set_process_start_method
 from sanic_devtools.config import Config
+from sanic_devtools.metrics import ReloadHistory, ReloadTimeline
 from sanic_devtools.serve import create_auxiliary_app, start_main_app
 
 from .conftest import SIMPLE_APP
 
 
 @pytest.mark.boxed
-def test_start_runserver_app_instance(tmpworkdir):
+def test_start_runserver_app_instance(tmpworkdir, unused_port):
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     mktree(tmpworkdir, SIMPLE_APP)
-    aux_app, aux_port, _ = runserver(app_path='app.py', host='foobar.com')
+    # runserver binds the main port for the dev server, so keep clear of the default port used by other tests
+    aux_app, aux_port, _ = runserver(app_path='app.py', host='localhost', main_port=unused_port)
     assert isinstance(aux_app, Sanic)
-    assert aux_port == 8001
-    assert len(aux_app.listeners["after_server_start"]) == 1
-    assert len(aux_app.listeners["before_server_stop"]) == 1
+    assert aux_port == unused_port + 1
+    assert [f.__name__ for f in aux_app.listeners["before_server_start"]] == ['start']
+    # the livereload websocket adds sanic's own listener to cancel websocket tasks
+    assert [f.__name__ for f in aux_app.listeners["before_server_stop"]] == ['cancel_websocket_tasks', 'close']
 
 
 def kill_parent_soon(pid):
@@ -66,6 +70,37 @@ async def test_aux_app(tmpworkdir, sanic_client):
     assert r.status == 200
 
 
+async def test_aux_app_reload_metrics(sanic_client):
+    app_task = MagicMock(reload_history=ReloadHistory())
+    timeline = ReloadTimeline(1)
+    timeline.update({'stop': 0.5})
+    app_task.reload_history.add(timeline)
+    cli = await sanic_client(create_auxiliary_app(app_task))
+    r = await cli.get('/metrics/reloads')
+    assert r.status == 200
+    data = await r.json()
+    assert data['reloads'][0]['phases'] == {'stop': 0.5}
+    assert data['phases']['stop']['p50'] == 0.5
+
+
+async def test_aux_app_status(sanic_client):
+    app_task = MagicMock()
+    wait_ready = MagicMock()
+
+    async def mock_wait_ready(timeout):
+        wait_ready(timeout)
+        return 'ready'
+    app_task.wait_ready = mock_wait_ready
+    app_task.status.return_value = {'state': 'ready', 'pid': 123, 'restarts': 0, 'failure': None}
+    cli = await sanic_client(create_auxiliary_app(app_task))
+    r = await cli.get('/status?wait=2.5')
+    assert r.status == 200
+    assert (await r.json())['state'] == 'ready'
+    wait_ready.assert_called_once_with(2.5)
+    r = await cli.get('/status?wait=foo')
+    assert r.status == 400
+
+
 @pytest.mark.boxed
 async def test_serve_main_app(tmpworkdir, loop):
     mktree(tmpworkdir, SIMPLE_APP)
@@ -73,3 +108,23 @@ async def test_serve_main_app(tmpworkdir, loop):
     runner = await start_main_app(config, config.import_app_factory(), loop)
     assert runner.is_running == True
     await runner.close()
+
+
+def test_set_process_start_method_preload(tmpworkdir, mocker):
+    mock_set_start_method = mocker.patch('sanic_devtools.main.set_start_method')
+    mock_set_preload = mocker.patch('sanic_devtools.main.set_forkserver_preload')
+    mktree(tmpworkdir, SIMPLE_APP)
+    config = Config(app_path='app.py', preload=True, preload_modules=['json'])
+    set_process_start_method(config)
+    mock_set_start_method.assert_called_once_with('forkserver')
+    modules = mock_set_preload.call_args[0][0]
+    assert modules[:2] == ['sanic_devtools.serve', 'json']
+
+
+def test_set_process_start_method_spawn(tmpworkdir, mocker):
+    mock_set_start_method = mocker.patch('sanic_devtools.main.set_start_method')
+    mock_set_preload = mocker.patch('sanic_devtools.main.set_forkserver_preload')
+    mktree(tmpworkdir, SIMPLE_APP)
+    set_process_start_method(Config(app_path='app.py'))
+    mock_set_start_method.assert_called_once_with('spawn')
+    assert mock_set_preload.called is False
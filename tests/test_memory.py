@@ -0,0 +1,65 @@
+import pytest
+from pytest_toolbox import mktree
+
+from sanic_devtools.config import Config
+from sanic_devtools.exceptions import SanicDevConfigError
+from sanic_devtools.memory import MemoryTracer, format_diff
+
+leaked = []
+
+
+def leak():
+    leaked.append([object() for _ in range(1000)])
+
+
+@pytest.fixture
+def tracer():
+    tracer = MemoryTracer(frames=2)
+    yield tracer
+    tracer.stop()
+    leaked.clear()
+
+
+def test_compare(tracer):
+    baseline = tracer.start()
+    assert baseline['id'] == 1
+    assert baseline['label'] == 'startup'
+    leak()
+    second = tracer.take_snapshot('manual')
+    assert second['traced'] > baseline['traced']
+
+    diff = tracer.compare()
+    assert diff['first']['id'] == 1
+    assert diff['second']['id'] == 2
+    assert diff['size_diff'] > 0
+    top = diff['stats'][0]
+    assert top['file'] == __file__
+    assert top['count_diff'] >= 1000
+    assert 'test_memory.py:' in format_diff(diff)
+
+    diff = tracer.compare(group='traceback')
+    assert len(diff['stats'][0]['traceback']) == 2
+
+    with pytest.raises(ValueError):
+        tracer.compare(first=1, second=5)
+    with pytest.raises(ValueError):
+        tracer.compare(second=1)
+
+
+def test_snapshot_every(tracer):
+    snapshots = []
+    tracer.every = 2
+    tracer.on_snapshot = snapshots.append
+    tracer.max_snapshots = 3
+    tracer.start()
+    for _ in range(6):
+        tracer.request_finished()
+    assert [s['requests'] for s in snapshots] == [2, 4, 6]
+    # the baseline is kept while older snapshots are dropped
+    assert [s['id'] for s in tracer.snapshots()] == [1, 3, 4]
+
+
+def test_trace_malloc_frames(tmpworkdir):
+    mktree(tmpworkdir, {'app.py': ''})
+    with pytest.raises(SanicDevConfigError):
+        Config(app_path='app.py', trace_malloc=100)
@@ -0,0 +1,67 @@
+import pytest
+
+from sanic_devtools.metrics import (LatencyHistogram, PhaseTimer, ReloadHistory, ReloadTimeline, RouteHistograms,
+                                    RouteMetrics, percentile)
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([5], 95) == 5
+
+
+def test_phase_timer():
+    timer = PhaseTimer(start=0)
+    timer.update({'import_app_factory': 0.5})
+    timer.mark('load_app')
+    assert list(timer.phases) == ['import_app_factory', 'load_app']
+    assert 0 <= timer.phases['load_app'] < 1
+
+
+def test_reload_history():
+    history = ReloadHistory(maxlen=2)
+    for i, stop in enumerate([0.1, 0.2, 0.3]):
+        timeline = ReloadTimeline(i)
+        timeline.update({'stop': stop, 'spawn': 0.01})
+        history.add(timeline)
+    assert [t['reload'] for t in history.as_dict()['reloads']] == [1, 2]
+    phases = history.percentiles()
+    assert list(phases) == ['total', 'stop', 'spawn']
+    assert phases['stop'] == {'count': 2, 'p50': 0.2, 'p95': 0.3}
+    assert timeline.summary() == 'reload 2 took 0.31s: stop 300ms, spawn 10ms'
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    histogram.record(1000)
+    assert len(histogram.counts) == LatencyHistogram.BUCKETS
+    assert histogram.percentile(50) == pytest.approx(0.05, rel=0.05)
+    assert histogram.percentile(90) == pytest.approx(0.09, rel=0.05)
+    assert histogram.percentile(100) == LatencyHistogram.MAX_VALUE / 1e6
+    copy = LatencyHistogram.from_dict(histogram.as_dict())
+    assert copy.counts == histogram.counts
+    assert copy.count == 101
+
+
+def test_route_metrics():
+    metrics = RouteMetrics()
+    metrics.start_version(0)
+    histograms = RouteHistograms()
+    histograms.since = metrics.versions[-1]['started']
+    histograms.record('GET', '/users/<id>', 0.01)
+    histograms.record('GET', '/users/<id>', 0.02)
+    metrics.update(histograms.snapshot())
+    metrics.start_version(1)
+    # a late report from before the reload
+    metrics.update(histograms.snapshot())
+    data = metrics.as_dict()
+    assert [v['reload'] for v in data['reloads']] == [0, 1]
+    route = data['reloads'][0]['routes']['GET /users/<id>']
+    assert route['count'] == 2
+    assert route['p50'] == pytest.approx(0.01, rel=0.05)
+    assert route['throughput'] > 0
+    assert data['reloads'][1]['routes'] == {}
@@ -0,0 +1,47 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from sanic_devtools.monitor import LoopMonitor
+
+
+def blocking_call():
+    time.sleep(0.2)
+
+
+async def test_block_caught(loop):
+    monitor = LoopMonitor(loop, 0.05)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.1, loop=loop)
+
+        async def handler():
+            monitor.request_started(SimpleNamespace(method='GET', path='/slow'))
+            try:
+                blocking_call()
+            finally:
+                monitor.request_finished()
+        await loop.create_task(handler())
+        await asyncio.sleep(0.1, loop=loop)
+    finally:
+        monitor.stop()
+    snapshot = monitor.snapshot()
+    assert snapshot['block_count'] == 1
+    assert snapshot['lag']['max'] >= 0.1
+    assert snapshot['lag']['p50'] < 0.05
+    block = snapshot['blocks'][0]
+    assert block['request'] == 'GET /slow'
+    assert block['stack'][0].endswith('in blocking_call')
+    assert block['stack'][1].endswith('in handler')
+    assert monitor.requests == {}
+
+
+async def test_no_block(loop):
+    monitor = LoopMonitor(loop, 0.05)
+    monitor.start()
+    for _ in range(10):
+        await asyncio.sleep(0.02, loop=loop)
+    monitor.stop()
+    snapshot = monitor.snapshot()
+    assert snapshot['block_count'] == 0
+    assert snapshot['lag']['count'] >= 5
@@ -0,0 +1,48 @@
+import marshal
+import time
+
+from sanic_devtools.profiler import Profiler
+
+
+def busy_function():
+    end = time.monotonic() + 0.1
+    while time.monotonic() < end:
+        sum(range(100))
+
+
+def test_cprofile():
+    profiler = Profiler('cprofile')
+    profiler.start()
+    busy_function()
+    result = profiler.stop()
+    assert result['mode'] == 'cprofile'
+    assert 'busy_function' in result['text']
+    stats = marshal.loads(result['pstats'])
+    assert any(func == 'busy_function' for _, _, func in stats)
+
+
+def test_sampler():
+    profiler = Profiler('sample')
+    profiler.start()
+    busy_function()
+    result = profiler.stop()
+    assert result['samples'] > 0
+    stack, count = result['collapsed'].splitlines()[-1].rsplit(' ', 1)
+    assert 'test_sampler (test_profiler.py:' in stack
+    assert 'busy_function (test_profiler.py:' in result['collapsed']
+
+
+def test_profile_requests():
+    results = []
+    profiler = Profiler(requests=2, on_done=results.append)
+    profiler.start()
+    sum(range(10))
+    profiler.request_started()
+    busy_function()
+    assert profiler.request_finished() is False
+    profiler.request_started()
+    assert profiler.request_finished() is True
+    assert results[0]['requests'] == 2
+    assert 'busy_function' in results[0]['text']
+    # only the requests were profiled
+    assert 'test_profile_requests' not in results[0]['text']
@@ -0,0 +1,153 @@
+import asyncio
+
+from aiohttp import ClientSession
+from sanic import Sanic
+from sanic.response import text
+
+from sanic_devtools.proxy import PROXY_ATTEMPTS, RestartProxy
+from sanic_devtools.runner import AppRunner
+from sanic_devtools.serve import HOST, create_auxiliary_app
+from sanic_devtools.warmup import RequestLog
+
+
+class FakeAppTask:
+    def __init__(self, loop, state='ready'):
+        self.state = state
+        self.failure = None
+        self.session = ClientSession(loop=loop)
+        self.ready = asyncio.Event(loop=loop)
+        self.request_log = RequestLog()
+
+    async def wait_ready(self, timeout):
+        await asyncio.wait_for(self.ready.wait(), timeout)
+        return self.state
+
+    def set_state(self, state):
+        self.state = state
+        self.ready.set()
+
+
+async def start_dev_app(port, loop):
+    app = Sanic('proxied_app')
+
+    @app.route('/echo/<name>', methods=['GET', 'POST'])
+    async def echo(request, name):
+        return text('{} {} {} {}'.format(request.method, name, request.args.get('q'), request.body.decode()),
+                    headers={'X-App': 'yes'})
+
+    runner = AppRunner(app, HOST, port, loop=loop)
+    await runner.start()
+    return runner
+
+
+async def test_proxy_forward(sanic_client, unused_port, loop):
+    runner = await start_dev_app(unused_port, loop)
+    app_task = FakeAppTask(loop)
+    proxy = RestartProxy(app_task, unused_port)
+    cli = await sanic_client(create_auxiliary_app(app_task, proxy=proxy))
+    try:
+        r = await cli.post('/echo/foo?q=bar', data=b'payload')
+        assert r.status == 200
+        assert await r.text() == 'POST foo bar payload'
+        assert r.headers['X-App'] == 'yes'
+        assert (await cli.get('/_sanic_devtools/metrics/proxy')).status == 200
+        assert proxy.stats.forwarded == 1
+        assert proxy.stats.queued == 0
+        assert list(app_task.request_log.requests) == []
+        await cli.get('/echo/foo?q=bar')
+        assert app_task.request_log.top(5) == ['/echo/foo?q=bar']
+    finally:
+        await runner.close()
+        await app_task.session.close()
+
+
+async def test_proxy_queue_while_restarting(sanic_client, unused_port, loop):
+    runner = await start_dev_app(unused_port, loop)
+    app_task = FakeAppTask(loop, state='starting')
+    proxy = RestartProxy(app_task, unused_port, queue_size=2, timeout=5)
+    cli = await sanic_client(create_auxiliary_app(app_task, proxy=proxy))
+    try:
+        requests = [loop.create_task(cli.get('/echo/{}'.format(i))) for i in range(3)]
+        await asyncio.sleep(0.1)
+        assert proxy.waiting == 2
+        app_task.set_state('ready')
+        statuses = sorted([(await r).status for r in requests])
+        assert statuses == [200, 200, 503]
+        stats = proxy.stats.as_dict()
+        assert stats['queued'] == 2
+        assert stats['replayed'] == 2
+        assert stats['rejected'] == 1
+        assert stats['queue_wait']['count'] == 2
+        assert stats['queue_wait']['p50'] >= 0.05
+    finally:
+        await runner.close()
+        await app_task.session.close()
+
+
+async def test_proxy_timeout_and_failure(sanic_client, unused_port, loop):
+    app_task = FakeAppTask(loop, state='starting')
+    proxy = RestartProxy(app_task, unused_port, timeout=0.05)
+    cli = await sanic_client(create_auxiliary_app(app_task, proxy=proxy))
+    try:
+        r = await cli.get('/anything')
+        assert r.status == 504
+        app_task.failure = {'error': 'broken app', 'traceback': None}
+        app_task.set_state('failed')
+        r = await cli.get('/anything')
+        assert r.status == 502
+        assert await r.text() == 'dev server failed to start: broken app'
+        assert proxy.stats.timed_out == 1
+    finally:
+        await app_task.session.close()
+
+
+async def test_proxy_aux_routes_namespaced(sanic_client, unused_port, loop):
+    app = Sanic('proxied_status_app')
+
+    @app.route('/status')
+    async def status(request):
+        return text('app status')
+
+    runner = AppRunner(app, HOST, unused_port, loop=loop)
+    await runner.start()
+    app_task = FakeAppTask(loop)
+    app_task.status = lambda: {'state': 'ready'}
+    cli = await sanic_client(create_auxiliary_app(app_task, proxy=RestartProxy(app_task, unused_port)))
+    try:
+        r = await cli.get('/status')
+        assert await r.text() == 'app status'
+        r = await cli.get('/_sanic_devtools/status')
+        assert await r.json() == {'state': 'ready'}
+    finally:
+        await runner.close()
+        await app_task.session.close()
+
+
+async def test_proxy_retry_idempotent_only(sanic_client, unused_port, loop):
+    connections = []
+
+    def hang_up(reader, writer):
+        # a dev server which stops as the request arrives
+        connections.append(writer)
+        writer.close()
+
+    server = await asyncio.start_server(hang_up, HOST, unused_port, loop=loop)
+    app_task = FakeAppTask(loop, state='starting')
+    # wait_ready returns straight away, with the dev server still not ready
+    app_task.ready.set()
+    proxy = RestartProxy(app_task, unused_port)
+    cli = await sanic_client(create_auxiliary_app(app_task, proxy=proxy))
+    try:
+        r = await cli.post('/echo/foo', data=b'payload')
+        assert r.status == 502
+        assert await r.text() == 'dev server stopped while handling request, not retrying POST'
+        assert len(connections) == 1
+
+        r = await cli.get('/echo/foo')
+        assert r.status == 502
+        assert await r.text() == 'dev server did not become ready'
+        assert len(connections) == 1 + PROXY_ATTEMPTS
+    finally:
+        server.close()
+        await server.wait_closed()
+        await app_task.session.close()
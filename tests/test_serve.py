@@ -1,8 +1,15 @@
+import asyncio
+from unittest.mock import MagicMock
+
 import pytest
 from pytest_toolbox import mktree
 from sanic_devtools.config import Config
-from sanic_devtools.serve import check_port_open, start_main_app
+from sanic_devtools.serve import (check_port_open, create_main_socket, hot_reload_app, loaded_module_files,
+                                  serve_main_app, start_main_app, url_host)
 from sanic_devtools.exceptions import SanicDevException
+from sanic_devtools.metrics import RouteHistograms
+from sanic_devtools.profiler import Profiler
+from sanic_devtools.runner import PING_PATH
 from .conftest import SIMPLE_APP
 
 
@@ -16,3 +23,185 @@ async def test_check_port_open(unused_port, tmpworkdir, loop):
             await check_port_open(runner.port, loop, 0.01)
     finally:
         await runner.close()
+
+
+async def test_start_main_app_socket(unused_port, tmpworkdir, loop):
+    mktree(tmpworkdir, SIMPLE_APP)
+    config = Config(app_path='app.py', main_port=unused_port)
+    sock = await create_main_socket(config, loop)
+    runner = await start_main_app(config, config.import_app_factory(), loop, sock=sock)
+    try:
+        assert runner.server.sockets[0].getsockname() == sock.getsockname()
+        reader, writer = await asyncio.open_connection('127.0.0.1', unused_port, loop=loop)
+        writer.write(b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        assert (await reader.readline()).startswith(b'HTTP/1.1 200')
+        writer.close()
+    finally:
+        await runner.close()
+
+
+async def test_create_main_socket_in_use(unused_port, tmpworkdir, loop):
+    mktree(tmpworkdir, SIMPLE_APP)
+    config = Config(app_path='app.py', main_port=unused_port)
+    sock = await create_main_socket(config, loop)
+    try:
+        with pytest.raises(SanicDevException):
+            await create_main_socket(config, loop, delay=0.01)
+    finally:
+        sock.close()
+
+
+@pytest.mark.parametrize('host,address', [
+    (None, '127.0.0.1'),
+    ('0.0.0.0', '0.0.0.0'),
+    ('127.0.0.2', '127.0.0.2'),
+])
+async def test_create_main_socket_host(host, address, unused_port, tmpworkdir, loop):
+    mktree(tmpworkdir, SIMPLE_APP)
+    kwargs = {'host': host} if host else {}
+    config = Config(app_path='app.py', main_port=unused_port, **kwargs)
+    sock = await create_main_socket(config, loop)
+    try:
+        assert sock.getsockname() == (address, unused_port)
+    finally:
+        sock.close()
+
+
+@pytest.mark.parametrize('host,expected', [
+    ('0.0.0.0', '127.0.0.1'),
+    ('::', '[::1]'),
+    ('::1', '[::1]'),
+    ('192.168.1.5', '192.168.1.5'),
+    ('localhost', 'localhost'),
+])
+def test_url_host(host, expected):
+    assert url_host(host) == expected
+
+
+def test_loaded_module_files(tmpworkdir, monkeypatch):
+    mktree(tmpworkdir, {
+        'imported_module.py': '',
+        'script.py': '',
+    })
+    monkeypatch.syspath_prepend(str(tmpworkdir))
+    import imported_module  # noqa
+    files = loaded_module_files(tmpworkdir)
+    assert files == {str(tmpworkdir.join('imported_module.py').realpath())}
+
+
+async def test_runner_ping(unused_port, tmpworkdir, loop):
+    mktree(tmpworkdir, SIMPLE_APP)
+    config = Config(app_path='app.py', main_port=unused_port)
+    runner = await start_main_app(config, config.import_app_factory(), loop)
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', unused_port, loop=loop)
+        writer.write('GET {} HTTP/1.1\r\nHost: localhost\r\n\r\n'.format(PING_PATH).encode())
+        assert (await reader.readline()).startswith(b'HTTP/1.1 204')
+        writer.close()
+    finally:
+        await runner.close()
+
+
+def test_serve_main_app_failed(tmpworkdir, loop):
+    asyncio.set_event_loop(loop)
+    mktree(tmpworkdir, {'broken_app.py': 'raise RuntimeError("broken app")'})
+    config = Config(app_path='broken_app.py')
+    conn = MagicMock()
+    with pytest.raises(RuntimeError):
+        serve_main_app(config, None, conn=conn)
+    kind, payload = conn.send.call_args[0][0]
+    assert kind == 'failed'
+    assert payload['error'] == 'broken app'
+    assert 'raise RuntimeError("broken app")' in payload['traceback']
+
+
+async def test_runner_route_histograms(unused_port, tmpworkdir, loop):
+    mktree(tmpworkdir, SIMPLE_APP)
+    config = Config(app_path='app.py', main_port=unused_port)
+    runner = await start_main_app(config, config.import_app_factory(), loop)
+    runner.route_histograms = RouteHistograms()
+    try:
+        for path in ('/', '/', '/missing'):
+            reader, writer = await asyncio.open_connection('127.0.0.1', unused_port, loop=loop)
+            writer.write('GET {} HTTP/1.1\r\nHost: localhost\r\n\r\n'.format(path).encode())
+            await reader.readline()
+            writer.close()
+    finally:
+        await runner.close()
+    routes = runner.route_histograms.snapshot()['routes']
+    assert {k: v['count'] for k, v in routes.items()} == {'GET /': 2, 'GET <unmatched>': 1}
+
+
+async def test_hot_reload_profiles_requests(tmpworkdir, loop):
+    mktree(tmpworkdir, SIMPLE_APP)
+    config = Config(app_path='app.py', profile_requests=2)
+    config.import_app_factory()
+    conn = MagicMock()
+    runner = MagicMock(profiler=None, route_histograms=None, memory_tracer=None)
+    await hot_reload_app(conn, config, runner, [])
+    assert conn.send.call_args_list[0][0][0] == ('reloaded', [])
+    assert runner.profiler.requests == 2
+
+    # a profile started from the aux app is left running
+    runner.profiler = Profiler('cprofile')
+    await hot_reload_app(conn, config, runner, [])
+    assert runner.profiler.requests is None
+
+
+SLOW_APP = {
+    'slow_app.py': """\
+import asyncio
+from sanic import Sanic
+from sanic.response import text
+
+app = Sanic()
+
+@app.route('/')
+async def hello(request):
+    return text('hello world')
+
+@app.route('/slow')
+async def slow(request):
+    await asyncio.sleep(0.3)
+    return text('done')
+"""
+}
+
+
+async def open_request(port, path, loop):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, loop=loop)
+    writer.write('GET {} HTTP/1.1\r\nHost: localhost\r\n\r\n'.format(path).encode())
+    return reader, writer
+
+
+@pytest.mark.parametrize('drain_timeout,drained,aborted', [(2, 1, 0), (0.05, 0, 1)])
+async def test_runner_drain(unused_port, tmpworkdir, loop, drain_timeout, drained, aborted):
+    mktree(tmpworkdir, SLOW_APP)
+    config = Config(app_path='slow_app.py', main_port=unused_port, drain_timeout=drain_timeout)
+    runner = await start_main_app(config, config.import_app_factory(), loop)
+    # a keep-alive connection which has finished its request
+    idle_reader, idle_writer = await open_request(unused_port, '/', loop)
+    assert await idle_reader.readline() == b'HTTP/1.1 200 OK\r\n'
+    await idle_reader.readuntil(b'hello world')
+    slow_reader, slow_writer = await open_request(unused_port, '/slow', loop)
+    await asyncio.sleep(0.05, loop=loop)
+    assert len(runner.connections) == 2
+    assert runner.active_requests == 1
+
+    result = await runner.close()
+    assert result['drained'] == drained
+    assert result['aborted'] == aborted
+    # idle connections are closed straight away rather than waiting for the slow request
+    assert await idle_reader.read() == b''
+    response = await slow_reader.read()
+    if drained:
+        assert response.startswith(b'HTTP/1.1 200 OK\r\n')
+        assert b'Connection: close' in response
+        assert 0.2 < result['duration'] < 1
+    else:
+        assert response == b''
+        assert result['duration'] < 0.2
+    assert len(runner.connections) == 0
+    assert runner.active_requests == 0
+    idle_writer.close()
+    slow_writer.close()
@@ -0,0 +1,82 @@
+import asyncio
+import errno
+import os
+import socket
+import stat
+
+import pytest
+from pytest_toolbox import mktree
+
+from sanic_devtools.config import Config
+from sanic_devtools.exceptions import SanicDevException
+from sanic_devtools.serve import start_main_app
+from sanic_devtools.sockets import FREE, IN_USE, STALE, bind_unix_socket, socket_from_fd, unix_socket_state
+
+from .conftest import SIMPLE_APP
+
+
+def test_unix_socket_state(tmpdir):
+    path = str(tmpdir.join('app.sock'))
+    assert unix_socket_state(path) == FREE
+    sock = bind_unix_socket(path, 0o600, 10)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert unix_socket_state(path) == IN_USE
+    with pytest.raises(OSError) as exc_info:
+        bind_unix_socket(path, 0o600, 10)
+    assert exc_info.value.errno == errno.EADDRINUSE
+    sock.close()
+    assert unix_socket_state(path) == STALE
+    # the stale socket file is replaced
+    bind_unix_socket(path, 0o600, 10).close()
+
+    tmpdir.join('file').write('x')
+    with pytest.raises(SanicDevException):
+        unix_socket_state(str(tmpdir.join('file')))
+
+
+def test_socket_from_fd():
+    bound = socket.socket()
+    bound.bind(('127.0.0.1', 0))
+    sock = socket_from_fd(os.dup(bound.fileno()), 10)
+    try:
+        assert sock.family == socket.AF_INET
+        assert sock.getsockname() == bound.getsockname()
+    finally:
+        sock.close()
+        bound.close()
+
+    with open(__file__) as f:
+        with pytest.raises(SanicDevException):
+            socket_from_fd(f.fileno(), 10)
+
+
+def test_socket_from_fd_unix(tmpdir):
+    path = str(tmpdir.join('app.sock'))
+    bound = socket.socket(socket.AF_UNIX)
+    bound.bind(path)
+    sock = socket_from_fd(os.dup(bound.fileno()), 10)
+    try:
+        assert sock.family == socket.AF_UNIX
+        assert sock.getsockname() == path
+    finally:
+        sock.close()
+        bound.close()
+
+    with socket.socket(type=socket.SOCK_DGRAM) as udp:
+        with pytest.raises(SanicDevException):
+            socket_from_fd(udp.fileno(), 10)
+
+
+async def test_start_main_app_unix(tmpworkdir, loop):
+    mktree(tmpworkdir, SIMPLE_APP)
+    path = str(tmpworkdir.join('app.sock'))
+    config = Config(app_path='app.py', unix=path)
+    runner = await start_main_app(config, config.import_app_factory(), loop)
+    try:
+        reader, writer = await asyncio.open_unix_connection(path, loop=loop)
+        writer.write(b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        assert await reader.readline() == b'HTTP/1.1 200 OK\r\n'
+        writer.close()
+    finally:
+        await runner.close()
+    assert not os.path.exists(path)
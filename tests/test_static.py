@@ -0,0 +1,110 @@
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_toolbox import mktree
+
+from sanic_devtools.serve import create_auxiliary_app
+from sanic_devtools.static import StaticFiles, parse_range, push_data
+
+
+def test_parse_range():
+    assert parse_range('bytes=0-9', 100) == (0, 9)
+    assert parse_range('bytes=90-', 100) == (90, 99)
+    assert parse_range('bytes=-10', 100) == (90, 99)
+    assert parse_range('bytes=50-200', 100) == (50, 99)
+    assert parse_range('bytes=0-1,5-6', 100) is None
+    assert parse_range('lines=1-2', 100) is None
+    with pytest.raises(ValueError):
+        parse_range('bytes=100-', 100)
+    with pytest.raises(ValueError):
+        parse_range('bytes=-0', 100)
+    assert parse_range('bytes=-10', 0) is None
+    assert parse_range('bytes=0-', 0) is None
+
+
+class SyncProtocol:
+    def __init__(self):
+        self.data = []
+
+    def push_data(self, data):
+        self.data.append(data)
+
+
+class AsyncProtocol(SyncProtocol):
+    async def push_data(self, data):
+        super().push_data(data)
+
+
+@pytest.mark.parametrize('protocol_cls', [SyncProtocol, AsyncProtocol])
+async def test_push_data(protocol_cls):
+    protocol = protocol_cls()
+    await push_data(protocol, b'foo')
+    assert protocol.data == [b'foo']
+
+
+async def test_static_files(tmpworkdir, sanic_client):
+    mktree(tmpworkdir, {
+        'static': {
+            'styles.css': 'body {color: red}',
+            'empty.txt': '',
+            'big.txt': 'x' * 1000 + 'y' * 1000,
+        },
+        'secret.txt': 'secret',
+    })
+    static_files = StaticFiles(tmpworkdir.join('static'), '/static/', small_file_size=100)
+    cli = await sanic_client(create_auxiliary_app(MagicMock(), static_files))
+
+    r = await cli.get('/static/styles.css')
+    assert r.status == 200
+    assert await r.text() == 'body {color: red}'
+    assert r.headers['Content-Type'] == 'text/css'
+    etag = r.headers['ETag']
+    r = await cli.get('/static/styles.css', headers={'If-None-Match': etag})
+    assert r.status == 304
+    r = await cli.get('/static/styles.css', headers={'Range': 'bytes=0-3'})
+    assert r.status == 206
+    assert r.headers['Content-Range'] == 'bytes 0-3/17'
+    assert await r.text() == 'body'
+    r = await cli.get('/static/styles.css', headers={'Range': 'bytes=20-'})
+    assert r.status == 416
+    r = await cli.head('/static/styles.css')
+    assert r.headers['Content-Length'] == '17'
+    r = await cli.get('/static/empty.txt', headers={'Range': 'bytes=-10'})
+    assert r.status == 200
+    assert 'Content-Range' not in r.headers
+    assert await r.text() == ''
+
+    r = await cli.get('/static/big.txt')
+    assert await r.text() == 'x' * 1000 + 'y' * 1000
+    r = await cli.get('/static/big.txt', headers={'Range': 'bytes=995-1004'})
+    assert r.status == 206
+    assert await r.text() == 'xxxxxyyyyy'
+
+    assert (await cli.get('/static/missing.css')).status == 404
+    assert (await cli.get('/static/..%2Fsecret.txt')).status == 404
+
+
+async def test_static_invalidate(tmpworkdir, sanic_client):
+    mktree(tmpworkdir, {'styles.css': 'body {color: red}'})
+    static_files = StaticFiles(tmpworkdir, '/static/')
+    cli = await sanic_client(create_auxiliary_app(MagicMock(), static_files))
+    r = await cli.get('/static/styles.css')
+    etag = r.headers['ETag']
+
+    tmpworkdir.join('styles.css').write('body {color: blue; margin: 0}')
+    # without a change event from the watcher the cached file is served
+    assert await (await cli.get('/static/styles.css')).text() == 'body {color: red}'
+    static_files.invalidate([str(tmpworkdir.join('styles.css'))])
+    r = await cli.get('/static/styles.css', headers={'If-None-Match': etag})
+    assert r.status == 200
+    assert await r.text() == 'body {color: blue; margin: 0}'
+    assert r.headers['ETag'] != etag
+
+
+def test_static_cache_size(tmpworkdir):
+    mktree(tmpworkdir, {'a.txt': 'a' * 10, 'b.txt': 'b' * 10, 'c.txt': 'c' * 10})
+    static_files = StaticFiles(tmpworkdir, cache_size=25)
+    for name in ('a.txt', 'b.txt', 'a.txt', 'c.txt'):
+        static_files._read_small(static_files.file_meta(static_files.resolve(name)))
+    assert [p.rsplit('/', 1)[1] for p in static_files._content] == ['a.txt', 'c.txt']
+    assert static_files.url_path(static_files.resolve('c.txt')) == '/static/c.txt'
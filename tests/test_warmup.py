@@ -0,0 +1,41 @@
+from aiohttp import ClientSession
+from sanic import Sanic
+from sanic.response import text
+
+from sanic_devtools.runner import AppRunner
+from sanic_devtools.serve import HOST
+from sanic_devtools.warmup import RequestLog, warm_up
+
+
+def test_request_log():
+    log = RequestLog(maxlen=6)
+    for path in ('/a', '/b', '/a', '/c', '/a', '/b'):
+        log.record('GET', path, 200)
+    log.record('POST', '/d', 200)
+    log.record('GET', '/e', 404)
+    assert log.top(2) == ['/a', '/b']
+    for _ in range(3):
+        log.record('GET', '/c', 200)
+    # the oldest requests have been dropped
+    assert log.top(1) == ['/c']
+
+
+async def test_warm_up(unused_port, loop):
+    app = Sanic('warmup_app')
+    calls = []
+
+    @app.route('/<name>')
+    async def handler(request, name):
+        calls.append(name)
+        return text(name)
+
+    runner = AppRunner(app, HOST, unused_port, loop=loop)
+    await runner.start()
+    try:
+        async with ClientSession(loop=loop) as session:
+            routes = await warm_up(session, 'http://{}:{}'.format(HOST, unused_port), ['/a', '/b'])
+    finally:
+        await runner.close()
+    assert sorted(calls) == ['a', 'a', 'b', 'b']
+    assert [(r['path'], r['status']) for r in routes] == [('/a', 200), ('/b', 200)]
+    assert all(r['cold'] > 0 and r['warm'] > 0 for r in routes)
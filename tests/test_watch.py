@@ -1,9 +1,16 @@
 import asyncio
+import socket
+import time
+from multiprocessing import Process
+
 import pytest
 from platform import system as get_os_family
 from unittest.mock import MagicMock, call
 
-from sanic_devtools.watch import AppTask, WatchTask
+from watchgod import Change
+
+from sanic_devtools.static import StaticFiles
+from sanic_devtools.watch import AppTask, StaticTask, WatchTask, wait_for_exit
 
 
 non_windows_test = pytest.mark.skipif(
@@ -30,6 +37,12 @@ def create_awatch_mock(*results):
     return awatch_mock
 
 
+def create_async_mock(return_value=None):
+    async def coro(*args, **kwargs):
+        return return_value
+    return MagicMock(side_effect=coro)
+
+
 async def test_watch_task(loop):
     class TestWatchTask(WatchTask):
         async def _run(self):
@@ -45,7 +58,7 @@ async def test_single_file_change(loop, mocker):
 
     app_task = AppTask(MagicMock(), loop)
     app_task._start_dev_server = MagicMock()
-    app_task._stop_dev_server = MagicMock()
+    app_task._stop_dev_server = create_async_mock()
     app_task._app = MagicMock()
     await app_task._run()
     assert app_task._start_dev_server.call_count == 1
@@ -53,12 +66,25 @@ async def test_single_file_change(loop, mocker):
     await app_task._session.close()
 
 
+async def test_template_change_reloads_browser(loop, mocker):
+    mocked_awatch = mocker.patch('sanic_devtools.watch.awatch')
+    mocked_awatch.side_effect = create_awatch_mock({('x', '/path/to/templates/index.html')})
+    app_task = AppTask(MagicMock(watch_path='/path/to'), loop)
+    app_task._start_dev_server = MagicMock()
+    app_task._schedule_restart = MagicMock()
+    app_task.livereload.reload = create_async_mock(1)
+    await app_task._run()
+    assert app_task._schedule_restart.called is False
+    app_task.livereload.reload.assert_called_once_with('templates/index.html')
+    await app_task._session.close()
+
+
 async def test_multiple_file_change(loop, mocker):
     mocked_awatch = mocker.patch('sanic_devtools.watch.awatch')
     mocked_awatch.side_effect = create_awatch_mock({('x', '/path/to/file'), ('x', '/path/to/file2')})
     app_task = AppTask(MagicMock(), loop)
     app_task._start_dev_server = MagicMock()
-    app_task._stop_dev_server = MagicMock()
+    app_task._stop_dev_server = create_async_mock()
 
     app_task._app = MagicMock()
     await app_task._run()
@@ -79,41 +105,293 @@ class FakeProcess:
         pass
 
 
-def test_stop_process_dead(smart_caplog, mocker):
+async def test_stop_process_dead(smart_caplog, mocker, loop):
     mock_kill = mocker.patch('sanic_devtools.watch.os.kill')
     mocker.patch('sanic_devtools.watch.awatch')
-    app_task = AppTask(MagicMock(), MagicMock())
+    app_task = AppTask(MagicMock(), loop)
     app_task._process = MagicMock()
     app_task._process.is_alive = MagicMock(return_value=False)
     app_task._process.exitcode = 123
-    app_task._stop_dev_server()
+    await app_task._stop_dev_server()
     assert 'server process already dead, exit code: 123' in smart_caplog
     assert mock_kill.called is False
 
 
-def test_stop_process_clean(mocker):
+async def test_stop_process_clean(mocker, loop):
     mock_kill = mocker.patch('sanic_devtools.watch.os.kill')
     mocker.patch('sanic_devtools.watch.awatch')
-    app_task = AppTask(MagicMock(), MagicMock())
+    mock_wait = mocker.patch('sanic_devtools.watch.wait_for_exit', side_effect=create_async_mock(True))
+    app_task = AppTask(MagicMock(shutdown_timeout=3, drain_timeout=2), loop)
     app_task._process = MagicMock()
     app_task._process.is_alive = MagicMock(return_value=True)
     app_task._process.pid = 321
-    app_task._process.exitcode = 123
-    app_task._stop_dev_server()
-    assert mock_kill.called_once_with(321, 2)
+    await app_task._stop_dev_server()
+    assert mock_kill.call_args_list == [call(321, 2)]
+    assert mock_wait.call_args[0][1:] == (loop, 5)
 
 
 @non_windows_test  # There's no signals in Windows
-def test_stop_process_dirty(mocker):
+async def test_stop_process_dirty(mocker, loop):
     mock_kill = mocker.patch('sanic_devtools.watch.os.kill')
     mocker.patch('sanic_devtools.watch.awatch')
-    app_task = AppTask(MagicMock(), MagicMock())
+    mocker.patch('sanic_devtools.watch.wait_for_exit', side_effect=create_async_mock(False))
+    app_task = AppTask(MagicMock(), loop)
     app_task._process = MagicMock()
     app_task._process.is_alive = MagicMock(return_value=True)
     app_task._process.pid = 321
-    app_task._process.exitcode = None
-    app_task._stop_dev_server()
+    await app_task._stop_dev_server()
     assert mock_kill.call_args_list == [
         call(321, 2),
         call(321, 9),
     ]
+
+
+@non_windows_test
+async def test_wait_for_exit(loop):
+    process = Process(target=time.sleep, args=(0.05,))
+    process.start()
+    assert await wait_for_exit(process, loop, 2) is True
+    assert process.exitcode == 0
+
+    process = Process(target=time.sleep, args=(2,))
+    process.start()
+    assert await wait_for_exit(process, loop, 0.05) is False
+    process.terminate()
+    assert await wait_for_exit(process, loop, 2) is True
+
+
+def test_start_with_standby(mocker):
+    mock_process = mocker.patch('sanic_devtools.watch.Process')
+    mocker.patch('sanic_devtools.watch.Pipe', side_effect=lambda: (MagicMock(), MagicMock()))
+    mocker.patch('sanic_devtools.watch.awatch')
+    app_task = AppTask(MagicMock(), MagicMock())
+    app_task._start_dev_server()
+    assert mock_process.call_count == 2
+    assert mock_process.call_args_list[1][1]['target'].__name__ == 'serve_standby_app'
+
+    standby_process, standby_conn = app_task._standby
+    app_task._start_dev_server()
+    assert app_task._process is standby_process
+    standby_conn.send.assert_called_once_with(app_task._config)
+    assert mock_process.call_count == 3
+
+
+async def test_restarts_coalesced(loop, mocker):
+    mocked_awatch = mocker.patch('sanic_devtools.watch.awatch')
+    mocked_awatch.side_effect = create_awatch_mock(
+        {('x', '/path/to/a.py')},
+        {('x', '/path/to/b.py')},
+        {('x', '/path/to/c.py')},
+    )
+    config = MagicMock(reload_delay=0.01, reload_storm_limit=100)
+    app_task = AppTask(config, loop)
+    app_task._start_dev_server = MagicMock()
+    app_task._stop_dev_server = create_async_mock()
+    app_task._app = MagicMock()
+    await app_task._run()
+    assert app_task._coalesced == 2
+    await app_task._restart_task
+    assert app_task._start_dev_server.call_count == 2
+    assert app_task._stop_dev_server.call_count == 1
+    assert app_task._pending_changes == set()
+    assert app_task._coalesced == 0
+    assert app_task._restarts == 1
+    assert [v['reload'] for v in app_task.route_metrics.versions] == [0, 1]
+    await app_task._session.close()
+
+
+async def test_change_storm(loop, mocker):
+    mocker.patch('sanic_devtools.watch.awatch')
+    mocker.patch('sanic_devtools.watch.STORM_QUIET_PERIOD', 0.05)
+    config = MagicMock(reload_delay=0.01, reload_storm_limit=2)
+    app_task = AppTask(config, loop)
+    app_task._start_dev_server = MagicMock()
+    app_task._stop_dev_server = create_async_mock()
+    app_task._schedule_restart({('x', '/path/to/{}.py'.format(i)) for i in range(3)})
+    await asyncio.sleep(0.02)
+    assert app_task._stop_dev_server.called is False
+    await app_task._restart_task
+    assert app_task._stop_dev_server.call_count == 1
+
+
+async def test_change_storm_small_batches(loop, mocker):
+    mocker.patch('sanic_devtools.watch.awatch')
+    mocker.patch('sanic_devtools.watch.STORM_QUIET_PERIOD', 0.05)
+    config = MagicMock(reload_delay=0.01, reload_storm_limit=2)
+    app_task = AppTask(config, loop)
+    app_task._start_dev_server = MagicMock()
+    app_task._stop_dev_server = create_async_mock()
+    for i in range(3):
+        app_task._schedule_restart({('x', '/path/to/{}.py'.format(i))})
+    await asyncio.sleep(0.02)
+    # each batch is a single file, but together they're over the limit
+    assert app_task._stop_dev_server.called is False
+    await app_task._restart_task
+    assert app_task._stop_dev_server.call_count == 1
+    assert app_task._restarts == 1
+
+
+@pytest.mark.parametrize('address,host', [('127.0.0.2', '127.0.0.2'), ('0.0.0.0', '127.0.0.1')])
+def test_main_url_inherited_socket(mocker, address, host):
+    mocker.patch('sanic_devtools.watch.awatch')
+    sock = socket.socket()
+    sock.bind((address, 0))
+    try:
+        port = sock.getsockname()[1]
+        # with --fd the port is taken from the socket by runserver, the host by AppTask
+        app_task = AppTask(MagicMock(main_port=port, infer_host=True), MagicMock(), sock)
+        assert app_task.main_url == 'http://{}:{}'.format(host, port)
+    finally:
+        sock.close()
+
+
+def test_changes_imported_by_app(mocker, tmpdir):
+    mocker.patch('sanic_devtools.watch.awatch')
+    app_task = AppTask(MagicMock(), MagicMock())
+    routes, package = str(tmpdir.join('routes.py')), str(tmpdir.join('pkg', '__init__.py'))
+    assert app_task._is_imported({(Change.modified, str(tmpdir.join('script.py')))}) is True
+    assert app_task._is_imported({(Change.modified, str(tmpdir.join('index.html')))}) is False
+
+    app_task._read_control(MagicMock(recv=MagicMock(return_value=('modules', [routes, package]))))
+    app_task._control = None
+    assert app_task._module_index is None
+    conn = MagicMock(recv=MagicMock(return_value=('modules', [routes, package])))
+    app_task._control = conn
+    app_task._read_control(conn)
+    assert app_task._module_index == {routes, package}
+
+    assert app_task._is_imported({(Change.modified, routes)}) is True
+    assert app_task._is_imported({(Change.modified, str(tmpdir.join('script.py')))}) is False
+    assert app_task._is_imported({(Change.modified, str(tmpdir.join('pkg', 'other.py')))}) is False
+    assert app_task._is_imported({(Change.added, str(tmpdir.join('pkg', 'other.py')))}) is True
+
+
+def test_hot_reload_blocker(mocker, tmpdir):
+    mocker.patch('sanic_devtools.watch.awatch')
+    config = MagicMock(py_file=tmpdir.join('app.py'))
+    app_task = AppTask(config, MagicMock())
+    app_task._process = MagicMock()
+    routes = str(tmpdir.join('routes.py'))
+    assert app_task._hot_reload_blocker([routes]) == 'dev server not running'
+    app_task._module_index = {routes, str(tmpdir.join('app.py'))}
+    assert app_task._hot_reload_blocker([routes]) is None
+    assert app_task._hot_reload_blocker([str(tmpdir.join('app.py'))]) == 'app factory module changed'
+    assert 'is not loaded' in app_task._hot_reload_blocker([str(tmpdir.join('new.py'))])
+
+
+async def test_dev_server_states(mocker, loop):
+    mocker.patch('sanic_devtools.watch.awatch')
+    mocker.patch('sanic_devtools.watch.Process')
+    mocker.patch('sanic_devtools.watch.Pipe', side_effect=lambda: (MagicMock(), MagicMock()))
+    app_task = AppTask(MagicMock(standby=False, workers=1), loop)
+    app_task._loop = MagicMock(create_task=loop.create_task, create_future=loop.create_future)
+    app_task._start_dev_server()
+    assert app_task.state == 'starting'
+    app_task._loop = loop
+    waiter = loop.create_task(app_task.wait_ready(1))
+    await asyncio.sleep(0)
+    assert waiter.done() is False
+
+    app_task._control.recv.return_value = ('ready', {'entered': time.time(), 'phases': {}})
+    app_task._read_control(app_task._control)
+    assert await waiter == 'ready'
+    assert app_task.status()['state'] == 'ready'
+
+    app_task._loop = MagicMock(create_task=loop.create_task, create_future=loop.create_future)
+    app_task._start_dev_server()
+    app_task._control.recv.return_value = ('failed', {'error': 'boom', 'traceback': 'Traceback...'})
+    app_task._read_control(app_task._control)
+    app_task._loop = loop
+    assert await app_task.wait_ready(1) == 'failed'
+    assert app_task.status()['failure'] == {'error': 'boom', 'traceback': 'Traceback...'}
+
+
+async def test_dev_server_exits_while_starting(mocker, loop):
+    mocker.patch('sanic_devtools.watch.awatch')
+    mocker.patch('sanic_devtools.watch.Process')
+    mocker.patch('sanic_devtools.watch.Pipe', side_effect=lambda: (MagicMock(), MagicMock()))
+    mocker.patch('sanic_devtools.watch.wait_for_exit', side_effect=create_async_mock(True))
+    app_task = AppTask(MagicMock(standby=False), loop)
+    app_task._loop = MagicMock(create_task=loop.create_task, create_future=loop.create_future)
+    app_task._start_dev_server()
+    app_task._process.exitcode = 1
+    app_task._control.recv.side_effect = EOFError
+    app_task._control.closed = False
+    app_task._read_control(app_task._control)
+    app_task._loop = loop
+    assert await app_task.wait_ready(1) == 'failed'
+    assert app_task.failure['error'] == 'dev server exited unexpectedly, exit code: 1'
+
+
+async def test_static_task(loop, mocker, tmpdir):
+    mocked_awatch = mocker.patch('sanic_devtools.watch.awatch')
+    mocked_awatch.side_effect = create_awatch_mock({('x', str(tmpdir.join('css', 'styles.css')))})
+    static_files = StaticFiles(tmpdir, '/static/')
+    static_files.invalidate = MagicMock()
+    livereload = MagicMock(reload=create_async_mock(1))
+    task = StaticTask(str(tmpdir), loop, static_files, livereload)
+    await task._run()
+    static_files.invalidate.assert_called_once_with([str(tmpdir.join('css', 'styles.css'))])
+    livereload.reload.assert_called_once_with('/static/css/styles.css')
+
+
+async def test_profile_control_request(mocker, loop):
+    mocker.patch('sanic_devtools.watch.awatch')
+    app_task = AppTask(MagicMock(), loop)
+    app_task.state = 'ready'
+    conn = MagicMock()
+    replies = {'profile_start': ('profile_started', 'sample'), 'profile_stop': ('profile', {'requests': 0})}
+
+    def send(message):
+        conn.recv.return_value = replies[message[0]]
+        loop.call_soon(app_task._read_control, conn)
+    conn.send.side_effect = send
+    app_task._control = conn
+
+    await app_task.profile_start('sample')
+    conn.send.assert_called_once_with(('profile_start', {'mode': 'sample'}))
+    assert await app_task.profile_stop() == {'requests': 0}
+    assert app_task.profile_result == {'requests': 0}
+    assert app_task._reply_waiters == {}
+
+
+async def test_rolling_restart(mocker, loop):
+    mocker.patch('sanic_devtools.watch.awatch')
+    mocker.patch('sanic_devtools.watch.Process', side_effect=lambda **kwargs: MagicMock())
+    mocker.patch('sanic_devtools.watch.Pipe', side_effect=lambda: (MagicMock(), MagicMock()))
+    mocker.patch('sanic_devtools.watch.wait_for_exit', side_effect=create_async_mock(True))
+    mock_kill = mocker.patch('sanic_devtools.watch.os.kill')
+    app_task = AppTask(MagicMock(standby=False, workers=3), loop)
+    app_task._loop = MagicMock(create_task=loop.create_task, create_future=loop.create_future)
+
+    def send(conn, kind):
+        conn.recv.return_value = (kind, {'entered': time.time(), 'phases': {}})
+        return conn
+
+    app_task._start_dev_server()
+    app_task._read_control(send(app_task._control, 'ready'))
+    await asyncio.sleep(0)
+    first = list(app_task._workers)
+    assert [w.index for w in first] == [1, 2]
+    for worker in first:
+        send(worker.conn, 'ready')
+        app_task._read_worker_control(worker)
+    await app_task._roll_task
+    assert [w['state'] for w in app_task.status()['workers']] == ['ready', 'ready', 'ready']
+
+    app_task._restarts = 1
+    app_task._read_control(send(app_task._control, 'ready'))
+    await asyncio.sleep(0)
+    # one worker is replaced at a time, the old one is only stopped once its replacement is ready
+    assert len(app_task._workers) == 3
+    assert mock_kill.call_count == 0
+    send(app_task._workers[-1].conn, 'ready')
+    app_task._read_worker_control(app_task._workers[-1])
+    await asyncio.sleep(0)
+    assert first[0] not in app_task._workers
+    assert mock_kill.call_count == 1
+    send(app_task._workers[-1].conn, 'ready')
+    app_task._read_worker_control(app_task._workers[-1])
+    await app_task._roll_task
+    assert mock_kill.call_count == 2
+    assert sorted((w.index, w.reload) for w in app_task._workers) == [(1, 1), (2, 1)]
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from watchgod import Change
+
+from sanic_devtools.watchers import DEFAULT_IGNORE, GlobWatcher, InotifyWatcher, PathFilter, inotify_available
+
+inotify_test = pytest.mark.skipif(not inotify_available(), reason='inotify is only available on linux')
+
+
+def test_path_filter(tmpdir):
+    path_filter = PathFilter(str(tmpdir), ignore=DEFAULT_IGNORE + ('build/*', '*.log'), extensions=['.py'])
+    assert path_filter.should_watch_dir(str(tmpdir.join('app')), 'app') is True
+    assert path_filter.should_watch_dir(str(tmpdir.join('node_modules')), 'node_modules') is False
+    assert path_filter.should_watch_file(str(tmpdir.join('app.py')), 'app.py') is True
+    assert path_filter.should_watch_file(str(tmpdir.join('app.pyc')), 'app.pyc') is False
+    assert path_filter.should_watch_file(str(tmpdir.join('index.html')), 'index.html') is False
+    assert path_filter.should_watch_file(str(tmpdir.join('build', 'gen.py')), 'gen.py') is False
+
+
+def test_glob_watcher(tmpdir):
+    tmpdir.join('app.py').write('')
+    tmpdir.mkdir('node_modules').join('lib.py').write('')
+    watcher = GlobWatcher(str(tmpdir))
+    assert set(watcher.files) == {str(tmpdir.join('app.py'))}
+
+
+@inotify_test
+async def test_inotify_watcher(tmpdir, loop):
+    tmpdir.join('app.py').write('')
+    tmpdir.mkdir('node_modules')
+    stop_event = asyncio.Event(loop=loop)
+    watcher = InotifyWatcher(str(tmpdir), min_sleep=10, stop_event=stop_event, loop=loop)
+
+    tmpdir.join('app.py').write('x = 1')
+    tmpdir.join('node_modules', 'lib.py').write('')
+    tmpdir.join('routes.py').write('')
+    changes = await asyncio.wait_for(watcher.__anext__(), 1, loop=loop)
+    assert changes == {(Change.modified, str(tmpdir.join('app.py'))), (Change.added, str(tmpdir.join('routes.py')))}
+
+    tmpdir.mkdir('pkg').join('views.py').write('')
+    tmpdir.join('routes.py').remove()
+    changes = await asyncio.wait_for(watcher.__anext__(), 1, loop=loop)
+    assert (Change.added, str(tmpdir.join('pkg', 'views.py'))) in changes
+    assert (Change.deleted, str(tmpdir.join('routes.py'))) in changes
+
+    stop_event.set()
+    with pytest.raises(StopAsyncIteration):
+        await watcher.__anext__()